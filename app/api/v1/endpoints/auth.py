@@ -1,24 +1,42 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import create_access_token, verify_token
+from app.core.database import get_db, get_async_db
+from app.core.security import create_access_token, verify_token, PasswordHasherOverloaded
 from app.core.config import settings
-from app.services.user_service import UserService
+from app.core.principal import Principal, principal_cache
+from app.services.user_service import UserService, AsyncUserService
 from app.schemas.user import Token
+from app.models.user import User
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
+# For endpoints that also accept the token elsewhere (e.g. a query parameter for EventSource clients)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token", auto_error=False)
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
 
 @router.post("/token", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user_service = UserService(db)
-    user = user_service.authenticate_user(form_data.username, form_data.password)
+    user_service = AsyncUserService(db)
+    try:
+        user = await user_service.authenticate_user(form_data.username, form_data.password)
+    except PasswordHasherOverloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -31,21 +49,48 @@ async def login(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def _verified_payload(token: str) -> dict:
     payload = verify_token(token)
-    if payload is None:
+    if payload is None or payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+def _remember(token: str, payload: dict, user) -> Principal:
+    if user is None:
         raise credentials_exception
-    username: str = payload.get("sub")
-    if username is None:
+    principal = Principal.from_user(user)
+    principal_cache.put(token, principal, expires_at=payload.get("exp"))
+    return principal
+
+def _ensure_active(principal: Principal) -> Principal:
+    if not principal.is_active:
         raise credentials_exception
-    
-    user_service = UserService(db)
-    user = user_service.get_user_by_username(username)
+    return principal
+
+# Sync dependency: runs in the threadpool, so a cache miss never blocks the event loop.
+# Returns a cached Principal; use get_current_user_model when the ORM User is needed.
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    principal = principal_cache.get(token)
+    if principal is None:
+        payload = _verified_payload(token)
+        user_service = UserService(db)
+        principal = _remember(token, payload, user_service.get_user_by_username(payload["sub"]))
+    return _ensure_active(principal)
+
+async def authenticate_token(token: str, db: AsyncSession) -> Principal:
+    principal = principal_cache.get(token)
+    if principal is None:
+        payload = _verified_payload(token)
+        principal = _remember(token, payload, await AsyncUserService(db).get_user_by_username(payload["sub"]))
+    return _ensure_active(principal)
+
+# Async dependency for `async def` endpoints using get_async_db
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    return await authenticate_token(token, db)
+
+# Full ORM user (relationships such as profile/settings), loaded by primary key on top of the cached principal
+def get_current_user_model(principal: Principal = Depends(get_current_user), db: Session = Depends(get_db)) -> User:
+    user = UserService(db).get_user(principal.user_id)
     if user is None:
         raise credentials_exception
     return user
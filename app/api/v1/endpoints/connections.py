@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 
 from app.core.database import get_db
+from app.core.replicas import get_read_db
 from app.api.v1.endpoints.auth import get_current_user
-from app.schemas.connection import ConnectionRequest, ConnectionResponse, ConnectionStatusUpdate
+from app.core.principal import Principal
+from app.schemas.connection import ConnectionRequest, ConnectionResponse, ConnectionStatusUpdate, ConversationSummary
 from app.models.user import User # For notifications later
 from app.services.connection_service import ConnectionService
 from app.models.connection import Connection
 from app.schemas.transaction import TransactionCreate
+from app.utils.pagination import NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
@@ -20,7 +23,7 @@ def get_connection_service(db: Session = Depends(get_db)):
 @router.post("/", response_model=ConnectionResponse, status_code=status.HTTP_202_ACCEPTED) # 202 because payment pending
 def request_connection(
     conn_request: ConnectionRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     connection_service: ConnectionService = Depends(get_connection_service)
 ):
     """
@@ -40,27 +43,23 @@ def request_connection(
 def complete_connection_payment(
     connection_id: uuid.UUID,
     transaction_data: TransactionCreate, # Data from client after payment
-    current_user: User = Depends(get_current_user), # Ensure current user is the requester
+    current_user: Principal = Depends(get_current_user), # Ensure current user is the requester
     connection_service: ConnectionService = Depends(get_connection_service)
 ):
     """
     Endpoint for client to confirm successful payment for a connection.
     Updates connection status and triggers notifications.
     """
-    db_connection = connection_service.process_payment_and_activate_connection(
-        connection_id, transaction_data
+    return connection_service.process_payment_and_activate_connection(
+        connection_id, transaction_data, payer_id=current_user.user_id
     )
-    if db_connection.requester_id != current_user.user_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only complete payment for your own connection requests.")
-    
-    return db_connection
 
 
 @router.put("/{connection_id}/status", response_model=ConnectionResponse)
 def update_connection_status(
     connection_id: uuid.UUID,
     status_update: ConnectionStatusUpdate,
-    current_user: User = Depends(get_current_user), # Current user must be the recipient
+    current_user: Principal = Depends(get_current_user), # Current user must be the recipient
     connection_service: ConnectionService = Depends(get_connection_service)
 ):
     """
@@ -79,10 +78,31 @@ def update_connection_status(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.get("/inbox", response_model=List[ConversationSummary])
+def get_inbox(
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """
+    The current user's accepted conversations, most recent first, with the other party, a preview
+    of the last message and the unread count. Pass the `X-Next-Cursor` header back as `cursor`.
+    """
+    try:
+        conversations, next_cursor = ConnectionService(db).get_inbox(current_user.user_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return conversations
+
+
 @router.get("/{connection_id}", response_model=ConnectionResponse)
 def get_connection_details(
     connection_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     connection = db.query(Connection).filter(Connection.connection_id == connection_id).first()
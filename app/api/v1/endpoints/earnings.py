@@ -4,30 +4,39 @@ from typing import List
 import uuid
 
 from app.core.database import get_db
+from app.core.replicas import get_read_db
 from app.api.v1.endpoints.auth import get_current_user
-from app.schemas.earning import EarningResponse
+from app.core.principal import Principal
+from app.schemas.earning import EarningBalanceResponse, EarningResponse
 from app.services.earning_service import EarningService as crud_earning
-from app.services.user_service import UserService as crud_user
 
 router = APIRouter()
 
 @router.get("/me", response_model=List[EarningResponse])
 def get_my_earnings(
-    current_user: crud_user.get_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
     skip: int = 0, limit: int = 100
 ):
     """Retrieve all earnings for the current user (poster's share from connections)."""
-    return crud_earning.get_earnings_by_user(db, user_id=current_user.user_id, skip=skip, limit=limit)
+    return crud_earning(db).get_earnings_by_user(user_id=current_user.user_id, skip=skip, limit=limit)
+
+@router.get("/summary", response_model=List[EarningBalanceResponse])
+def get_my_earnings_summary(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """The current user's pending payout, paid out and lifetime earnings per currency, from the balance rollup."""
+    return crud_earning(db).get_balances(user_id=current_user.user_id)
 
 @router.get("/{earning_id}", response_model=EarningResponse)
 def get_earning_details(
     earning_id: uuid.UUID,
-    current_user: crud_user.get_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
 ):
     """Retrieve details for a specific earning, only if owned by current user."""
-    earning = crud_earning.get_earning(db, earning_id=earning_id)
+    earning = crud_earning(db).get_earning(earning_id=earning_id)
     if not earning:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Earning not found")
     if earning.user_id != current_user.user_id:
@@ -36,5 +45,5 @@ def get_earning_details(
 
 # Payout endpoint would typically be an ADMIN function or an internal job.
 # @router.post("/{earning_id}/payout", response_model=EarningResponse)
-# def request_payout(earning_id: uuid.UUID, current_user: crud_user.get_user = Depends(get_current_user), db: Session = Depends(get_db)):
+# def request_payout(earning_id: uuid.UUID, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
 #    ... complex logic for payout processing ...
\ No newline at end of file
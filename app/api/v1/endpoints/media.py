@@ -5,16 +5,16 @@ import uuid
 
 from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_user
+from app.core.principal import Principal
 from app.schemas.media import MediaUpload, MediaResponse
 from app.services.media_service import MediaService
-from app.services.user_service import UserService as crud_user
 
 router = APIRouter()
 
 @router.post("/", response_model=MediaResponse, status_code=status.HTTP_201_CREATED)
-async def upload_media(
+def upload_media(
     media_data: MediaUpload,
-    current_user: crud_user.get_user = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -32,7 +32,7 @@ async def upload_media(
 
 @router.get("/me", response_model=List[MediaResponse])
 def get_my_media(
-    current_user: crud_user.get_user = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
     skip: int = 0, limit: int = 100
 ):
@@ -43,7 +43,7 @@ def get_my_media(
 @router.delete("/{media_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_media(
     media_id: uuid.UUID,
-    current_user: crud_user.get_user = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a specific media item by its ID."""
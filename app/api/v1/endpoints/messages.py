@@ -1,26 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 
-from app.core.database import get_db
-from app.api.v1.endpoints.auth import get_current_user
-from app.schemas.message import MessageCreate, MessageResponse
-from app.services.message_service import MessageService as crud_message
-from app.services.connection_service import ConnectionService as crud_connection
-from app.services.notification_service import NotificationService as crud_notification
-from app.services.user_service import UserService as crud_user
+from app.core.database import get_db, get_async_db
+from app.core.pubsub import broker, user_channel
+from app.utils.pagination import NEXT_CURSOR_HEADER, SYNC_CURSOR_HEADER
+from app.core.replicas import get_read_db, get_async_read_db
+from app.api.v1.endpoints.auth import get_current_user, get_current_user_async, authenticate_token
+from app.core.principal import Principal
+from app.schemas.message import MessageCreate, MessageResponse, MessageReadMarker, ReadStateResponse
+from app.services.message_service import MessageService, AsyncMessageService
+from app.services.search_service import SearchService
+from app.services.connection_service import ConnectionService, AsyncConnectionService
 
 router = APIRouter()
 
 @router.post("/", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
 def create_message(
     message_in: MessageCreate,
-    current_user: crud_user.get_user = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Send a new message within an established connection."""
-    connection = crud_connection.get_connection(db, message_in.connection_id)
+    connection = ConnectionService(db).get_connection(message_in.connection_id)
     if not connection:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Connection not found.")
     
@@ -33,34 +38,86 @@ def create_message(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Messages can only be sent in an ACCEPTED connection.")
 
     try:
-        db_message = crud_message.create_message(db, message_in=message_in, sender_id=current_user.user_id)
-        
-        # Notify the other party in the conversation
-        other_user_id = connection.requester_id if connection.recipient_id == current_user.user_id else connection.recipient_id
-        
-        crud_notification.create_notification(
-            db,
-            recipient_id=other_user_id,
-            sender_id=current_user.user_id,
-            type="NEW_MESSAGE",
-            title="New Message",
-            message=f"You have a new message from {current_user.username}.",
-            entity_id=db_message.message_id,
-            entity_type="message"
-        )
-        return db_message
+        # Also queues the NEW_MESSAGE notification for the other party, in the same transaction
+        return MessageService(db).create_message(message_in=message_in, sender_id=current_user.user_id)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+@router.websocket("/ws")
+async def message_socket(
+    websocket: WebSocket,
+    token: str = Query(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Real-time delivery of the current user's messages. Browsers cannot set headers on a
+    WebSocket handshake, so the bearer token is passed as `?token=`. Each new message in
+    any of the user's connections is pushed as `{"type": "message", "data": MessageResponse}`.
+    """
+    try:
+        principal = await authenticate_token(token, db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    # Don't hold a pooled connection for the lifetime of the socket
+    await db.close()
+
+    await websocket.accept()
+    subscription = await broker.subscribe(user_channel(principal.user_id))
+    forward = asyncio.create_task(_forward(websocket, subscription))
+    try:
+        # Inbound frames are ignored; receiving only serves to notice the client going away
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        forward.cancel()
+        await subscription.close()
+
+async def _forward(websocket: WebSocket, subscription) -> None:
+    async for event in subscription:
+        await websocket.send_json(event)
+
+@router.get("/search", response_model=List[MessageResponse])
+def search_messages(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """
+    Full-text search over messages in the current user's connections, most relevant first.
+    Pass the `X-Next-Cursor` header back as `cursor` for the next page.
+    """
+    try:
+        messages, next_cursor = SearchService(db).search_messages(current_user.user_id, q, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return messages
+
 @router.get("/connections/{connection_id}", response_model=List[MessageResponse])
-def get_messages_in_connection(
+async def get_messages_in_connection(
     connection_id: uuid.UUID,
-    current_user: crud_user.get_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    skip: int = 0, limit: int = 50
+    response: Response,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    since: Optional[str] = None
 ):
-    """Retrieve messages for a specific connection."""
-    connection = crud_connection.get_connection(db, connection_id)
+    """
+    Retrieve messages for a specific connection, oldest first within each page.
+
+    Without parameters this returns the latest `limit` messages; pass `X-Next-Cursor` back as
+    `cursor` to scroll further into the past. A reconnecting client passes the `X-Sync-Cursor`
+    it last saw as `since` to fetch only newer messages (`X-Next-Cursor` then continues forwards).
+    """
+    connection = await AsyncConnectionService(db).get_connection(connection_id)
     if not connection:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Connection not found.")
     
@@ -68,27 +125,81 @@ def get_messages_in_connection(
     if current_user.user_id not in [connection.requester_id, connection.recipient_id]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not part of this connection.")
     
-    messages = crud_message.get_messages_by_connection(db, connection_id=connection_id, skip=skip, limit=limit)
+    try:
+        messages, next_cursor, sync_cursor = await AsyncMessageService(db).get_messages_by_connection(
+            connection_id=connection_id, limit=limit, cursor=cursor, since=since
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if sync_cursor:
+        response.headers[SYNC_CURSOR_HEADER] = sync_cursor
     return messages
 
 @router.put("/{message_id}/read", response_model=MessageResponse)
 def mark_message_as_read(
     message_id: uuid.UUID,
-    current_user: crud_user.get_user = Depends(get_current_user), # Recipient marks as read
+    current_user: Principal = Depends(get_current_user), # Recipient marks as read
     db: Session = Depends(get_db)
 ):
     """Mark a specific message as read."""
-    db_message = crud_message.get_message(db, message_id=message_id)
+    message_service = MessageService(db)
+    db_message = message_service.get_message(message_id=message_id)
     if not db_message:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found.")
     
     # Only the recipient can mark a message as read
     if db_message.sender_id == current_user.user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You cannot mark your own sent messages as read.")
-    if db_message.connection.recipient_id != current_user.user_id: # Assuming recipient is the 'other' user in conn
+    if current_user.user_id not in [db_message.connection.requester_id, db_message.connection.recipient_id]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to mark this message as read.")
 
-    updated_message = crud_message.mark_message_as_read(db, message_id=message_id)
+    # Advances the reader's watermark; prefer PUT /connections/{connection_id}/read for a whole conversation
+    updated_message = message_service.mark_message_as_read(message_id=message_id, reader_id=current_user.user_id)
     if not updated_message: # Could be already read or not found initially
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Message already read or not found.")
-    return updated_message
\ No newline at end of file
+    return updated_message
+
+def _read_state(message_service: MessageService, connection_id: uuid.UUID, user_id: uuid.UUID) -> ReadStateResponse:
+    watermark = message_service.get_watermark(connection_id, user_id)
+    return ReadStateResponse(
+        connection_id=connection_id,
+        last_read_message_id=watermark.last_read_message_id if watermark else None,
+        last_read_at=watermark.last_read_at if watermark else None,
+        unread_count=message_service.get_unread_count(connection_id, user_id),
+    )
+
+@router.put("/connections/{connection_id}/read", response_model=ReadStateResponse)
+def mark_connection_read(
+    connection_id: uuid.UUID,
+    marker: MessageReadMarker,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Mark the conversation read up to `message_id` (default: the newest message) with a single write."""
+    connection = ConnectionService(db).get_connection(connection_id)
+    if not connection:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Connection not found.")
+    if current_user.user_id not in [connection.requester_id, connection.recipient_id]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not part of this connection.")
+    message_service = MessageService(db)
+    try:
+        message_service.mark_read_up_to(connection_id, current_user.user_id, marker.message_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _read_state(message_service, connection_id, current_user.user_id)
+
+@router.get("/connections/{connection_id}/read", response_model=ReadStateResponse)
+def get_connection_read_state(
+    connection_id: uuid.UUID,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """The current user's read watermark and unread count for a conversation."""
+    connection = ConnectionService(db).get_connection(connection_id)
+    if not connection:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Connection not found.")
+    if current_user.user_id not in [connection.requester_id, connection.recipient_id]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not part of this connection.")
+    return _read_state(MessageService(db), connection_id, current_user.user_id)
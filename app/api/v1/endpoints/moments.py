@@ -1,18 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
+from app.core.replicas import get_read_db, get_async_read_db
 from app.api.v1.endpoints.auth import get_current_user
+from app.core.principal import Principal
 from app.schemas.moment import MomentCreate, MomentUpdate, MomentResponse
-from app.services.moment_service import MomentService
-from app.services.user_service import UserService as crud_user
+from app.services.moment_service import MomentService, AsyncMomentService
+from app.services.timeline_service import TimelineService
+from app.services.search_service import SearchService
+from app.services.view_counter import view_counter
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.core.config import settings
 
 router = APIRouter()
 
 @router.post("/", response_model=MomentResponse, status_code=status.HTTP_201_CREATED)
-def create_moment(moment: MomentCreate, current_user: crud_user.get_user = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_moment(moment: MomentCreate, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     crud_moment = MomentService(db)
     # You would also handle media uploads here, linking them to the moment after they are uploaded
     db_moment = crud_moment.create_moment(moment_data=moment, user_id=current_user.user_id)
@@ -22,33 +29,93 @@ def create_moment(moment: MomentCreate, current_user: crud_user.get_user = Depen
     return db_moment
 
 @router.get("/", response_model=List[MomentResponse])
-def read_all_moments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    crud_moment = MomentService(db)
-    # In a real app, this would be a feed, potentially filtered, paginated, and personalized
-    moments = crud_moment.get_public_moments()
-    # Eagerly load relationships to avoid N+1 queries if you're returning many moments
-    # moments = db.query(Moment).options(joinedload(Moment.author), joinedload(Moment.media)).offset(skip).limit(limit).all()
+async def read_all_moments(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Public feed, newest first. Pass the `X-Next-Cursor` response header back as `cursor`
+    to fetch the next page; the header is absent on the last page.
+    """
+    crud_moment = AsyncMomentService(db)
+    try:
+        moments, next_cursor = await crud_moment.get_public_moments(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return moments
+
+@router.get("/trending", response_model=List[MomentResponse])
+async def read_trending_moments(
+    limit: int = Query(20, ge=1, le=settings.TRENDING_TOP_K),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Trending PUBLIC moments, ranked by time-decayed flirt and connection activity."""
+    crud_moment = AsyncMomentService(db)
+    return await crud_moment.get_trending_moments(limit=limit)
+
+@router.get("/search", response_model=List[MomentResponse])
+def search_moments(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Full-text search over PUBLIC moments, most relevant first. Pass the `X-Next-Cursor`
+    header back as `cursor` for the next page.
+    """
+    try:
+        moments, next_cursor = SearchService(db).search_moments(q, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return moments
+
+@router.get("/timeline", response_model=List[MomentResponse])
+def read_home_timeline(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    The current user's home timeline: moments from creators they have flirted with or are connected to.
+    Paginated like the public feed, via the `X-Next-Cursor` header.
+    """
+    timeline_service = TimelineService(db)
+    try:
+        moments, next_cursor = timeline_service.get_home_timeline(current_user.user_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return moments
 
 @router.get("/{moment_id}", response_model=MomentResponse)
-def read_moment(moment_id: uuid.UUID, db: Session = Depends(get_db)):
-    crud_moment = MomentService(db)
+async def read_moment(moment_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+    crud_moment = AsyncMomentService(db)
     
-    moment = crud_moment.get_moment(moment_id=moment_id)
+    moment = await crud_moment.get_moment(moment_id=moment_id)
     if not moment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Moment not found")
-    # Increment views (optional, could be async or batched)
-    moment.views += 1
-    db.add(moment)
-    db.commit()
-    db.refresh(moment)
-    return moment
+    # Views are buffered and flushed in batches, so this read stays a pure read
+    view_counter.record(moment.moment_id)
+    moment_response = MomentResponse.model_validate(moment)
+    moment_response.views += view_counter.pending(moment.moment_id)
+    return moment_response
 
 @router.put("/{moment_id}", response_model=MomentResponse)
 def update_moment(
     moment_id: uuid.UUID,
     moment_in: MomentUpdate,
-    current_user: crud_user.get_user = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     crud_moment = MomentService(db)
@@ -64,7 +131,7 @@ def update_moment(
 @router.delete("/{moment_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_moment(
     moment_id: uuid.UUID,
-    current_user: crud_user.get_user = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     crud_moment = MomentService(db)
@@ -1,40 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uuid
 
-from app.core.database import get_db
-from app.api.v1.endpoints.auth import get_current_user
-from app.schemas.notification import NotificationResponse, NotificationUpdate
-from app.services.notification_service import NotificationService as crud_notification
-from app.services.user_service import UserService as crud_user
+from app.core.database import get_db, get_async_db
+from app.core.replicas import get_async_read_db
+from app.api.v1.endpoints.auth import get_current_user, get_current_user_async, authenticate_token, optional_oauth2_scheme
+from app.core.principal import Principal
+from app.core.config import settings
+from app.schemas.notification import NotificationResponse, NotificationUpdate, NotificationReadBatch, NotificationReadResult, UnreadCountResponse
+from app.services.notification_service import NotificationService, AsyncNotificationService, notification_event, reset_event
+from app.services.notification_stream import notification_stream, sse_events
 
 router = APIRouter()
 
 @router.get("/me", response_model=List[NotificationResponse])
-def get_my_notifications(
-    current_user: crud_user.get_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def get_my_notifications(
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db),
     read: Optional[bool] = None, # Filter by read status
     skip: int = 0, limit: int = 50
 ):
     """Retrieve notifications for the current user."""
-    return crud_notification.get_notifications_by_recipient(db, recipient_id=current_user.user_id, read=read, skip=skip, limit=limit)
+    return await AsyncNotificationService(db).get_notifications_by_recipient(recipient_id=current_user.user_id, read=read, skip=skip, limit=limit)
+
+@router.get("/me/unread_count", response_model=UnreadCountResponse)
+async def get_my_unread_count(
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Unread badge count for the current user, read from the maintained per-user counter."""
+    return UnreadCountResponse(unread_count=await AsyncNotificationService(db).get_unread_count(current_user.user_id))
+
+@router.get("/stream")
+async def stream_my_notifications(
+    bearer: Optional[str] = Depends(optional_oauth2_scheme),
+    token: Optional[str] = None, # EventSource cannot send headers; pass the access token as ?token=
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_async_db) # Primary: a lagging replica would replay an incomplete backlog
+):
+    """
+    Server-Sent Events stream of the current user's notifications as they are created or
+    coalesced. Browsers resend the last `id:` as `Last-Event-ID` on reconnect, and whatever
+    was missed in between is replayed first; if that is more than NOTIFICATION_STREAM_REPLAY_LIMIT
+    notifications, a single `reset` event is sent instead and the client should refetch its list.
+    Idle streams receive a heartbeat comment.
+    """
+    principal = await authenticate_token(bearer or token or "", db)
+
+    # Listen before reading the backlog so nothing committed in between is lost
+    queue = notification_stream.listen(principal.user_id)
+    try:
+        backlog = []
+        if last_event_id:
+            notification_service = AsyncNotificationService(db)
+            missed = await notification_service.get_notifications_since(
+                principal.user_id, last_event_id, limit=settings.NOTIFICATION_STREAM_REPLAY_LIMIT
+            )
+            if len(missed) > settings.NOTIFICATION_STREAM_REPLAY_LIMIT:
+                backlog = [reset_event(principal.user_id, await notification_service.get_stream_seq(principal.user_id))]
+            else:
+                backlog = [notification_event(notification) for notification in missed]
+        await db.close()
+    except Exception as e:
+        notification_stream.unlisten(principal.user_id, queue)
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Last-Event-ID.")
+        raise
+
+    async def events():
+        try:
+            async for chunk in sse_events(backlog, queue):
+                yield chunk
+        finally:
+            notification_stream.unlisten(principal.user_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.put("/{notification_id}/read", response_model=NotificationResponse)
 def mark_notification_as_read(
     notification_id: uuid.UUID,
-    current_user: crud_user.get_user = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Mark a specific notification as read."""
-    db_notification = crud_notification.get_notification(db, notification_id=notification_id)
+    notification_service = NotificationService(db)
+    db_notification = notification_service.get_notification(notification_id=notification_id)
     if not db_notification:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notification not found.")
     if db_notification.recipient_id != current_user.user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this notification.")
 
-    updated_notification = crud_notification.mark_notification_read_status(db, notification_id=notification_id, is_read=True)
+    updated_notification = notification_service.mark_notification_read_status(notification_id=notification_id, is_read=True)
     if not updated_notification:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Notification already read or could not be updated.")
     return updated_notification
@@ -42,28 +105,38 @@ def mark_notification_as_read(
 @router.put("/{notification_id}/unread", response_model=NotificationResponse)
 def mark_notification_as_unread(
     notification_id: uuid.UUID,
-    current_user: crud_user.get_user = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Mark a specific notification as unread."""
-    db_notification = crud_notification.get_notification(db, notification_id=notification_id)
+    notification_service = NotificationService(db)
+    db_notification = notification_service.get_notification(notification_id=notification_id)
     if not db_notification:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notification not found.")
     if db_notification.recipient_id != current_user.user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this notification.")
 
-    updated_notification = crud_notification.mark_notification_read_status(db, notification_id=notification_id, is_read=False)
+    updated_notification = notification_service.mark_notification_read_status(notification_id=notification_id, is_read=False)
     if not updated_notification:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Notification already unread or could not be updated.")
     return updated_notification
 
 @router.post("/mark_all_read", status_code=status.HTTP_204_NO_CONTENT)
 def mark_all_notifications_read(
-    current_user: crud_user.get_user = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Mark all notifications for the current user as read."""
-    notifications = crud_notification.get_notifications_by_recipient(db, recipient_id=current_user.user_id, read=False)
-    for notif in notifications:
-        crud_notification.mark_notification_read_status(db, notification_id=notif.notification_id, is_read=True)
-    return
\ No newline at end of file
+    NotificationService(db).mark_all_read(current_user.user_id)
+    return
+
+@router.post("/mark_read", response_model=NotificationReadResult)
+def mark_notifications_read(
+    batch: NotificationReadBatch,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Mark a batch of the current user's notifications as read. IDs belonging to other users are ignored."""
+    notification_service = NotificationService(db)
+    updated = notification_service.mark_notifications_read(current_user.user_id, batch.notification_ids)
+    return NotificationReadResult(updated=updated, unread_count=notification_service.get_unread_count(current_user.user_id))
\ No newline at end of file
@@ -3,7 +3,8 @@ from sqlalchemy.orm import Session
 import uuid
 
 from app.core.database import get_db
-from app.api.v1.endpoints.auth import get_current_user
+from app.core.replicas import get_read_db
+from app.api.v1.endpoints.auth import get_current_user_model
 from app.schemas.profile import ProfileUpdate, ProfileResponse
 from app.schemas.user import UserPublic
 from app.services.profile_service import ProfileService as crud_profile
@@ -12,7 +13,7 @@ from app.services.user_service import UserService as crud_user
 router = APIRouter()
 
 @router.get("/me", response_model=ProfileResponse)
-def read_my_profile(current_user: crud_user.get_user = Depends(get_current_user), db: Session = Depends(get_db)):
+def read_my_profile(current_user: crud_user.get_user = Depends(get_current_user_model), db: Session = Depends(get_db)):
     # The profile is loaded via relationship on current_user
     if not current_user.profile:
         # This shouldn't happen if profile is created with user, but as a fallback
@@ -20,7 +21,7 @@ def read_my_profile(current_user: crud_user.get_user = Depends(get_current_user)
     return current_user.profile
 
 @router.put("/me", response_model=ProfileResponse)
-def update_my_profile(profile_in: ProfileUpdate, current_user: crud_user.get_user = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_my_profile(profile_in: ProfileUpdate, current_user: crud_user.get_user = Depends(get_current_user_model), db: Session = Depends(get_db)):
     if not current_user.profile:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found for current user")
     
@@ -40,9 +41,9 @@ def update_my_profile(profile_in: ProfileUpdate, current_user: crud_user.get_use
     return crud_profile.update_profile(db, db_profile=current_user.profile, profile_in=profile_in)
 
 @router.get("/{user_id}", response_model=ProfileResponse)
-def read_public_profile(user_id: uuid.UUID, db: Session = Depends(get_db)):
+def read_public_profile(user_id: uuid.UUID, db: Session = Depends(get_read_db)):
     # This endpoint is for viewing other users' profiles
-    profile = crud_profile.get_profile_by_user_id(db, user_id=user_id)
+    profile = crud_profile(db).get_profile_by_user_id(user_id=user_id)
     if not profile:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
     
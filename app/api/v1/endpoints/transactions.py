@@ -1,33 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 
 from app.core.database import get_db
+from app.core.replicas import get_read_db
 from app.api.v1.endpoints.auth import get_current_user
-from app.schemas.transaction import TransactionResponse
+from app.core.principal import Principal
+from app.schemas.transaction import PaymentWebhookAck, PaymentWebhookEvent, TransactionResponse
+from app.services.payment_webhooks import SIGNATURE_HEADER, payment_webhooks, verify_signature, webhooks_enabled
 from app.services.transaction_service import TransactionService as crud_transaction
-from app.services.user_service import UserService as crud_user
 
 router = APIRouter()
 
+async def verify_webhook_signature(request: Request, signature: Optional[str] = Header(None, alias=SIGNATURE_HEADER)):
+    """Reject webhook calls not signed with PAYMENT_WEBHOOK_SECRET."""
+    if not webhooks_enabled():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Payment webhooks are not configured")
+    if not verify_signature(await request.body(), signature):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid webhook signature")
+
+@router.post("/webhook", response_model=PaymentWebhookAck, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(verify_webhook_signature)])
+def receive_payment_webhook(event: PaymentWebhookEvent, db: Session = Depends(get_db)):
+    """
+    Payment gateway callback. The event is queued and applied in the background; gateway
+    retries of an event already received are acknowledged without being queued again.
+    """
+    return PaymentWebhookAck(queued=payment_webhooks.enqueue(db, event))
+
 @router.get("/me", response_model=List[TransactionResponse])
 def get_my_transactions(
-    current_user: crud_user.get_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
     skip: int = 0, limit: int = 100
 ):
     """Retrieve all transactions initiated by the current user."""
-    return crud_transaction.get_transactions_by_user(db, user_id=current_user.user_id, skip=skip, limit=limit)
+    return crud_transaction(db).get_transactions_by_user(user_id=current_user.user_id, skip=skip, limit=limit)
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 def get_transaction_details(
     transaction_id: uuid.UUID,
-    current_user: crud_user.get_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
 ):
     """Retrieve details for a specific transaction, only if owned by current user."""
-    transaction = crud_transaction.get_transaction(db, transaction_id=transaction_id)
+    transaction = crud_transaction(db).get_transaction(transaction_id=transaction_id)
     if not transaction:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
     if transaction.user_id != current_user.user_id:
@@ -1,45 +1,58 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from app.core.database import get_db
-from app.services.user_service import UserService
+from app.core.database import get_db, get_async_db
+from app.core.security import PasswordHasherOverloaded
+from app.services.user_service import UserService, AsyncUserService
 from app.schemas.user import UserCreate, UserResponse, UserUpdate
-from app.api.v1.endpoints.auth import get_current_user
+from app.api.v1.endpoints.auth import get_current_user, get_current_user_async, get_current_user_model
+from app.core.principal import Principal
 from app.models.user import User
 import uuid
 
 router = APIRouter()
 
+hasher_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many password operations in progress, please retry shortly.",
+    headers={"Retry-After": "1"},
+)
+
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user_service = UserService(db)
+    user_service = AsyncUserService(db)
     
     # Check if user already exists
-    if user_service.get_user_by_email(user_data.email):
+    if await user_service.get_user_by_email(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    if user_service.get_user_by_username(user_data.username):
+    if await user_service.get_user_by_username(user_data.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
     
-    return user_service.create_user(user_data)
+    try:
+        # Public sign-up never grants admin rights; superusers are promoted out of band
+        return await user_service.create_user(user_data.model_copy(update={"is_superuser": False}))
+    except PasswordHasherOverloaded:
+        raise hasher_busy_exception
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: User = Depends(get_current_user_model)):
     return current_user
 
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
     user_id: uuid.UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     user_service = UserService(db)
     user = user_service.get_user(user_id)
@@ -51,14 +64,16 @@ def get_user(
     return user
 
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user(
+async def update_user(
     user_id: uuid.UUID,
     user_data: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async)
 ):
-    user_service = UserService(db)
-    user = user_service.update_user(user_id, user_data)
+    try:
+        user = await AsyncUserService(db).update_user(user_id, user_data)
+    except PasswordHasherOverloaded:
+        raise hasher_busy_exception
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
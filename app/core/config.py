@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Kontent Market API"
@@ -8,11 +8,94 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./app.db"
     TEST_DATABASE_URL: str = "sqlite:///./test.db"
+    ASYNC_DATABASE_URL: Optional[str] = None # Derived from DATABASE_URL (aiosqlite / asyncpg) when unset
+    
+    # Connection pool (server databases such as Postgres; applies to the sync and async engines separately)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0 # Seconds to wait for a free connection before erroring
+    DB_POOL_RECYCLE: int = 1800 # Seconds before a connection is replaced, below server/proxy idle timeouts
+    DB_POOL_PRE_PING: bool = True
+    
+    # Read replicas (see app/core/replicas.py); read-only endpoints use them when configured
+    DATABASE_REPLICA_URLS: List[str] = [] # e.g. '["sqlite:///./replica1.db", "sqlite:///./replica2.db"]'
+    DB_REPLICA_STRATEGY: str = "round_robin" # round_robin or least_connections
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0 # Lagging replicas are skipped; reads fall back to the primary
+    DB_REPLICA_HEARTBEAT_INTERVAL_SECONDS: float = 1.0
+    
+    # SQLite performance profile, applied to every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL" # Readers no longer block the writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL" # Safe with WAL; only the last transactions can be lost on power failure
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000 # Wait for locks instead of failing with "database is locked"
+    SQLITE_MMAP_SIZE: int = 268435456 # 256 MiB of memory-mapped I/O
     
     # Security
     SECRET_KEY: str = "your-secret-key-here"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BCRYPT_ROUNDS: int = 12 # Cost factor; existing hashes are upgraded on the next successful login
+    PASSWORD_HASH_WORKERS: int = 4 # Dedicated bcrypt threads per process
+    PASSWORD_HASH_MAX_QUEUE: int = 32 # Hashing jobs allowed to wait; beyond this login returns 503
+    PRINCIPAL_CACHE_SIZE: int = 10000 # Verified tokens kept in memory per process
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0 # Bounds how long other workers may serve a changed/deactivated user
+    
+    # Moment view counting (write-behind, see app/services/view_counter.py)
+    VIEW_FLUSH_INTERVAL_SECONDS: float = 5.0
+    VIEW_BUFFER_MAX_MOMENTS: int = 10000 # Flush early once this many moments have pending views
+    
+    # Home timeline (fan-out on write, see app/services/timeline_service.py)
+    HOME_TIMELINE_MAX_ENTRIES: int = 500 # Per-user cap, older entries are trimmed
+    HOME_TIMELINE_FANOUT_LIMIT: int = 5000 # Authors with more followers are merged at read time instead
+    
+    # Trending moments (time-decayed scores, see app/services/trending_service.py)
+    TRENDING_HALF_LIFE_HOURS: float = 6.0
+    TRENDING_TOP_K: int = 100
+    TRENDING_MAX_TRACKED: int = 50000 # Lowest-scoring moments are forgotten beyond this
+    TRENDING_SNAPSHOT_INTERVAL_SECONDS: float = 60.0
+    TRENDING_FLIRT_WEIGHT: float = 1.0
+    TRENDING_CONNECTION_WEIGHT: float = 3.0
+    
+    # Monetization config cache (see app/services/monetisation_config_service.py)
+    MONETIZATION_CONFIG_REFRESH_SECONDS: float = 5.0 # Max staleness of other workers' caches after a config change
+    
+    # Payment gateway webhooks (see app/services/payment_webhooks.py)
+    PAYMENT_WEBHOOK_SECRET: Optional[str] = None # Requests must carry a valid X-Webhook-Signature; unset disables the endpoint
+    PAYMENT_WEBHOOK_ALLOW_UNSIGNED: bool = False # Local development only: accept unsigned webhooks when no secret is set
+    PAYMENT_WEBHOOK_APPLY_INTERVAL_SECONDS: float = 1.0
+    PAYMENT_WEBHOOK_BATCH_SIZE: int = 200
+    
+    # Earnings balance reconciliation (see app/services/earnings_reconciliation.py)
+    EARNINGS_RECONCILE_INTERVAL_SECONDS: float = 86400.0
+    EARNINGS_RECONCILE_CHUNK_SIZE: int = 1000 # Users per reconciliation transaction
+    
+    # Creator payouts (see app/services/payout_engine.py)
+    PAYOUT_CHUNK_SIZE: int = 1000 # Creators paid out per database transaction, with all their pending earnings
+    PAYOUT_LEASE_SECONDS: float = 300.0 # Renewed every chunk; how long a crashed runner blocks a resume
+    
+    # Notification outbox dispatch (see app/services/notification_dispatcher.py)
+    NOTIFICATION_DISPATCH_INTERVAL_SECONDS: float = 1.0
+    NOTIFICATION_DISPATCH_BATCH_SIZE: int = 500
+    NOTIFICATION_PREFERENCES_CACHE_SIZE: int = 10000
+    NOTIFICATION_PREFERENCES_CACHE_TTL_SECONDS: int = 60 # Upper bound on staleness across workers; local updates invalidate immediately
+    
+    # Notification retention (see app/services/notification_retention.py)
+    NOTIFICATION_READ_RETENTION_DAYS: Optional[int] = 90 # Read notifications older than this are purged; None keeps them forever
+    NOTIFICATION_PURGE_INTERVAL_SECONDS: float = 3600.0
+    NOTIFICATION_PURGE_CHUNK_SIZE: int = 1000 # Rows deleted per transaction, keeping lock time short
+    NOTIFICATION_PARTITIONING: bool = False # Postgres only: partition notifications by month of created_at (fresh tables)
+    NOTIFICATION_PARTITION_MONTHS_AHEAD: int = 2
+    
+    # Notification stream (see app/services/notification_stream.py)
+    NOTIFICATION_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    NOTIFICATION_STREAM_REPLAY_LIMIT: int = 200 # Max notifications replayed after Last-Event-ID; longer backlogs get a reset event
+    
+    # Full-text search (see app/core/search.py)
+    SEARCH_TEXT_CONFIG: str = "simple" # Postgres text search configuration; "simple" avoids language-specific stemming
+    
+    # Real-time delivery (see app/core/pubsub.py)
+    PUBSUB_BACKEND: str = "memory" # memory (single worker) or unix (local multi-worker hub)
+    PUBSUB_UNIX_SOCKET_PATH: str = "/tmp/kontent-pubsub.sock"
+    PUBSUB_QUEUE_SIZE: int = 100 # Per-subscriber buffer; oldest events are dropped for slow consumers
     
     # Environment
     ENVIRONMENT: str = "development"
@@ -0,0 +1,55 @@
+import time
+import uuid
+from typing import Optional
+
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+
+class Principal:
+    """The authenticated caller: the few user fields most endpoints need, without an ORM object or session."""
+    __slots__ = ("user_id", "username", "email", "is_active", "is_superuser")
+
+    def __init__(self, user_id: uuid.UUID, username: str, email: str, is_active: bool, is_superuser: bool):
+        self.user_id = user_id
+        self.username = username
+        self.email = email
+        self.is_active = is_active
+        self.is_superuser = is_superuser
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(user.user_id, user.username, user.email, bool(user.is_active), bool(user.is_superuser))
+
+
+class PrincipalCache:
+    """
+    Verified access token -> Principal. An entry never outlives its token's `exp`.
+    Invalidation is per process: other workers pick up user changes within PRINCIPAL_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def get(self, token: str) -> Optional[Principal]:
+        return self._cache.get(token)
+
+    def put(self, token: str, principal: Principal, expires_at: Optional[float] = None) -> None:
+        ttl = None
+        if expires_at is not None:
+            ttl = expires_at - time.time()
+            if ttl <= 0:
+                return
+        self._cache.set(token, principal, ttl)
+
+    def invalidate_user(self, user_id: uuid.UUID) -> int:
+        return self._cache.discard_where(lambda _, principal: principal.user_id == user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
@@ -0,0 +1,241 @@
+"""
+Pluggable publish/subscribe broker for real-time delivery.
+
+Publishers call `broker.publish(channel, message)` from anywhere, including sync
+service code running in the threadpool. Subscribers are async and live on the
+event loop, e.g. one per open WebSocket.
+
+Backends (PUBSUB_BACKEND):
+- "memory": in-process fan-out; enough for a single worker.
+- "unix":   workers relay through a hub listening on PUBSUB_UNIX_SOCKET_PATH, so
+            several local workers see each other's events. Start the hub with
+            `python -m app.core.pubsub`.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, broker: "InProcessBroker", channel: str, maxsize: int):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message: Dict[str, Any]) -> None:
+        if self.queue.full():
+            # Slow consumer: drop the oldest event rather than grow without bound
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+    async def close(self) -> None:
+        await self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        """Deliver to local subscribers. Thread-safe and non-blocking."""
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+
+
+class UnixSocketBroker(InProcessBroker):
+    """
+    Relays events through a hub on a Unix socket; local fan-out is inherited from InProcessBroker.
+
+    The broker reconnects with exponential backoff whenever the hub is unreachable or drops the
+    connection, and re-subscribes every channel that still has local subscribers. Events published
+    while disconnected are dropped (and logged), like events for a slow consumer.
+    """
+
+    def __init__(self, path: str, queue_size: int = 100, reconnect_delay: float = 0.1, max_reconnect_delay: float = 5.0):
+        super().__init__(queue_size)
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def start(self) -> None:
+        """Connect to the hub if it is up; otherwise keep retrying in the background."""
+        self._loop = asyncio.get_running_loop()
+        reader = await self._connect()
+        self._reader_task = asyncio.create_task(self._run(reader))
+
+    async def stop(self) -> None:
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    async def _connect(self) -> Optional[asyncio.StreamReader]:
+        """Open a connection and re-subscribe local channels. Returns None if the hub is unreachable."""
+        try:
+            reader, self._writer = await asyncio.open_unix_connection(self.path)
+        except OSError as e:
+            logger.warning("Pub/sub hub at %s is unreachable: %s", self.path, e)
+            return None
+        with self._lock:
+            channels = list(self._subscriptions)
+        for channel in channels:
+            await self._send({"op": "sub", "channel": channel})
+        return reader
+
+    async def _run(self, reader: Optional[asyncio.StreamReader]) -> None:
+        delay = self.reconnect_delay
+        while True:
+            if reader is not None:
+                delay = self.reconnect_delay
+                await self._read(reader)
+                if self._writer:
+                    self._writer.close()
+                    self._writer = None
+                logger.warning("Pub/sub hub at %s closed the connection; reconnecting", self.path)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+            reader = await self._connect()
+
+    async def _send(self, frame: Dict[str, Any]) -> None:
+        writer = self._writer
+        if writer is None:
+            # Subscriptions are re-sent on reconnect
+            return
+        try:
+            writer.write(json.dumps(frame).encode() + b"\n")
+            await writer.drain()
+        except Exception:
+            logger.exception("Failed to send %s frame for %s to pub/sub hub at %s", frame["op"], frame["channel"], self.path)
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                frame = json.loads(line)
+                super().publish(frame["channel"], frame["data"])
+        except OSError as e:
+            logger.warning("Lost connection to pub/sub hub at %s: %s", self.path, e)
+
+    async def subscribe(self, channel: str) -> Subscription:
+        first = self.subscriber_count(channel) == 0
+        subscription = await super().subscribe(channel)
+        if first:
+            await self._send({"op": "sub", "channel": channel})
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        await super().unsubscribe(subscription)
+        if self.subscriber_count(subscription.channel) == 0:
+            await self._send({"op": "unsub", "channel": subscription.channel})
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        # Everything goes through the hub, which echoes it back to us if we are subscribed
+        if self._loop is None or not self.connected:
+            logger.warning("Pub/sub hub at %s is not connected; dropping event for %s", self.path, channel)
+            return
+        frame = {"op": "pub", "channel": channel, "data": message}
+        asyncio.run_coroutine_threadsafe(self._send(frame), self._loop)
+
+
+async def serve_hub(path: str) -> None:
+    """Minimal relay: forwards each published frame to every connection subscribed to its channel."""
+    channels: Dict[str, Set[asyncio.StreamWriter]] = defaultdict(set)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        subscribed: Set[str] = set()
+        try:
+            while line := await reader.readline():
+                frame = json.loads(line)
+                op, channel = frame["op"], frame["channel"]
+                if op == "sub":
+                    channels[channel].add(writer)
+                    subscribed.add(channel)
+                elif op == "unsub":
+                    channels[channel].discard(writer)
+                    subscribed.discard(channel)
+                elif op == "pub":
+                    out = json.dumps({"channel": channel, "data": frame["data"]}).encode() + b"\n"
+                    for subscriber in list(channels.get(channel, ())):
+                        subscriber.write(out)
+        finally:
+            for channel in subscribed:
+                channels[channel].discard(writer)
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle, path)
+    async with server:
+        await server.serve_forever()
+
+
+def create_broker() -> InProcessBroker:
+    if settings.PUBSUB_BACKEND == "unix":
+        return UnixSocketBroker(settings.PUBSUB_UNIX_SOCKET_PATH, settings.PUBSUB_QUEUE_SIZE)
+    if settings.PUBSUB_BACKEND == "memory":
+        return InProcessBroker(settings.PUBSUB_QUEUE_SIZE)
+    raise ValueError(f"Unknown PUBSUB_BACKEND '{settings.PUBSUB_BACKEND}'.")
+
+
+broker = create_broker()
+
+
+def user_channel(user_id) -> str:
+    return f"user:{user_id}"
+
+
+if __name__ == "__main__":
+    asyncio.run(serve_hub(settings.PUBSUB_UNIX_SOCKET_PATH))
@@ -0,0 +1,141 @@
+"""
+Read-replica routing.
+
+Read-only endpoints depend on `get_read_db` / `get_async_read_db` instead of
+`get_db` / `get_async_db`. Each request is routed to a replica chosen by
+DB_REPLICA_STRATEGY, or to the primary when no replicas are configured or all of
+them lag by more than DB_REPLICA_MAX_LAG_SECONDS.
+
+Lag is measured with a heartbeat row: the primary rewrites `replication_heartbeat`
+every DB_REPLICA_HEARTBEAT_INTERVAL_SECONDS and the age of the copy on each
+replica is its lag. This works with any replication mechanism, including copying
+SQLite files for local testing. Replicas that have never seen a heartbeat are
+not used.
+"""
+import itertools
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import Depends
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.database import (
+    SessionLocal, async_database_url, configure_engine, engine_options, get_async_db, get_db, pool_status
+)
+from app.models.replication_heartbeat import ReplicationHeartbeat
+from app.utils.background import PeriodicWorker
+
+HEARTBEAT_ID = 1
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = configure_engine(create_engine(url, **engine_options(url)))
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        async_url = async_database_url(url)
+        self.async_engine = create_async_engine(async_url, **engine_options(async_url))
+        configure_engine(self.async_engine.sync_engine)
+        self.AsyncSessionLocal = async_sessionmaker(self.async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        self.active = 0 # Sessions currently checked out through the router
+        self.lag: Optional[float] = None # Seconds behind the primary, None if unknown
+
+
+class ReplicaRouter:
+    STRATEGIES = ("round_robin", "least_connections")
+
+    def __init__(self, urls: List[str], strategy: str = "round_robin", max_lag: float = 5.0):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown replica strategy '{strategy}', expected one of {self.STRATEGIES}.")
+        self.replicas = [Replica(url) for url in urls]
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self.worker: Optional[PeriodicWorker] = None
+
+    def choose(self) -> Optional[Replica]:
+        """Pick a replica for the next read, or None to use the primary."""
+        candidates = [replica for replica in self.replicas if replica.lag is not None and replica.lag <= self.max_lag]
+        if not candidates:
+            return None
+        if self.strategy == "least_connections":
+            return min(candidates, key=lambda replica: replica.active)
+        return candidates[next(self._turn) % len(candidates)]
+
+    def acquire(self, replica: Replica) -> None:
+        with self._lock:
+            replica.active += 1
+
+    def release(self, replica: Replica) -> None:
+        with self._lock:
+            replica.active -= 1
+
+    def write_heartbeat(self, db: Session) -> None:
+        heartbeat = db.get(ReplicationHeartbeat, HEARTBEAT_ID)
+        if heartbeat is None:
+            db.add(ReplicationHeartbeat(heartbeat_id=HEARTBEAT_ID, beat_at=datetime.utcnow()))
+        else:
+            heartbeat.beat_at = datetime.utcnow()
+        db.commit()
+
+    def check_lag(self) -> None:
+        now = datetime.utcnow()
+        for replica in self.replicas:
+            try:
+                with replica.SessionLocal() as db:
+                    heartbeat = db.get(ReplicationHeartbeat, HEARTBEAT_ID)
+                replica.lag = (now - heartbeat.beat_at).total_seconds() if heartbeat else None
+            except Exception:
+                # Unreachable or not yet initialised: route around it
+                replica.lag = None
+
+    def heartbeat(self) -> None:
+        db = SessionLocal()
+        try:
+            self.write_heartbeat(db)
+        finally:
+            db.close()
+        self.check_lag()
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {"url": replica.engine.url.render_as_string(hide_password=True), "lag": replica.lag, "active": replica.active, "pool": pool_status(replica.engine)}
+            for replica in self.replicas
+        ]
+
+
+replica_router = ReplicaRouter(settings.DATABASE_REPLICA_URLS, settings.DB_REPLICA_STRATEGY, settings.DB_REPLICA_MAX_LAG_SECONDS)
+replica_router.worker = PeriodicWorker("replication-heartbeat", settings.DB_REPLICA_HEARTBEAT_INTERVAL_SECONDS, replica_router.heartbeat)
+
+
+def get_read_db(primary_db: Session = Depends(get_db)):
+    """Session for read-only endpoints: a replica when one is fresh enough, otherwise the primary."""
+    replica = replica_router.choose()
+    if replica is None:
+        yield primary_db
+        return
+    replica_router.acquire(replica)
+    db = replica.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        replica_router.release(replica)
+
+
+async def get_async_read_db(primary_db: AsyncSession = Depends(get_async_db)):
+    replica = replica_router.choose()
+    if replica is None:
+        yield primary_db
+        return
+    replica_router.acquire(replica)
+    try:
+        async with replica.AsyncSessionLocal() as db:
+            yield db
+    finally:
+        replica_router.release(replica)
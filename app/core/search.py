@@ -0,0 +1,107 @@
+"""
+Full-text search indexes for message and moment text.
+
+- SQLite: an external-content FTS5 table per searchable table (`messages_fts`,
+  `moments_fts`) keyed by the base table's rowid, kept in sync by AFTER
+  INSERT/UPDATE/DELETE triggers. Only the inverted index is stored, not a copy of
+  the text. Rowids of tables without an INTEGER PRIMARY KEY can change on VACUUM,
+  so vacuum through `vacuum_database` (scripts/vacuum_db.py), which rebuilds them after.
+- Postgres: a stored generated `search_vector tsvector` column with a GIN index,
+  using the SEARCH_TEXT_CONFIG text search configuration.
+
+Either way the database maintains the index on every create, update and delete.
+The DDL is idempotent. It runs after every `Base.metadata.create_all()`, so existing
+databases pick it up on the next start. SQLite FTS tables are rebuilt when they are
+first created.
+"""
+import re
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.core.database import Base
+
+# Table -> text column to index
+SEARCHABLE_TABLES = {"messages": "text_content", "moments": "text_content"}
+
+
+def fts_table(table: str) -> str:
+    return f"{table}_fts"
+
+
+def _sqlite_statements(table: str, column: str):
+    fts = fts_table(table)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({column}, content='{table}', content_rowid='rowid')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column}); END",
+    ]
+
+
+def _postgres_statements(table: str, column: str):
+    config = settings.SEARCH_TEXT_CONFIG
+    if not re.fullmatch(r"[a-z_]+", config):
+        raise ValueError(f"Invalid SEARCH_TEXT_CONFIG '{config}'.")
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{config}', coalesce({column}, ''))) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN (search_vector)",
+    ]
+
+
+def install_search_indexes(connection: Connection) -> None:
+    dialect = connection.dialect.name
+    for table, column in SEARCHABLE_TABLES.items():
+        if dialect == "sqlite":
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts_table(table)}
+            ).first()
+            statements = _sqlite_statements(table, column)
+            if exists:
+                statements = statements[1:] # Triggers only; they are dropped with the base table
+            for statement in statements:
+                connection.execute(text(statement))
+            if not exists:
+                connection.execute(text(f"INSERT INTO {fts_table(table)}({fts_table(table)}) VALUES ('rebuild')"))
+        elif dialect == "postgresql":
+            for statement in _postgres_statements(table, column):
+                connection.execute(text(statement))
+
+
+def drop_search_indexes(connection: Connection) -> None:
+    # Postgres columns and indexes go with their tables; FTS5 tables are separate objects
+    if connection.dialect.name == "sqlite":
+        for table in SEARCHABLE_TABLES:
+            connection.execute(text(f"DROP TABLE IF EXISTS {fts_table(table)}"))
+
+
+def rebuild_search_indexes(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        for table in SEARCHABLE_TABLES:
+            connection.execute(text(f"INSERT INTO {fts_table(table)}({fts_table(table)}) VALUES ('rebuild')"))
+
+
+def vacuum_database(engine: Engine) -> None:
+    """VACUUM a SQLite database, then rebuild the FTS5 indexes whose rowids it may have renumbered."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM"))
+    with engine.begin() as connection:
+        rebuild_search_indexes(connection)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    install_search_indexes(connection)
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _before_drop(target, connection, **kw):
+    drop_search_indexes(connection)
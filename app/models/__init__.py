@@ -1,12 +1,20 @@
 from .user import User
 from .profile import Profile
 from .moment import Moment
+from .media import Media
 from .flirt import Flirt
 from .connection import Connection
 from .message import Message
+from .message_read import MessageReadWatermark
 from .transaction import Transaction
-from .earning import Earning
-from .notification import Notification
+from .earning import Earning, EarningBalance
+from .notification import Notification, NotificationCounter, NotificationOutbox
 from .user_settings import UserSettings
+from .timeline import HomeTimelineEntry, TimelinePullAuthor
+from .trending import TrendingScore
+from .replication_heartbeat import ReplicationHeartbeat
+from .config_version import ConfigVersion
+from .payment_event import PaymentEvent
+from .payout import PayoutBatch
 
-__all__ = ["User", "Profile", "Moment", "Flirt", "Connection", "Message", "Transaction", "Earning", "Notification", "UserSettings"]
+__all__ = ["User", "Profile", "Moment", "Media", "Flirt", "Connection", "Message", "MessageReadWatermark", "Transaction", "Earning", "EarningBalance", "Notification", "NotificationCounter", "NotificationOutbox", "UserSettings", "HomeTimelineEntry", "TimelinePullAuthor", "TrendingScore", "ReplicationHeartbeat", "ConfigVersion", "PaymentEvent", "PayoutBatch"]
@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from sqlalchemy import ( Column, DateTime, Integer, String
+)
+from app.core.database import Base
+
+
+# Change counter per cached configuration family; workers poll it to know when to reload
+class ConfigVersion(Base):
+    __tablename__ = "config_versions"
+    name = Column(String(50), primary_key=True) # e.g. "monetization"
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
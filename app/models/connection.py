@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ( Column, String, DateTime, ForeignKey, Numeric, UniqueConstraint
+from sqlalchemy import ( Column, String, DateTime, ForeignKey, Index, Numeric, UniqueConstraint
 )
 from app.core.database import Base
 from sqlalchemy.orm import relationship
@@ -22,7 +22,14 @@ class Connection(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, nullable=False) # Use DB trigger
 
-    __table_args__ = (UniqueConstraint('requester_id', 'recipient_id', 'moment_id', name='_unique_connection_per_moment'),) # Only one connection request from A to B for a specific moment
+    # Denormalized inbox state, maintained by MessageService.create_message
+    last_message_at = Column(DateTime, nullable=True)
+    last_message_id = Column(UUID(as_uuid=True), nullable=True) # No FK: messages already reference connections
+
+    __table_args__ = (
+        UniqueConstraint('requester_id', 'recipient_id', 'moment_id', name='_unique_connection_per_moment'), # Only one connection request from A to B for a specific moment
+        Index('ix_connections_recipient', 'recipient_id'), # Requester side is covered by the unique constraint
+    )
 
     # Relationships
     requester = relationship("User", foreign_keys=[requester_id], back_populates="connections_initiated")
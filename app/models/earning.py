@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ( Column, String, DateTime, ForeignKey,
-    Numeric
+from sqlalchemy import ( Column, String, DateTime, ForeignKey, Index,
+    Numeric, text
 )
 from app.core.database import Base
 from sqlalchemy.orm import relationship
@@ -23,4 +23,20 @@ class Earning(Base):
     # Relationships
     recipient = relationship("User", back_populates="earnings")
     connection = relationship("Connection", back_populates="earning", uselist=False)
-    payout_transaction = relationship("Transaction") # Unidirectional link for payout tracking
\ No newline at end of file
+    payout_transaction = relationship("Transaction") # Unidirectional link for payout tracking
+
+    __table_args__ = (
+        # Payout engine scan: pending earnings grouped by creator and currency
+        Index('ix_earnings_pending_payout', 'user_id', 'currency', 'earning_id',
+              postgresql_where=text("status = 'PENDING_PAYOUT'"), sqlite_where=text("status = 'PENDING_PAYOUT'")),
+    )
+
+
+# Per-creator, per-currency rollup of `earnings`, maintained by EarningService on every change
+class EarningBalance(Base):
+    __tablename__ = "earning_balances"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    currency = Column(String(3), primary_key=True)
+    pending_payout = Column(Numeric(12, 2), default=0, nullable=False) # Sum of PENDING_PAYOUT earnings
+    paid_out = Column(Numeric(12, 2), default=0, nullable=False) # Sum of PAID_OUT earnings
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
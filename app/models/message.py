@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ( Column, Boolean, DateTime, ForeignKey, Text,
+from sqlalchemy import ( Column, Boolean, DateTime, ForeignKey, Index, Text,
 )
 from app.core.database import Base
 from sqlalchemy.orm import relationship
@@ -18,6 +18,9 @@ class Message(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     is_read = Column(Boolean, default=False, nullable=False) # Tracks if recipient has read
 
+    # Serves conversation history and delta sync as a range scan (see MessageService.get_messages_by_connection)
+    __table_args__ = (Index('ix_messages_connection_created', 'connection_id', 'created_at', 'message_id'),)
+
     # Relationships
     connection = relationship("Connection", back_populates="messages")
     sender = relationship("User", back_populates="sent_messages") # assuming User has a 'sent_messages' back_populates
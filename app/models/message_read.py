@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import ( Column, DateTime, ForeignKey
+)
+from app.core.database import Base
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# Read watermark: a participant has read every message in the connection up to and including this one
+class MessageReadWatermark(Base):
+    __tablename__ = "message_read_watermarks"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True) # Reader
+    connection_id = Column(UUID(as_uuid=True), ForeignKey("connections.connection_id", ondelete="CASCADE"), primary_key=True)
+    last_read_message_id = Column(UUID(as_uuid=True), nullable=False)
+    last_read_at = Column(DateTime, nullable=False) # created_at of last_read_message_id; (last_read_at, last_read_message_id) orders like the message index
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ( Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import ( Column, Integer, String, DateTime, ForeignKey, Text, Index
 )
 from app.core.database import Base
 from sqlalchemy.orm import relationship
@@ -19,6 +19,9 @@ class Moment(Base):
     # Denormalized counts for quick access (can be updated by triggers or events)
     flirt_count = Column(Integer, default=0, nullable=False)
     connection_attempt_count = Column(Integer, default=0, nullable=False) # How many DMs initiated from this moment
+    views = Column(Integer, default=0, nullable=False) # Flushed in batches by the view counter, may lag reads slightly
+
+    __table_args__ = (Index('ix_moments_feed', 'visibility', 'created_at', 'moment_id'),) # Keyset index for the public feed
 
     # Relationships
     author = relationship("User", back_populates="moments")
@@ -1,10 +1,11 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ( Column, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import ( Column, String, Boolean, DateTime, ForeignKey, Index, Integer, Text, text
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
+from app.core.config import settings
 from app.core.database import Base
 
 
@@ -23,8 +24,52 @@ class Notification(Base):
     entity_type = Column(String(50), nullable=True) # e.g., 'moment', 'connection', 'message'
     
     is_read = Column(Boolean, default=False, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Partition key when NOTIFICATION_PARTITIONING is on; Postgres requires it in the primary key then
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, primary_key=settings.NOTIFICATION_PARTITIONING)
+
+    # Coalescing: repeats of an unread notification (same recipient, sender, type, entity) update this row
+    occurrences = Column(Integer, default=1, nullable=False)
+    last_occurred_at = Column(DateTime, default=datetime.utcnow, nullable=False) # Listing order
+    # Per-recipient stream position, taken from NotificationCounter.stream_seq each time the row is published
+    stream_seq = Column(Integer, nullable=True)
 
     # Relationships
     recipient = relationship("User", back_populates="notifications_received", foreign_keys=[recipient_id])
-    sender = relationship("User", back_populates="notifications_sent", foreign_keys=[sender_id])
\ No newline at end of file
+    sender = relationship("User", back_populates="notifications_sent", foreign_keys=[sender_id])
+
+    # Serves "unread for recipient" lookups and the set-based mark-read updates
+    __table_args__ = (
+        Index('ix_notifications_recipient_read', 'recipient_id', 'is_read'),
+        Index('ix_notifications_recipient_recent', 'recipient_id', 'last_occurred_at'),
+        Index('ix_notifications_recipient_stream', 'recipient_id', 'stream_seq'), # Last-Event-ID replay
+        # Partial index over read rows only, for the retention purge
+        Index('ix_notifications_read_expiry', 'last_occurred_at',
+              postgresql_where=text('is_read'), sqlite_where=text('is_read = 1')),
+        # Monthly range partitions are managed by app/services/notification_retention.py
+        {"postgresql_partition_by": "RANGE (created_at)"} if settings.NOTIFICATION_PARTITIONING else {},
+    )
+
+
+# Per-user unread badge count, kept in step with Notification.is_read in the same transaction
+class NotificationCounter(Base):
+    __tablename__ = "notification_counters"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    unread_count = Column(Integer, default=0, nullable=False)
+    # Last stream position handed out; bumped under the row lock, so positions follow commit order
+    stream_seq = Column(Integer, default=0, nullable=False)
+
+
+
+# Transactional outbox: notification intents written in the same transaction as the business change,
+# turned into Notification rows by the background dispatcher (app/services/notification_dispatcher.py)
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+    outbox_id = Column(Integer, primary_key=True, autoincrement=True) # Dispatch order
+    recipient_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
+    sender_id = Column(UUID(as_uuid=True), nullable=True)
+    type = Column(String(50), nullable=False)
+    title = Column(String(100), nullable=False)
+    message = Column(Text, nullable=False)
+    entity_id = Column(UUID(as_uuid=True), nullable=True)
+    entity_type = Column(String(50), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
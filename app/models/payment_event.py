@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import ( Column, DateTime, Index, Integer, Numeric, String, UniqueConstraint, text
+)
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+
+# Payment gateway webhook events, queued by POST /transactions/webhook and applied in batches
+class PaymentEvent(Base):
+    __tablename__ = "payment_events"
+    event_id = Column(Integer, primary_key=True, autoincrement=True) # Apply order
+    external_id = Column(String(100), nullable=False) # Gateway transaction ID, matches Transaction.external_id
+    status = Column(String(20), nullable=False) # SUCCESS, FAILED, REFUNDED
+    connection_id = Column(UUID(as_uuid=True), nullable=False) # From the payment's metadata
+    amount = Column(Numeric(10, 2), nullable=False)
+    currency = Column(String(3), default="USD", nullable=False)
+    payment_method = Column(String(50), nullable=True)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = Column(DateTime, nullable=True) # NULL while queued
+    outcome = Column(String(100), nullable=True) # What applying it did, e.g. "activated", "ignored: amount mismatch"
+
+    __table_args__ = (
+        # Gateway retries of the same event are dropped at ingestion
+        UniqueConstraint('external_id', 'status', name='_payment_event_uc'),
+        Index('ix_payment_events_pending', 'event_id',
+              postgresql_where=text('processed_at IS NULL'), sqlite_where=text('processed_at IS NULL')),
+    )
@@ -0,0 +1,28 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import ( Column, DateTime, Index, Integer, Numeric, String, text
+)
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+
+# One run of the payout engine: every PENDING_PAYOUT earning created up to `cutoff`
+class PayoutBatch(Base):
+    __tablename__ = "payout_batches"
+    batch_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    status = Column(String(20), default="RUNNING", nullable=False) # RUNNING, COMPLETED
+    cutoff = Column(DateTime, nullable=False) # Earnings created after this wait for the next batch
+    earnings_paid = Column(Integer, default=0, nullable=False)
+    payouts_created = Column(Integer, default=0, nullable=False) # One payout Transaction per creator and currency
+    amount_paid = Column(Numeric(14, 2), default=0, nullable=False) # Across currencies; for a rough progress figure only
+    runner_id = Column(String(64), nullable=True) # Runner currently holding the lease; only it pays chunks
+    lease_expires_at = Column(DateTime, nullable=True) # A crashed runner's lease lapses, letting the next run resume
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # At most one RUNNING batch: a second start returns it instead of cutting an overlapping batch
+        Index('uq_payout_batches_running', 'status', unique=True,
+              postgresql_where=text("status = 'RUNNING'"), sqlite_where=text("status = 'RUNNING'")),
+    )
@@ -0,0 +1,12 @@
+from datetime import datetime
+
+from sqlalchemy import ( Column, Integer, DateTime
+)
+from app.core.database import Base
+
+
+# Single row rewritten on the primary; its age on a replica is that replica's lag
+class ReplicationHeartbeat(Base):
+    __tablename__ = "replication_heartbeat"
+    heartbeat_id = Column(Integer, primary_key=True)
+    beat_at = Column(DateTime, default=datetime.utcnow, nullable=False)
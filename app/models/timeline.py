@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import ( Column, DateTime, ForeignKey, Index
+)
+from app.core.database import Base
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# Materialized home timeline: one row per (reader, moment), written at moment creation (fan-out on write)
+class HomeTimelineEntry(Base):
+    __tablename__ = "home_timeline_entries"
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True) # Reader whose timeline this is
+    moment_id = Column(UUID(as_uuid=True), ForeignKey("moments.moment_id", ondelete="CASCADE"), primary_key=True)
+    author_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, nullable=False) # Copied from the moment so the timeline can be range-scanned on its own
+
+    __table_args__ = (Index('ix_home_timeline_owner_created', 'owner_id', 'created_at', 'moment_id'),)
+
+
+# Authors with too many followers to fan out to; their moments are merged into timelines at read time
+class TimelinePullAuthor(Base):
+    __tablename__ = "timeline_pull_authors"
+    author_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -21,6 +21,7 @@ class Transaction(Base):
     payment_method = Column(String(50), nullable=True) # e.g., "Stripe_Card", "PayPal"
     transaction_date = Column(DateTime, default=datetime.utcnow, nullable=False)
     external_id = Column(String(100), unique=True, nullable=True) # ID from payment gateway
+    payout_batch_id = Column(UUID(as_uuid=True), ForeignKey("payout_batches.batch_id"), nullable=True) # Set on creator payouts
 
     # Relationships
     payer = relationship("User", back_populates="transactions")
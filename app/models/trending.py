@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from sqlalchemy import ( Column, DateTime, Float, ForeignKey
+)
+from app.core.database import Base
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# Periodic snapshot of the in-memory trending engine, used to warm it up on restart
+class TrendingScore(Base):
+    __tablename__ = "trending_scores"
+    moment_id = Column(UUID(as_uuid=True), ForeignKey("moments.moment_id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False) # Decayed score as of updated_at
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
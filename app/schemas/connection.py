@@ -38,4 +38,18 @@ class ConnectionResponse(ConnectionInDBBase):
     recipient: UserPublic
     moment: Optional[MomentSimple] = None # Simplified moment if associated
 
-    model_config = ORMConfig
\ No newline at end of file
+    model_config = ORMConfig
+
+# --- Inbox ---
+class MessagePreview(BaseModel):
+    message_id: uuid.UUID
+    sender_id: uuid.UUID
+    text_preview: str # First INBOX_PREVIEW_LENGTH characters
+    created_at: datetime
+
+class ConversationSummary(BaseModel):
+    connection_id: uuid.UUID
+    other_user: UserPublic
+    last_message: Optional[MessagePreview] = None
+    last_message_at: Optional[datetime] = None
+    unread_count: int
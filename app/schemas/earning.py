@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, Field, model_validator, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, model_validator, ConfigDict, computed_field
 from typing import Optional, List, Dict
 import uuid
 from datetime import datetime
+from decimal import Decimal
 
 # --- General Base Config for Pydantic v2 ---
 # This is crucial for handling ORM objects (SQLAlchemy instances)
@@ -20,6 +21,31 @@ class EarningResponse(BaseModel):
 
     model_config = ORMConfig
     
+class EarningBalanceResponse(BaseModel):
+    # Decimal, serialized as a string, so money totals are exact end to end
+    currency: str
+    pending_payout: Decimal # Earned, not yet paid out
+    paid_out: Decimal
+
+    @computed_field
+    @property
+    def lifetime(self) -> Decimal:
+        """Everything earned and not canceled."""
+        return self.pending_payout + self.paid_out
+
+    model_config = ORMConfig
+
+class PayoutBatchResponse(BaseModel):
+    batch_id: uuid.UUID
+    status: str
+    cutoff: datetime # Earnings created up to here are included
+    earnings_paid: int
+    payouts_created: int
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+    model_config = ORMConfig
+
 class EarningCreate(BaseModel):
     user_id: uuid.UUID # The recipient of the earning (poster)
     connection_id: uuid.UUID
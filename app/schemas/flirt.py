@@ -8,6 +8,9 @@ ORMConfig = ConfigDict(from_attributes=True)
 class FlirtCreate(BaseModel):
     moment_id: uuid.UUID
 
+class FlirtBulkCreate(BaseModel):
+    moment_ids: List[uuid.UUID] = Field(..., min_length=1, max_length=100)
+
 class FlirtResponse(BaseModel):
     flirt_id: uuid.UUID
     flirter_id: uuid.UUID
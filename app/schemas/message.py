@@ -23,4 +23,13 @@ class MessageResponse(BaseModel):
     is_read: bool
     sender: UserPublic # Nested simplified sender info
 
-    model_config = ORMConfig
\ No newline at end of file
+    model_config = ORMConfig
+
+class MessageReadMarker(BaseModel):
+    message_id: Optional[uuid.UUID] = None # Defaults to the newest message in the connection
+
+class ReadStateResponse(BaseModel):
+    connection_id: uuid.UUID
+    last_read_message_id: Optional[uuid.UUID] = None
+    last_read_at: Optional[datetime] = None
+    unread_count: int
@@ -36,6 +36,7 @@ class MomentInDBBase(MomentBase):
     updated_at: datetime
     flirt_count: int
     connection_attempt_count: int
+    views: int = 0
     # Note: media_ids is not an ORM field, it's for input.
     # We will load actual media objects into the response schema
 
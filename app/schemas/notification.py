@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import List, Optional
 import uuid
 from datetime import datetime
 
@@ -19,6 +19,16 @@ class NotificationCreate(BaseModel):
 class NotificationUpdate(BaseModel):
     is_read: Optional[bool] = None
 
+class NotificationReadBatch(BaseModel):
+    notification_ids: List[uuid.UUID] = Field(..., min_length=1, max_length=500)
+
+class NotificationReadResult(BaseModel):
+    updated: int
+    unread_count: int
+
+class UnreadCountResponse(BaseModel):
+    unread_count: int
+
 class NotificationResponse(BaseModel):
     notification_id: uuid.UUID
     recipient_id: uuid.UUID
@@ -30,6 +40,8 @@ class NotificationResponse(BaseModel):
     entity_type: Optional[str] = None
     is_read: bool
     created_at: datetime
+    occurrences: int = 1 # e.g. number of messages summarised by a NEW_MESSAGE notification
+    last_occurred_at: Optional[datetime] = None
 
     # Optional: Embed sender info if 'sender_id' is present
     # sender: Optional['UserPublic'] = None # Requires UserPublic to be defined
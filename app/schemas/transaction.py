@@ -2,6 +2,7 @@ from pydantic import BaseModel, EmailStr, Field, model_validator, ConfigDict
 from typing import Optional, List, Dict
 import uuid
 from datetime import datetime
+from decimal import Decimal
 
 # --- General Base Config for Pydantic v2 ---
 # This is crucial for handling ORM objects (SQLAlchemy instances)
@@ -27,4 +28,15 @@ class TransactionResponse(BaseModel):
     transaction_date: datetime
     external_id: Optional[str] = None
 
-    model_config = ORMConfig
\ No newline at end of file
+    model_config = ORMConfig
+
+class PaymentWebhookEvent(BaseModel):
+    external_id: str = Field(..., max_length=100) # Gateway transaction ID
+    status: str = Field(..., pattern="^(SUCCESS|FAILED|REFUNDED)$")
+    connection_id: uuid.UUID # Set as payment metadata when the client starts the charge
+    amount: Decimal = Field(gt=0, max_digits=10, decimal_places=2)
+    currency: str = Field("USD", max_length=3)
+    payment_method: Optional[str] = Field(None, max_length=50)
+
+class PaymentWebhookAck(BaseModel):
+    queued: bool # False when this event (external_id, status) was already received
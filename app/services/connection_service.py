@@ -1,10 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, joinedload
 from app.models.connection import Connection
+from app.models.message import Message
+from app.models.message_read import MessageReadWatermark
 from app.models.moment import Moment
+from app.models.transaction import Transaction
 from app.models.user import User
-from app.models.monetisation_config import MonetizationConfig
-from app.schemas.connection import ConnectionRequest, ConnectionStatusUpdate
-from typing import Optional, Tuple
+from app.schemas.connection import ConnectionRequest, ConnectionStatusUpdate, ConversationSummary, MessagePreview
+from app.schemas.user import UserPublic
+from typing import List, Optional, Tuple
 import uuid
 from decimal import Decimal
 from fastapi import HTTPException, status
@@ -13,6 +19,40 @@ from app.services.transaction_service import TransactionService
 from app.services.notification_service import NotificationService
 from app.schemas.monetisation import MonetizationConfigBase
 from app.schemas.transaction import TransactionCreate
+from app.core.config import settings
+from app.services.trending_service import trending_engine
+from app.services.monetisation_config_service import monetization_config_cache
+from app.utils.pagination import encode_cursor, keyset_filter
+
+INBOX_PREVIEW_LENGTH = 100
+
+# Connection fees (and so the earnings booked from them) are charged in this currency only
+FEE_CURRENCY = "USD"
+
+# Inbox recency: the last message, or when the connection was made for conversations without one yet
+_inbox_at = func.coalesce(Connection.last_message_at, Connection.created_at)
+
+
+def _unread_in_connection(user_id: uuid.UUID):
+    """Correlated count of the other party's messages past `user_id`'s read watermark."""
+    watermark = aliased(MessageReadWatermark)
+    return (
+        select(func.count())
+        .select_from(Message)
+        .outerjoin(watermark, and_(watermark.user_id == user_id, watermark.connection_id == Message.connection_id))
+        .where(
+            Message.connection_id == Connection.connection_id,
+            Message.sender_id != user_id,
+            Message.is_read == False,
+            or_(
+                watermark.user_id.is_(None),
+                Message.created_at > watermark.last_read_at,
+                and_(Message.created_at == watermark.last_read_at, Message.message_id > watermark.last_read_message_id),
+            ),
+        )
+        .correlate(Connection)
+        .scalar_subquery()
+    )
 
 
 class ConnectionService:
@@ -22,6 +62,21 @@ class ConnectionService:
     def get_connection(self, connection_id: uuid.UUID) -> Optional[Connection]:
         return self.db.query(Connection).filter(Connection.connection_id == connection_id).first()
 
+    def _lock_connection(self, connection_id: uuid.UUID, load_party) -> Optional[Connection]:
+        """
+        SELECT ... FOR UPDATE the connection (with one party eager-loaded for the notification text).
+        Concurrent state transitions on the same connection queue behind the lock until the
+        holder commits, so status checks made under it cannot race.
+        """
+        return (
+            self.db.query(Connection)
+            .options(joinedload(load_party, innerjoin=True))
+            .filter(Connection.connection_id == connection_id)
+            .with_for_update(of=Connection)
+            .populate_existing()
+            .first()
+        )
+
     def get_pending_connection(self, requester_id: uuid.UUID, recipient_id: uuid.UUID, moment_id: Optional[uuid.UUID] = None) -> Optional[Connection]:
         """Check for an existing PENDING_PAYMENT connection between two users for a specific moment."""
         query = self.db.query(Connection).filter(
@@ -36,12 +91,9 @@ class ConnectionService:
     def calculate_connection_fees(self, config_name: str = "DM_FEE_STANDARD") -> Tuple[Decimal, Decimal, Decimal]:
         """
         Calculates the base fee, platform cut, and poster share based on active monetization config.
+        Configs come from the in-process cache, so this does not query the database.
         """
-        config = self.db.query(MonetizationConfig).filter(
-            MonetizationConfig.config_name == config_name,
-            MonetizationConfig.is_active == True
-        ).first()
-
+        config = monetization_config_cache.fee_schedule(self.db, config_name)
         if not config:
             raise ValueError(f"Monetization configuration '{config_name}' not found or not active.")
 
@@ -64,13 +116,13 @@ class ConnectionService:
             raise ValueError("Cannot initiate a connection with yourself.")
 
         # Check for existing pending connection to prevent duplicates
-        existing_connection = self.get_pending_connection(self.db, requester_id, connection_in.recipient_id, connection_in.moment_id)
+        existing_connection = self.get_pending_connection(requester_id, connection_in.recipient_id, connection_in.moment_id)
         if existing_connection:
             return existing_connection, existing_connection.fee_amount # Return existing and its fee
 
         # Calculate fees (you might retrieve the active config dynamically)
         try:
-            fee_amount, platform_cut, poster_share = self.calculate_connection_fees(self.db)
+            fee_amount, platform_cut, poster_share = self.calculate_connection_fees()
         except ValueError as e:
             raise ValueError(f"Fee calculation failed: {e}")
 
@@ -86,9 +138,92 @@ class ConnectionService:
         self.db.add(db_connection)
         self.db.commit()
         self.db.refresh(db_connection)
+
+        if db_connection.moment_id and self.db.scalar(select(Moment.visibility).where(Moment.moment_id == db_connection.moment_id)) == "PUBLIC":
+            trending_engine.record(db_connection.moment_id, settings.TRENDING_CONNECTION_WEIGHT)
         
         return db_connection, fee_amount
 
+    def get_inbox(self, user_id: uuid.UUID, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[ConversationSummary], Optional[str]]:
+        """
+        The user's ACCEPTED conversations, most recent first, each with the other party, a preview of
+        the last message and the unread count, in a single query. Returns the page and the next cursor.
+        """
+        other_user = aliased(User)
+        last_message = aliased(Message)
+        other_user_id = case((Connection.requester_id == user_id, Connection.recipient_id), else_=Connection.requester_id)
+        stmt = (
+            select(
+                Connection.connection_id,
+                _inbox_at.label("inbox_at"),
+                Connection.last_message_at,
+                other_user,
+                last_message.message_id,
+                last_message.sender_id,
+                func.substr(last_message.text_content, 1, INBOX_PREVIEW_LENGTH).label("text_preview"),
+                last_message.created_at,
+                _unread_in_connection(user_id).label("unread_count"),
+            )
+            .join(other_user, other_user.user_id == other_user_id)
+            .outerjoin(last_message, last_message.message_id == Connection.last_message_id)
+            .where(or_(Connection.requester_id == user_id, Connection.recipient_id == user_id), Connection.status == "ACCEPTED")
+            .order_by(_inbox_at.desc(), Connection.connection_id.desc())
+            .limit(limit + 1) # One extra row tells whether a next page exists
+        )
+        if cursor:
+            stmt = stmt.where(keyset_filter(_inbox_at, Connection.connection_id, cursor))
+
+        rows = self.db.execute(stmt).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        conversations = [
+            ConversationSummary(
+                connection_id=row.connection_id,
+                other_user=UserPublic.model_validate(row[3]),
+                last_message=MessagePreview(
+                    message_id=row.message_id, sender_id=row.sender_id, text_preview=row.text_preview, created_at=row.created_at
+                ) if row.message_id else None,
+                last_message_at=row.last_message_at,
+                unread_count=row.unread_count,
+            )
+            for row in rows
+        ]
+        next_cursor = encode_cursor(rows[-1].inbox_at, rows[-1].connection_id) if has_more else None
+        return conversations, next_cursor
+
+    def record_last_message(self, connection_id: uuid.UUID, message_id: uuid.UUID, sent_at) -> None:
+        """Move the inbox pointer forward (never back, if messages commit out of order). The caller commits."""
+        self.db.execute(
+            update(Connection)
+            .where(
+                Connection.connection_id == connection_id,
+                or_(Connection.last_message_at.is_(None), Connection.last_message_at <= sent_at),
+            )
+            .values(last_message_at=sent_at, last_message_id=message_id)
+            .execution_options(synchronize_session=False)
+        )
+
+    def backfill_last_messages(self) -> int:
+        """One-off: populate last_message_at/last_message_id for connections that predate the columns."""
+        latest = (
+            select(Message.message_id, Message.created_at)
+            .where(Message.connection_id == Connection.connection_id)
+            .order_by(Message.created_at.desc(), Message.message_id.desc())
+            .limit(1)
+            .correlate(Connection)
+        )
+        result = self.db.execute(
+            update(Connection)
+            .where(Connection.last_message_id.is_(None))
+            .values(
+                last_message_id=latest.with_only_columns(Message.message_id).scalar_subquery(),
+                last_message_at=latest.with_only_columns(Message.created_at).scalar_subquery(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount
+
     def update_connection_status(self, connection_id: uuid.UUID, new_status: str) -> Optional[Connection]:
         db_connection = self.db.query(Connection).filter(Connection.connection_id == connection_id).first()
         if not db_connection:
@@ -109,60 +244,77 @@ class ConnectionService:
         Creates the connection entry and determines the amount to be paid.
         """
         # This will create a PENDING_PAYMENT connection
-        db_connection, amount_to_pay = self.crud_connection.create_connection_request(
-            self.db, requester_id, connection_request
-        )
+        db_connection, amount_to_pay = self.create_connection_request(requester_id, connection_request)
         # You'd typically return the connection info and the amount to the frontend
         # for them to proceed with payment.
         return db_connection # Frontend gets this and prompts for payment
 
-    def process_payment_and_activate_connection(self, connection_id: uuid.UUID, transaction_data: TransactionCreate) -> Connection:
+    def process_payment_and_activate_connection(self, connection_id: uuid.UUID, transaction_data: TransactionCreate, payer_id: Optional[uuid.UUID] = None) -> Connection:
         """
         Called after successful payment gateway response.
-        Updates connection status and creates transaction record.
+        Records the transaction, moves the connection to PAID_PENDING_ACCEPT and queues the
+        recipient's notification as one unit of work with a single commit. The connection row is
+        locked first, so a double-submitted payment sees the new status and is rejected.
         """
-        db_connection = self.crud_connection.get_connection(self.db, connection_id)
+        db_connection = self._lock_connection(connection_id, Connection.requester)
         if not db_connection:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Connection not found")
 
+        if payer_id is not None and db_connection.requester_id != payer_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only complete payment for your own connection requests.")
+
         if db_connection.status != "PENDING_PAYMENT":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Connection is not in pending payment state.")
 
+        self.activate_paid_connection(db_connection, transaction_data)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Backstop for backends without row locks (SQLite): the unique connection_id/external_id
+            # on transactions rejects the second of two racing submits
+            self.db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Payment for this connection has already been recorded.")
+        return db_connection
+
+    def activate_paid_connection(self, db_connection: Connection, transaction_data: TransactionCreate, db_transaction: Optional[Transaction] = None) -> Transaction:
+        """
+        Stage the successful transaction, the PAID_PENDING_ACCEPT transition and the recipient's
+        notification for a locked PENDING_PAYMENT connection (with `requester` loaded). An existing
+        `db_transaction` for the payment is moved to SUCCESS instead of recording a new one.
+        The caller commits.
+        """
         # 1. Record the successful transaction
-        db_transaction = TransactionService.create_transaction(
-            self.db,
-            user_id=db_connection.requester_id, # The payer
-            transaction_in=transaction_data,
-            connection_id=connection_id,
-            status="SUCCESS"
-        )
+        transaction_service = TransactionService(self.db)
+        if db_transaction is None:
+            db_transaction = transaction_service.add_transaction(
+                user_id=db_connection.requester_id, # The payer
+                transaction_in=transaction_data,
+                connection_id=db_connection.connection_id,
+                status="SUCCESS"
+            )
+        else:
+            transaction_service.set_transaction_status(db_transaction, "SUCCESS", external_id=transaction_data.external_id)
 
         # 2. Update connection status to PAID (pending recipient's acceptance)
         db_connection.status = "PAID_PENDING_ACCEPT"
-        self.db.add(db_connection)
-        self.db.commit()
-        self.db.refresh(db_connection)
 
-        # 3. Notify the recipient of a new paid connection request
-        recipient_user = self.db.query(User).filter(User.user_id == db_connection.recipient_id).first()
-        if recipient_user:
-            NotificationService.create_notification(
-                self.db,
-                recipient_id=db_connection.recipient_id,
-                sender_id=db_connection.requester_id,
-                type="CONNECTION_REQUEST",
-                title="New Connection Request!",
-                message=f"{db_connection.requester.username} has paid to connect with you. Accept to chat!",
-                entity_id=db_connection.connection_id,
-                entity_type="connection"
-            )
-        return db_connection
+        # 3. Notify the recipient of a new paid connection request (outbox, same transaction)
+        NotificationService(self.db).enqueue_notification(
+            recipient_id=db_connection.recipient_id,
+            sender_id=db_connection.requester_id,
+            type="CONNECTION_REQUEST",
+            title="New Connection Request!",
+            message=f"{db_connection.requester.username} has paid to connect with you. Accept to chat!",
+            entity_id=db_connection.connection_id,
+            entity_type="connection"
+        )
+        return db_transaction
 
     def handle_recipient_response(self, connection_id: uuid.UUID, recipient_id: uuid.UUID, status_update: ConnectionStatusUpdate) -> Connection:
         """
         Handles the recipient's acceptance or decline of a paid connection.
         """
-        db_connection = self.get_connection(self.db, connection_id)
+        db_connection = self._lock_connection(connection_id, Connection.recipient)
         if not db_connection:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Connection not found")
 
@@ -177,15 +329,14 @@ class ConnectionService:
         if new_status == "ACCEPTED":
             db_connection.status = "ACCEPTED"
             # Create an earning record for the recipient (poster)
-            EarningService.create_earning(
-                self.db,
+            EarningService(self.db).add_earning(
                 user_id=db_connection.recipient_id,
                 connection_id=db_connection.connection_id,
-                amount=db_connection.poster_share # Amount to be earned by poster
+                amount=db_connection.poster_share, # Amount to be earned by poster
+                currency=FEE_CURRENCY
             )
             # Notify requester that their connection was accepted
-            NotificationService.create_notification(
-                self.db,
+            NotificationService(self.db).enqueue_notification(
                 recipient_id=db_connection.requester_id,
                 sender_id=db_connection.recipient_id,
                 type="CONNECTION_ACCEPTED",
@@ -198,8 +349,7 @@ class ConnectionService:
             db_connection.status = "DECLINED"
             # Here, you'd trigger a refund process for the requester
             # (Logic for refunding would go in transaction service)
-            NotificationService.create_notification(
-                self.db,
+            NotificationService(self.db).enqueue_notification(
                 recipient_id=db_connection.requester_id,
                 sender_id=db_connection.recipient_id,
                 type="CONNECTION_DECLINED",
@@ -211,7 +361,14 @@ class ConnectionService:
         else:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid status update for this context.")
 
-        self.db.add(db_connection)
         self.db.commit()
-        self.db.refresh(db_connection)
-        return db_connection
\ No newline at end of file
+        return db_connection
+
+
+
+class AsyncConnectionService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_connection(self, connection_id: uuid.UUID) -> Optional[Connection]:
+        return await self.db.get(Connection, connection_id)
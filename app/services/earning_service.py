@@ -1,9 +1,30 @@
+from collections import defaultdict
+from sqlalchemy import Numeric, bindparam, case, cast, func, select, tuple_, update
 from sqlalchemy.orm import Session
-from app.models.earning import Earning
-from typing import List, Optional
+from app.core.database import dialect_insert
+from app.models.earning import Earning, EarningBalance
+from typing import Dict, List, Optional, Sequence, Tuple
 import uuid
 from decimal import Decimal
 from datetime import datetime
+
+# Earning status -> EarningBalance column it counts towards. CANCELED earnings count towards neither.
+BALANCE_COLUMN_BY_STATUS = {"PENDING_PAYOUT": "pending_payout", "PAID_OUT": "paid_out"}
+
+
+def _balance_sum(status: str):
+    return cast(func.coalesce(func.sum(case((Earning.status == status, Earning.amount), else_=0)), 0), Numeric(12, 2))
+
+
+def balance_totals_statement():
+    """Expected EarningBalance columns aggregated from the raw earnings; group or filter it by user/currency."""
+    return select(
+        Earning.user_id,
+        Earning.currency,
+        *(_balance_sum(status).label(column) for status, column in BALANCE_COLUMN_BY_STATUS.items()),
+    ).group_by(Earning.user_id, Earning.currency)
+
+
 class EarningService:
     def __init__(self, db: Session):
         self.db = db
@@ -14,7 +35,44 @@ class EarningService:
     def get_earnings_by_user(self, user_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[Earning]:
         return self.db.query(Earning).filter(Earning.user_id == user_id).order_by(Earning.created_at.desc()).offset(skip).limit(limit).all()
 
-    def create_earning(self, user_id: uuid.UUID, connection_id: uuid.UUID, amount: Decimal, currency: str = "USD") -> Earning:
+    def get_balances(self, user_id: uuid.UUID) -> List[EarningBalance]:
+        """The user's balance per currency, read from the rollup (a primary-key lookup)."""
+        return self.db.scalars(
+            select(EarningBalance).where(EarningBalance.user_id == user_id).order_by(EarningBalance.currency)
+        ).all()
+
+    def _adjust_balance(self, user_id: uuid.UUID, currency: str, deltas: Dict[str, Decimal]) -> None:
+        """
+        Apply per-column `deltas` to the user's balance in `currency`. Call after the earning rows
+        have been changed (and before commit); the first touch seeds the balance from the raw rows.
+        """
+        deltas = {column: delta for column, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        stmt = (
+            update(EarningBalance)
+            .where(EarningBalance.user_id == user_id, EarningBalance.currency == currency)
+            .values(updated_at=datetime.utcnow(), **{column: getattr(EarningBalance, column) + delta for column, delta in deltas.items()})
+            .execution_options(synchronize_session=False)
+        )
+        if self.db.execute(stmt).rowcount == 0 and not self._seed_balance(user_id, currency):
+            # A concurrent first touch seeded it without seeing our uncommitted change
+            self.db.execute(stmt)
+
+    def _seed_balance(self, user_id: uuid.UUID, currency: str) -> bool:
+        self.db.flush()
+        totals = balance_totals_statement().where(Earning.user_id == user_id, Earning.currency == currency).subquery()
+        values = {
+            "user_id": user_id,
+            "currency": currency,
+            "updated_at": datetime.utcnow(),
+            **{column: select(func.coalesce(totals.c[column], 0)).scalar_subquery() for column in BALANCE_COLUMN_BY_STATUS.values()},
+        }
+        stmt = dialect_insert(self.db, EarningBalance).values(**values).on_conflict_do_nothing(index_elements=["user_id", "currency"])
+        return self.db.execute(stmt).rowcount > 0
+
+    def add_earning(self, user_id: uuid.UUID, connection_id: uuid.UUID, amount: Decimal, currency: str = "USD") -> Earning:
+        """Stage an earning and its balance update in the caller's unit of work; the caller commits."""
         db_earning = Earning(
             user_id=user_id,
             connection_id=connection_id,
@@ -23,19 +81,80 @@ class EarningService:
             status="PENDING_PAYOUT"
         )
         self.db.add(db_earning)
+        self.db.flush()
+        self._adjust_balance(user_id, currency, {"pending_payout": amount})
+        return db_earning
+
+    def create_earning(self, user_id: uuid.UUID, connection_id: uuid.UUID, amount: Decimal, currency: str = "USD") -> Earning:
+        db_earning = self.add_earning(user_id, connection_id, amount, currency=currency)
         self.db.commit()
         self.db.refresh(db_earning)
         return db_earning
 
     def update_earning_status(self, earning_id: uuid.UUID, new_status: str, payout_transaction_id: Optional[uuid.UUID] = None) -> Optional[Earning]:
-        db_earning = self.db.query(Earning).filter(Earning.earning_id == earning_id).first()
+        # Locked so two concurrent status changes can't both move the same amount between balance columns
+        db_earning = self.db.query(Earning).filter(Earning.earning_id == earning_id).with_for_update().first()
         if db_earning:
+            old_status = db_earning.status
             db_earning.status = new_status
             if new_status == "PAID_OUT":
                 db_earning.paid_out_at = datetime.utcnow()
                 db_earning.payout_transaction_id = payout_transaction_id # Link to the actual payout transaction
             self.db.add(db_earning)
+            if new_status != old_status:
+                self.db.flush()
+                deltas = {}
+                if old_status in BALANCE_COLUMN_BY_STATUS:
+                    deltas[BALANCE_COLUMN_BY_STATUS[old_status]] = -db_earning.amount
+                if new_status in BALANCE_COLUMN_BY_STATUS:
+                    deltas[BALANCE_COLUMN_BY_STATUS[new_status]] = deltas.get(BALANCE_COLUMN_BY_STATUS[new_status], 0) + db_earning.amount
+                self._adjust_balance(db_earning.user_id, db_earning.currency, deltas)
             self.db.commit()
             self.db.refresh(db_earning)
             return db_earning
-        return None
\ No newline at end of file
+        return None
+
+    def mark_paid_out(self, earnings: Sequence, payout_transaction_ids: Dict[Tuple[uuid.UUID, str], uuid.UUID]) -> None:
+        """
+        Flip PENDING_PAYOUT `earnings` (rows with earning_id, user_id, currency and amount, locked by the
+        caller) to PAID_OUT, linking each to the payout transaction of its (user_id, currency) group, and
+        move their amounts from pending_payout to paid_out. One batched UPDATE per table; the caller commits.
+        Raises ValueError (the caller rolls back) if any earning is no longer PENDING_PAYOUT.
+        """
+        if not earnings:
+            return
+        earnings_table = Earning.__table__
+        result = self.db.execute(
+            update(earnings_table)
+            .where(earnings_table.c.earning_id == bindparam("b_earning_id"), earnings_table.c.status == "PENDING_PAYOUT")
+            .values(status="PAID_OUT", paid_out_at=datetime.utcnow(), payout_transaction_id=bindparam("b_payout_transaction_id")),
+            [
+                {"b_earning_id": earning.earning_id, "b_payout_transaction_id": payout_transaction_ids[(earning.user_id, earning.currency)]}
+                for earning in earnings
+            ]
+        )
+        if result.rowcount != len(earnings):
+            raise ValueError("Some earnings are no longer PENDING_PAYOUT; they were paid or canceled concurrently.")
+
+        totals = defaultdict(Decimal)
+        for earning in earnings:
+            totals[(earning.user_id, earning.currency)] += earning.amount
+        balances = EarningBalance.__table__
+        seeded = set(self.db.execute(
+            select(balances.c.user_id, balances.c.currency).where(tuple_(balances.c.user_id, balances.c.currency).in_(list(totals)))
+        ).tuples())
+        if seeded:
+            self.db.execute(
+                update(balances)
+                .where(balances.c.user_id == bindparam("b_user_id"), balances.c.currency == bindparam("b_currency"))
+                .values(
+                    pending_payout=balances.c.pending_payout - bindparam("b_amount"),
+                    paid_out=balances.c.paid_out + bindparam("b_amount"),
+                    updated_at=datetime.utcnow(),
+                ),
+                [{"b_user_id": user_id, "b_currency": currency, "b_amount": totals[(user_id, currency)]} for user_id, currency in seeded]
+            )
+        for user_id, currency in totals.keys() - seeded:
+            # Earnings that predate the rollup: seeding reads the flipped rows, so no delta on top
+            if not self._seed_balance(user_id, currency):
+                self._adjust_balance(user_id, currency, {"pending_payout": -totals[(user_id, currency)], "paid_out": totals[(user_id, currency)]})
@@ -0,0 +1,139 @@
+"""
+Reconciliation of the `earning_balances` rollup against the raw `earnings` rows.
+
+Balances are maintained incrementally by EarningService, so a bug, a manual SQL fix
+or a write that bypassed the service would leave them drifting silently. The job
+walks users in chunks of EARNINGS_RECONCILE_CHUNK_SIZE and compares each balance
+with the aggregate of that user's earnings. When repairing, drifted balances are
+locked, recomputed and overwritten in the same transaction, so they cannot race
+concurrent earning writes. Each drift is logged.
+
+Runs every EARNINGS_RECONCILE_INTERVAL_SECONDS in the app, or on demand:
+
+    python -m app.services.earnings_reconciliation [--dry-run]
+"""
+import argparse
+import logging
+import uuid
+from decimal import Decimal
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.earning import Earning, EarningBalance
+from app.models.user import User
+from app.services.earning_service import BALANCE_COLUMN_BY_STATUS, balance_totals_statement
+from app.utils.background import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+BALANCE_COLUMNS = tuple(BALANCE_COLUMN_BY_STATUS.values())
+ZERO = (Decimal("0"),) * len(BALANCE_COLUMNS)
+
+
+class BalanceDrift(NamedTuple):
+    user_id: uuid.UUID
+    currency: str
+    expected: tuple # (pending_payout, paid_out) from the raw earnings
+    actual: Optional[tuple] # From earning_balances; None if the row is missing
+
+
+def _amounts(row) -> tuple:
+    return tuple(Decimal(row[column] or 0).quantize(Decimal("0.01")) for column in BALANCE_COLUMNS)
+
+
+class EarningsReconciliation:
+    def __init__(self, chunk_size: int = settings.EARNINGS_RECONCILE_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.worker: Optional[PeriodicWorker] = None
+
+    def _drift(self, db: Session, user_ids: List[uuid.UUID]) -> List[BalanceDrift]:
+        expected = {
+            (row.user_id, row.currency): _amounts(row._mapping)
+            for row in db.execute(balance_totals_statement().where(Earning.user_id.in_(user_ids)))
+        }
+        actual = {
+            (balance.user_id, balance.currency): _amounts({column: getattr(balance, column) for column in BALANCE_COLUMNS})
+            for balance in db.scalars(select(EarningBalance).where(EarningBalance.user_id.in_(user_ids)))
+        }
+        drifts = []
+        for user_id, currency in sorted(expected.keys() | actual.keys(), key=str):
+            key = (user_id, currency)
+            if key not in expected and actual[key] == ZERO:
+                continue # Zeroed balance whose earnings are gone: harmless
+            if expected.get(key) != actual.get(key):
+                drifts.append(BalanceDrift(user_id, currency, expected.get(key, ZERO), actual.get(key)))
+        return drifts
+
+    def _repair(self, db: Session, drift: BalanceDrift) -> None:
+        """Overwrite one balance with its recomputed value, under a row lock."""
+        key = (EarningBalance.user_id == drift.user_id, EarningBalance.currency == drift.currency)
+        balance = db.scalars(select(EarningBalance).where(*key).with_for_update()).first()
+        totals = db.execute(
+            balance_totals_statement().where(Earning.user_id == drift.user_id, Earning.currency == drift.currency)
+        ).first()
+        if totals is None:
+            if balance is not None:
+                db.delete(balance) # No earnings left in this currency
+            return
+        if balance is None:
+            balance = EarningBalance(user_id=drift.user_id, currency=drift.currency)
+            db.add(balance)
+        for column, amount in zip(BALANCE_COLUMNS, _amounts(totals._mapping)):
+            setattr(balance, column, amount)
+
+    def reconcile(self, db: Session, repair: bool = True) -> List[BalanceDrift]:
+        """Check every user's balances, one transaction per chunk of users. Returns the drift found."""
+        found, last_user_id = [], None
+        while True:
+            stmt = select(User.user_id).order_by(User.user_id).limit(self.chunk_size)
+            if last_user_id is not None:
+                stmt = stmt.where(User.user_id > last_user_id)
+            user_ids = db.scalars(stmt).all()
+            if not user_ids:
+                return found
+            last_user_id = user_ids[-1]
+            try:
+                drifts = self._drift(db, user_ids)
+                for drift in drifts:
+                    logger.warning("Earning balance drift for user %s (%s): expected %s, found %s",
+                                   drift.user_id, drift.currency, drift.expected, drift.actual)
+                    if repair:
+                        self._repair(db, drift)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            found.extend(drifts)
+
+
+earnings_reconciliation = EarningsReconciliation()
+
+
+def reconcile_earnings() -> None:
+    db = SessionLocal()
+    try:
+        earnings_reconciliation.reconcile(db)
+    finally:
+        db.close()
+
+
+earnings_reconciliation.worker = PeriodicWorker(
+    "earnings-reconciliation", settings.EARNINGS_RECONCILE_INTERVAL_SECONDS, reconcile_earnings, run_on_stop=False
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify earning_balances against the raw earnings.")
+    parser.add_argument("--dry-run", action="store_true", help="report drift without repairing it")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        drifts = earnings_reconciliation.reconcile(db, repair=not args.dry_run)
+    finally:
+        db.close()
+    print(f"{len(drifts)} drifted balance(s){'' if args.dry_run else ' repaired'}")
@@ -1,11 +1,16 @@
-
 from fastapi import HTTPException, status
 from app.models.flirt import Flirt
 from app.schemas.flirt import FlirtCreate, FlirtResponse
+from sqlalchemy import bindparam, delete, select, update
 from sqlalchemy.orm import Session
+from collections import Counter
+from datetime import datetime
 from typing import List, Optional
 import uuid
 from app.models.moment import Moment
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.services.trending_service import trending_engine
 
 class FlirtService:
     def __init__(self, db: Session):
@@ -20,45 +25,80 @@ class FlirtService:
     def get_flirts_by_user(self, user_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[Flirt]:
         return self.db.query(Flirt).filter(Flirt.flirter_id == user_id).offset(skip).limit(limit).all()
 
+    def _insert_ignoring_duplicates(self):
+        """INSERT ... ON CONFLICT DO NOTHING on the `_flirter_moment_uc` columns, for backends that support it."""
+        return dialect_insert(self.db, Flirt).on_conflict_do_nothing(index_elements=["flirter_id", "moment_id"])
+
+    def _record_flirts(self, flirter_id: uuid.UUID, moment_ids: List[uuid.UUID]) -> List[Flirt]:
+        """
+        Insert flirts and bump each moment's flirt_count in one transaction.
+        Duplicates are skipped by the unique constraint; only newly recorded flirts are returned.
+        """
+        now = datetime.utcnow()
+        rows = [
+            {"flirt_id": uuid.uuid4(), "flirter_id": flirter_id, "moment_id": moment_id, "created_at": now}
+            for moment_id in dict.fromkeys(moment_ids)
+        ]
+        created = self.db.scalars(self._insert_ignoring_duplicates().returning(Flirt), rows).all()
+        increments = Counter(flirt.moment_id for flirt in created)
+        if increments:
+            moments = Moment.__table__
+            self.db.execute(
+                update(moments)
+                .where(moments.c.moment_id == bindparam("b_moment_id"))
+                .values(flirt_count=moments.c.flirt_count + bindparam("b_count")),
+                [{"b_moment_id": moment_id, "b_count": count} for moment_id, count in increments.items()]
+            )
+            # Only PUBLIC moments can trend; others would hold top-K slots the feed never serves
+            public = set(self.db.scalars(
+                select(Moment.moment_id).where(Moment.moment_id.in_(increments), Moment.visibility == "PUBLIC")
+            ))
+        # RETURNING already gave us the full rows; detach them so the commit doesn't expire them
+        for flirt in created:
+            self.db.expunge(flirt)
+        self.db.commit()
+
+        for moment_id, count in increments.items():
+            if moment_id in public:
+                trending_engine.record(moment_id, count * settings.TRENDING_FLIRT_WEIGHT)
+        return created
+
     def create_flirt(self, flirter_id: uuid.UUID, moment_id: uuid.UUID) -> Flirt:
-        # Check for existing flirt to enforce unique constraint
-        existing_flirt = self.db.query(Flirt).filter(
+        created = self._record_flirts(flirter_id, [moment_id])
+        if created:
+            return created[0]
+        # Already flirted: return the existing flirt
+        return self.db.query(Flirt).filter(
             Flirt.flirter_id == flirter_id,
             Flirt.moment_id == moment_id
         ).first()
-        if existing_flirt:
-            return existing_flirt # Return existing if already flirted
 
-        db_flirt = Flirt(
-            flirter_id=flirter_id,
-            moment_id=moment_id
-        )
-        self.db.add(db_flirt)
-        self.db.commit()
-        self.db.refresh(db_flirt)
-
-        # Increment flirt_count on the Moment
-        moment = self.db.query(Moment).filter(Moment.moment_id == moment_id).first()
-        if moment:
-            moment.flirt_count += 1
-            self.db.add(moment)
-            self.db.commit()
-            self.db.refresh(moment)
-
-        return db_flirt
+    def create_flirts(self, flirter_id: uuid.UUID, moment_ids: List[uuid.UUID]) -> List[Flirt]:
+        """Flirt with many moments at once. Returns only the flirts that did not exist yet."""
+        moment_ids = list(dict.fromkeys(moment_ids))
+        authors = dict(self.db.query(Moment.moment_id, Moment.user_id).filter(Moment.moment_id.in_(moment_ids)).all())
+        missing = [str(moment_id) for moment_id in moment_ids if moment_id not in authors]
+        if missing:
+            raise ValueError(f"Moments not found: {', '.join(missing)}")
+        if flirter_id in authors.values():
+            raise ValueError("Cannot flirt with your own moment.")
+        return self._record_flirts(flirter_id, moment_ids)
 
     def delete_flirt(self, flirt_id: uuid.UUID) -> bool:
-        db_flirt = self.db.query(Flirt).filter(Flirt.flirt_id == flirt_id).first()
-        if db_flirt:
-            # Decrement flirt_count on the Moment
-            moment = self.db.query(Moment).filter(Moment.moment_id == db_flirt.moment_id).first()
-            if moment and moment.flirt_count > 0:
-                moment.flirt_count -= 1
-                self.db.add(moment)
-                self.db.commit()
-                self.db.refresh(moment)
+        moment_id = self.db.execute(
+            delete(Flirt).where(Flirt.flirt_id == flirt_id).returning(Flirt.moment_id)
+        ).scalar_one_or_none()
+        if moment_id is None:
+            self.db.rollback()
+            return False
 
-            self.db.delete(db_flirt)
-            self.db.commit()
-            return True
-        return False
\ No newline at end of file
+        # Decrement flirt_count on the Moment in the same transaction
+        self.db.execute(
+            update(Moment)
+            .where(Moment.moment_id == moment_id, Moment.flirt_count > 0)
+            .values(flirt_count=Moment.flirt_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        trending_engine.record(moment_id, -settings.TRENDING_FLIRT_WEIGHT)
+        return True
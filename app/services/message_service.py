@@ -1,10 +1,99 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core.database import dialect_insert
+from datetime import datetime
 from app.models.message import Message
+from app.models.message_read import MessageReadWatermark
 from app.models.connection import Connection # To check connection status
-from app.schemas.message import MessageCreate
-from typing import List, Optional
+from app.models.user import User
+from app.services.notification_service import NotificationService
+from app.services.connection_service import ConnectionService
+from app.schemas.message import MessageCreate, MessageResponse
+from app.core.pubsub import broker, user_channel
+from app.utils.pagination import encode_cursor, keyset_filter
+from typing import List, Optional, Tuple
 import uuid
 
+
+def _history_statement(connection_id: uuid.UUID, limit: int, cursor: Optional[str], since: Optional[str]):
+    """
+    Keyset query over ix_messages_connection_created. History mode walks backwards from
+    `cursor` (or the newest message); delta mode walks forwards from `since`, continuing
+    from `cursor` on later pages. Fetches one row past `limit` to tell whether a next page exists.
+    """
+    stmt = select(Message).where(Message.connection_id == connection_id)
+    if since:
+        stmt = stmt.where(keyset_filter(Message.created_at, Message.message_id, since, descending=False))
+        if cursor:
+            stmt = stmt.where(keyset_filter(Message.created_at, Message.message_id, cursor, descending=False))
+        order = (Message.created_at, Message.message_id)
+    else:
+        if cursor:
+            stmt = stmt.where(keyset_filter(Message.created_at, Message.message_id, cursor))
+        order = (Message.created_at.desc(), Message.message_id.desc())
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def _history_page(messages: List[Message], limit: int, cursor: Optional[str], since: Optional[str]) -> Tuple[List[Message], Optional[str], Optional[str]]:
+    """
+    Returns the page in chronological order, the cursor for the next page (older messages in
+    history mode, further new ones in delta mode) and the sync cursor for the next `since`.
+    """
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if not since:
+        messages = messages[::-1]
+    next_cursor = None
+    if has_more:
+        edge = messages[-1] if since else messages[0]
+        next_cursor = encode_cursor(edge.created_at, edge.message_id)
+    if messages:
+        sync_cursor = encode_cursor(messages[-1].created_at, messages[-1].message_id)
+    else:
+        sync_cursor = (cursor or since) if since else None
+    return messages, next_cursor, sync_cursor
+
+
+def _watermarks_statement(connection_id: uuid.UUID):
+    return select(MessageReadWatermark).where(MessageReadWatermark.connection_id == connection_id)
+
+
+def _apply_read_state(messages: List[Message], watermarks: List[MessageReadWatermark]) -> List[Message]:
+    """
+    Derive `is_read` from the recipient's watermark. Values are set as committed state, so
+    nothing is written back. Rows flagged by the old per-message endpoint stay read.
+    """
+    for message in messages:
+        read = message.is_read or any(
+            watermark.user_id != message.sender_id
+            and (message.created_at, message.message_id) <= (watermark.last_read_at, watermark.last_read_message_id)
+            for watermark in watermarks
+        )
+        set_committed_value(message, "is_read", read)
+    return messages
+
+
+def _after_watermark(watermark: Optional[MessageReadWatermark]):
+    if watermark is None:
+        return True
+    return or_(
+        Message.created_at > watermark.last_read_at,
+        and_(Message.created_at == watermark.last_read_at, Message.message_id > watermark.last_read_message_id),
+    )
+
+
+def _unread_count_statement(connection_id: uuid.UUID, user_id: uuid.UUID, watermark: Optional[MessageReadWatermark]):
+    """Messages from the other party past the reader's watermark; a range scan on ix_messages_connection_created."""
+    return select(func.count()).select_from(Message).where(
+        Message.connection_id == connection_id,
+        Message.sender_id != user_id,
+        Message.is_read == False,
+        _after_watermark(watermark),
+    )
+
+
 class MessageService:
     def __init__(self, db: Session):
         self.db = db
@@ -12,8 +101,12 @@ class MessageService:
     def get_message(self, message_id: uuid.UUID) -> Optional[Message]:
         return self.db.query(Message).filter(Message.message_id == message_id).first()
 
-    def get_messages_by_connection(self, connection_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[Message]:
-        return self.db.query(Message).filter(Message.connection_id == connection_id).order_by(Message.created_at).offset(skip).limit(limit).all()
+    def get_messages_by_connection(
+        self, connection_id: uuid.UUID, limit: int = 100, cursor: Optional[str] = None, since: Optional[str] = None
+    ) -> Tuple[List[Message], Optional[str], Optional[str]]:
+        messages = self.db.scalars(_history_statement(connection_id, limit, cursor, since)).all()
+        _apply_read_state(messages, self.db.scalars(_watermarks_statement(connection_id)).all())
+        return _history_page(messages, limit, cursor, since)
 
     def create_message(self, message_in: MessageCreate, sender_id: uuid.UUID) -> Message:
         # Ensure the connection exists and is in an 'ACCEPTED' state
@@ -35,16 +128,118 @@ class MessageService:
             text_content=message_in.text_content
         )
         self.db.add(db_message)
+        self.db.flush()
+        ConnectionService(self.db).record_last_message(connection.connection_id, db_message.message_id, db_message.created_at)
+
+        # Notify the other party; delivered by the outbox dispatcher, committed together with the message
+        sender = self.db.get(User, sender_id)
+        NotificationService(self.db).enqueue_notification(
+            recipient_id=connection.requester_id if connection.recipient_id == sender_id else connection.recipient_id,
+            sender_id=sender_id,
+            type="NEW_MESSAGE",
+            title="New Message",
+            message=f"You have a new message from {sender.username}.",
+            # Keyed on the conversation so a burst of messages coalesces into one notification
+            entity_id=connection.connection_id,
+            entity_type="connection"
+        )
         self.db.commit()
         self.db.refresh(db_message)
+
+        # Push to both parties' open sockets; the sender's other devices stay in sync too
+        event = {"type": "message", "data": MessageResponse.model_validate(db_message).model_dump(mode="json")}
+        for user_id in (connection.requester_id, connection.recipient_id):
+            broker.publish(user_channel(user_id), event)
         return db_message
 
-    def mark_message_as_read(self, message_id: uuid.UUID) -> Optional[Message]:
-        db_message = self.db.query(Message).filter(Message.message_id == message_id).first()
-        if db_message and not db_message.is_read:
-            db_message.is_read = True
-            self.db.add(db_message)
-            self.db.commit()
-            self.db.refresh(db_message)
-            return db_message
-        return None
\ No newline at end of file
+    def get_watermark(self, connection_id: uuid.UUID, user_id: uuid.UUID) -> Optional[MessageReadWatermark]:
+        return self.db.get(MessageReadWatermark, (user_id, connection_id))
+
+    def get_unread_count(self, connection_id: uuid.UUID, user_id: uuid.UUID) -> int:
+        watermark = self.get_watermark(connection_id, user_id)
+        return self.db.scalar(_unread_count_statement(connection_id, user_id, watermark))
+
+    def _upsert_watermark(self, values: dict):
+        """INSERT ... ON CONFLICT DO UPDATE that only ever moves a watermark forward."""
+        stmt = dialect_insert(self.db, MessageReadWatermark).values(**values)
+        current, proposed = MessageReadWatermark, stmt.excluded
+        return stmt.on_conflict_do_update(
+            index_elements=["user_id", "connection_id"],
+            set_={
+                "last_read_message_id": proposed.last_read_message_id,
+                "last_read_at": proposed.last_read_at,
+                "updated_at": proposed.updated_at,
+            },
+            where=or_(
+                current.last_read_at < proposed.last_read_at,
+                and_(current.last_read_at == proposed.last_read_at, current.last_read_message_id < proposed.last_read_message_id),
+            ),
+        )
+
+    def mark_read_up_to(self, connection_id: uuid.UUID, user_id: uuid.UUID, message_id: Optional[uuid.UUID] = None) -> MessageReadWatermark:
+        """
+        Mark everything in the connection up to `message_id` (default: the newest message) as read
+        by `user_id`, with a single upsert. Watermarks never move backwards.
+        """
+        connection = self.db.get(Connection, connection_id)
+        if not connection:
+            raise ValueError("Connection not found.")
+        if user_id not in [connection.requester_id, connection.recipient_id]:
+            raise ValueError("User is not part of this connection.")
+
+        stmt = select(Message.message_id, Message.created_at).where(Message.connection_id == connection_id)
+        if message_id:
+            stmt = stmt.where(Message.message_id == message_id)
+        else:
+            stmt = stmt.order_by(Message.created_at.desc(), Message.message_id.desc()).limit(1)
+        target = self.db.execute(stmt).first()
+        if target is None:
+            raise ValueError("Message not found in this connection." if message_id else "No messages to mark as read.")
+
+        self.db.execute(self._upsert_watermark({
+            "user_id": user_id,
+            "connection_id": connection_id,
+            "last_read_message_id": target.message_id,
+            "last_read_at": target.created_at,
+            "updated_at": datetime.utcnow(),
+        }))
+        self.db.commit()
+        return self.db.get(MessageReadWatermark, (user_id, connection_id), populate_existing=True)
+
+    def mark_message_as_read(self, message_id: uuid.UUID, reader_id: uuid.UUID) -> Optional[Message]:
+        """
+        Compatibility path for marking a single message: advances the reader's watermark to it.
+        Returns None if the message is unknown or already read.
+        """
+        db_message = self.get_message(message_id)
+        if not db_message:
+            return None
+        _apply_read_state([db_message], [w for w in [self.get_watermark(db_message.connection_id, reader_id)] if w])
+        if db_message.is_read:
+            return None
+        self.mark_read_up_to(db_message.connection_id, reader_id, message_id)
+        self.db.refresh(db_message)
+        set_committed_value(db_message, "is_read", True)
+        return db_message
+
+
+
+class AsyncMessageService:
+    """Read paths of MessageService for endpoints running on the event loop. Senders are eager-loaded."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_message(self, message_id: uuid.UUID) -> Optional[Message]:
+        return (await self.db.scalars(
+            select(Message).options(selectinload(Message.sender)).where(Message.message_id == message_id)
+        )).first()
+
+    async def get_messages_by_connection(
+        self, connection_id: uuid.UUID, limit: int = 100, cursor: Optional[str] = None, since: Optional[str] = None
+    ) -> Tuple[List[Message], Optional[str], Optional[str]]:
+        messages = (await self.db.scalars(
+            _history_statement(connection_id, limit, cursor, since).options(selectinload(Message.sender))
+        )).all()
+        _apply_read_state(messages, (await self.db.scalars(_watermarks_statement(connection_id))).all())
+        return _history_page(messages, limit, cursor, since)
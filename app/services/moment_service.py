@@ -1,10 +1,38 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.models.moment import Moment
 from app.models.media import Media
 from app.schemas.moment import MomentCreate, MomentUpdate
-from typing import List, Optional
+from app.services.timeline_service import TimelineService
+from app.services.trending_service import trending_engine
+from app.utils.pagination import encode_cursor, keyset_filter
+from typing import List, Optional, Tuple
 import uuid
 
+
+# Statement builders shared by MomentService and AsyncMomentService
+def _moment_with_relations():
+    return select(Moment).options(joinedload(Moment.author), selectinload(Moment.media))
+
+def _public_feed_statement(limit: int, cursor: Optional[str]):
+    stmt = _moment_with_relations().where(Moment.visibility == "PUBLIC")
+    if cursor:
+        stmt = stmt.where(keyset_filter(Moment.created_at, Moment.moment_id, cursor))
+    # Fetch one extra row to know whether another page exists
+    return stmt.order_by(Moment.created_at.desc(), Moment.moment_id.desc()).limit(limit + 1)
+
+def _feed_page(moments: List[Moment], limit: int) -> Tuple[List[Moment], Optional[str]]:
+    if len(moments) > limit:
+        moments = moments[:limit]
+        return moments, encode_cursor(moments[-1].created_at, moments[-1].moment_id)
+    return moments, None
+
+def _in_rank_order(moments: List[Moment], ranked_ids: List[uuid.UUID]) -> List[Moment]:
+    by_id = {moment.moment_id: moment for moment in moments}
+    return [by_id[moment_id] for moment_id in ranked_ids if moment_id in by_id]
+
+
 class MomentService:
     def __init__(self, db: Session):
         self.db = db
@@ -30,6 +58,9 @@ class MomentService:
                 media.moment_id = new_moment.moment_id
                 self.db.add(media)  # Optional, since already in session
 
+        # 3. Fan out to followers' home timelines in the same transaction
+        TimelineService(self.db).fan_out_moment(new_moment)
+
         self.db.commit()
         self.db.refresh(new_moment)
         return new_moment
@@ -38,12 +69,22 @@ class MomentService:
         moment = self.get_moment(moment_id)
         if not moment:
             return None
-        
+
+        was_public = moment.visibility == "PUBLIC"
         for key, value in moment_data.model_dump(exclude_unset=True).items():
             setattr(moment, key, value)
-        
+
+        # Keep home timelines in step with visibility changes, in the same transaction
+        is_public = moment.visibility == "PUBLIC"
+        if is_public and not was_public:
+            TimelineService(self.db).fan_out_moment(moment)
+        elif was_public and not is_public:
+            TimelineService(self.db).remove_moment(moment_id)
+
         self.db.commit()
         self.db.refresh(moment)
+        if moment.visibility != "PUBLIC":
+            trending_engine.remove(moment_id)
         return moment
     
     def delete_moment(self, moment_id: uuid.UUID) -> bool:
@@ -53,20 +94,62 @@ class MomentService:
         
         # Delete associated media
         self.db.query(Media).filter(Media.moment_id == moment_id).delete()
+
+        # Remove it from every home timeline
+        TimelineService(self.db).remove_moment(moment_id)
         
         # Delete the moment itself
         self.db.delete(moment)
         self.db.commit()
+        trending_engine.remove(moment_id)
         return True
     
     def get_user_moments(self, user_id: uuid.UUID) -> List[Moment]:
         return self.db.query(Moment).filter(Moment.user_id == user_id).all()
     
-    def get_public_moments(self) -> List[Moment]:
-        return self.db.query(Moment).filter().all()
+    def get_public_moments(self, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Moment], Optional[str]]:
+        """
+        Returns one page of the public feed, newest first, and the cursor for the next page.
+        Authors and media are loaded in a constant number of queries regardless of page size.
+        """
+        moments = self.db.scalars(_public_feed_statement(limit, cursor)).all()
+        return _feed_page(moments, limit)
     
     def get_moments_by_ids(self, moment_ids: List[uuid.UUID]) -> List[Moment]:
         return self.db.query(Moment).filter(Moment.moment_id.in_(moment_ids)).all()
+
+    def get_trending_moments(self, limit: int = 20) -> List[Moment]:
+        """Top trending PUBLIC moments, best first, served from the in-memory trending engine."""
+        ranked_ids = [moment_id for moment_id, _ in trending_engine.top(limit)]
+        if not ranked_ids:
+            return []
+        moments = self.db.scalars(
+            _moment_with_relations().where(Moment.moment_id.in_(ranked_ids), Moment.visibility == "PUBLIC")
+        ).all()
+        return _in_rank_order(moments, ranked_ids)
     
     def get_moment_by_slug(self, slug: str) -> Optional[Moment]:
-        return self.db.query(Moment).filter(Moment.slug == slug).first()
\ No newline at end of file
+        return self.db.query(Moment).filter(Moment.slug == slug).first()
+
+
+class AsyncMomentService:
+    """Read paths of MomentService for endpoints running on the event loop. Relationships are always eager-loaded."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_moment(self, moment_id: uuid.UUID) -> Optional[Moment]:
+        return (await self.db.scalars(_moment_with_relations().where(Moment.moment_id == moment_id))).first()
+
+    async def get_public_moments(self, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Moment], Optional[str]]:
+        moments = (await self.db.scalars(_public_feed_statement(limit, cursor))).all()
+        return _feed_page(moments, limit)
+
+    async def get_trending_moments(self, limit: int = 20) -> List[Moment]:
+        ranked_ids = [moment_id for moment_id, _ in trending_engine.top(limit)]
+        if not ranked_ids:
+            return []
+        moments = (await self.db.scalars(
+            _moment_with_relations().where(Moment.moment_id.in_(ranked_ids), Moment.visibility == "PUBLIC")
+        )).all()
+        return _in_rank_order(moments, ranked_ids)
@@ -1,8 +1,99 @@
+"""
+Monetization configs and their in-process cache.
+
+Configs change a few times a month but are read on every connection request and
+every client fee display. Each worker keeps a snapshot of the active configs,
+keyed by `config_name`. Every write through MonetisationConfigService bumps the
+"monetization" row in `config_versions` in the same transaction. A background
+worker polls that version every MONETIZATION_CONFIG_REFRESH_SECONDS and reloads on
+change, so other workers see a change within that window and the writing worker
+sees it immediately. Reads never touch the database once the snapshot is loaded.
+"""
+import threading
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional
+import uuid
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.models.config_version import ConfigVersion
 from app.models.monetisation_config import MonetizationConfig
 from app.schemas.monetisation import MonetizationConfigBase, MonetizationConfigResponse
-from typing import List, Optional
-import uuid
+from app.utils.background import PeriodicWorker
+
+CONFIG_VERSION_NAME = "monetization"
+
+
+class FeeSchedule(NamedTuple):
+    connection_fee_base: Decimal
+    platform_cut_percentage: Decimal
+    poster_share_percentage: Decimal
+
+
+class MonetizationConfigCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._fees: Dict[str, FeeSchedule] = {}
+        self._active: List[MonetizationConfigResponse] = []
+        self.worker: Optional[PeriodicWorker] = None
+
+    def refresh(self, db: Session, force: bool = False) -> bool:
+        """Reload the snapshot if the stored version moved (or `force`). Returns whether it reloaded."""
+        version = db.scalar(select(ConfigVersion.version).where(ConfigVersion.name == CONFIG_VERSION_NAME)) or 0
+        if not force and version == self._version:
+            return False
+        configs = db.scalars(
+            select(MonetizationConfig).where(MonetizationConfig.is_active == True).order_by(MonetizationConfig.config_name)
+        ).all()
+        fees = {
+            config.config_name: FeeSchedule(config.connection_fee_base, config.platform_cut_percentage, config.poster_share_percentage)
+            for config in configs
+        }
+        active = [MonetizationConfigResponse.model_validate(config) for config in configs]
+        with self._lock:
+            self._version, self._fees, self._active = version, fees, active
+        return True
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if self._version is None:
+            self.refresh(db, force=True)
+
+    def fee_schedule(self, db: Session, config_name: str) -> Optional[FeeSchedule]:
+        self._ensure_loaded(db)
+        return self._fees.get(config_name)
+
+    def active_configs(self, db: Session) -> List[MonetizationConfigResponse]:
+        self._ensure_loaded(db)
+        return self._active
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version = None
+
+    def stats(self):
+        return {"version": self._version, "configs": len(self._fees)}
+
+
+monetization_config_cache = MonetizationConfigCache()
+
+
+def refresh_monetization_configs() -> None:
+    db = SessionLocal()
+    try:
+        monetization_config_cache.refresh(db)
+    finally:
+        db.close()
+
+
+monetization_config_cache.worker = PeriodicWorker(
+    "monetization-config-refresh", settings.MONETIZATION_CONFIG_REFRESH_SECONDS, refresh_monetization_configs
+)
+
 
 class MonetisationConfigService:
     def __init__(self, db: Session):
@@ -14,31 +105,47 @@ class MonetisationConfigService:
     def get_monetization_config_by_name(self, name: str) -> Optional[MonetizationConfig]:
         return self.db.query(MonetizationConfig).filter(MonetizationConfig.config_name == name).first()
 
+    def get_monetization_configs(self) -> List[MonetizationConfig]:
+        return self.db.query(MonetizationConfig).all()
+
     def get_active_monetization_configs(self) -> List[MonetizationConfig]:
         return self.db.query(MonetizationConfig).filter(MonetizationConfig.is_active == True).all()
 
-    def create_monetization_config(self, config_in: MonetizationConfigBase) -> MonetizationConfig:
-        db_config = MonetizationConfig(**config_in.model_dump())
-        self.db.add(db_config)
+    def _bump_version(self) -> None:
+        """Increment the monetization config version in the caller's transaction."""
+        values = {"name": CONFIG_VERSION_NAME, "version": 1, "updated_at": datetime.utcnow()}
+        stmt = dialect_insert(self.db, ConfigVersion).values(**values)
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"version": ConfigVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+        ))
+
+    def _commit_change(self, db_config: MonetizationConfig) -> MonetizationConfig:
+        self._bump_version()
         self.db.commit()
         self.db.refresh(db_config)
+        # This worker sees the change at once; others within MONETIZATION_CONFIG_REFRESH_SECONDS
+        monetization_config_cache.invalidate()
         return db_config
 
+    def create_monetization_config(self, config_in: MonetizationConfigBase) -> MonetizationConfig:
+        db_config = MonetizationConfig(**config_in.model_dump())
+        self.db.add(db_config)
+        return self._commit_change(db_config)
+
     def update_monetization_config(self, db_config: MonetizationConfig, config_in: MonetizationConfigBase) -> MonetizationConfig:
         update_data = config_in.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_config, key, value)
+        db_config.updated_at = datetime.utcnow()
         self.db.add(db_config)
-        self.db.commit()
-        self.db.refresh(db_config)
-        return db_config
+        return self._commit_change(db_config)
 
     def deactivate_monetization_config(self, config_id: uuid.UUID) -> Optional[MonetizationConfig]:
         db_config = self.db.query(MonetizationConfig).filter(MonetizationConfig.config_id == config_id).first()
         if db_config:
             db_config.is_active = False
+            db_config.updated_at = datetime.utcnow()
             self.db.add(db_config)
-            self.db.commit()
-            self.db.refresh(db_config)
-            return db_config
-        return None
\ No newline at end of file
+            return self._commit_change(db_config)
+        return None
@@ -0,0 +1,141 @@
+"""
+Background delivery of notifications written to the outbox.
+
+Request paths only add a NotificationOutbox row inside their own transaction
+(`NotificationService.enqueue_notification`), so a chat message or payment costs
+no extra commit. The dispatcher drains the outbox in batches: it drops intents
+the recipient has switched off in UserSettings, bulk-inserts the rest into
+`notifications`, bumps unread counters and deletes the processed outbox rows, all
+in one transaction per batch. A failed batch is rolled back and retried on the
+next run, so intents are never lost or delivered twice.
+"""
+import uuid
+from typing import Dict, FrozenSet, Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.notification import NotificationOutbox
+from app.models.user_settings import UserSettings
+from app.services.notification_service import NotificationService
+from app.utils.background import PeriodicWorker
+from app.utils.cache import TTLCache
+
+# Notification type -> UserSettings flag that controls it. Types not listed are always delivered.
+PREFERENCE_BY_TYPE = {
+    "NEW_FLIRT": "notify_new_flirt",
+    "CONNECTION_REQUEST": "notify_connection_request",
+    "CONNECTION_ACCEPTED": "notify_connection_accepted",
+    "NEW_MESSAGE": "notify_new_message",
+    "EARNING_PAID": "notify_earning_paid",
+}
+
+
+class NotificationPreferences:
+    """Cache of the notification types each user has muted, loaded in one query per batch of misses."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def muted_types(self, db: Session, user_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, FrozenSet[str]]:
+        muted, misses = {}, []
+        for user_id in set(user_ids):
+            cached = self._cache.get(user_id)
+            if cached is None:
+                misses.append(user_id)
+            else:
+                muted[user_id] = cached
+        if misses:
+            loaded = {user_id: frozenset() for user_id in misses} # No settings row: defaults are all on
+            for user_settings in db.scalars(select(UserSettings).where(UserSettings.user_id.in_(misses))):
+                loaded[user_settings.user_id] = frozenset(
+                    type for type, flag in PREFERENCE_BY_TYPE.items() if not getattr(user_settings, flag)
+                )
+            for user_id, types in loaded.items():
+                self._cache.set(user_id, types)
+            muted.update(loaded)
+        return muted
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        self._cache.pop(user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+notification_preferences = NotificationPreferences(
+    settings.NOTIFICATION_PREFERENCES_CACHE_SIZE, settings.NOTIFICATION_PREFERENCES_CACHE_TTL_SECONDS
+)
+
+
+class NotificationDispatcher:
+    def __init__(self, batch_size: int = settings.NOTIFICATION_DISPATCH_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.worker: Optional[PeriodicWorker] = None
+
+    def dispatch_batch(self, db: Session) -> int:
+        """Deliver up to `batch_size` outbox entries in one transaction. Returns how many were processed."""
+        entries = db.scalars(
+            select(NotificationOutbox)
+            .order_by(NotificationOutbox.outbox_id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True) # Lets several workers drain the outbox concurrently on Postgres
+        ).all()
+        if not entries:
+            return 0
+
+        muted = notification_preferences.muted_types(db, (entry.recipient_id for entry in entries))
+        notification_service = NotificationService(db)
+        try:
+            notification_ids = notification_service.create_notifications([
+                {
+                    "recipient_id": entry.recipient_id,
+                    "sender_id": entry.sender_id,
+                    "type": entry.type,
+                    "title": entry.title,
+                    "message": entry.message,
+                    "entity_id": entry.entity_id,
+                    "entity_type": entry.entity_type,
+                    "created_at": entry.created_at,
+                }
+                for entry in entries if entry.type not in muted[entry.recipient_id]
+            ])
+            db.execute(delete(NotificationOutbox).where(
+                NotificationOutbox.outbox_id.in_([entry.outbox_id for entry in entries])
+            ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        notification_service.publish_notifications(notification_ids)
+        return len(entries)
+
+    def dispatch(self, db: Session) -> int:
+        """Drain the outbox. Returns the number of entries processed."""
+        total = 0
+        while True:
+            processed = self.dispatch_batch(db)
+            total += processed
+            if processed < self.batch_size:
+                return total
+
+
+notification_dispatcher = NotificationDispatcher()
+
+
+def dispatch_notifications() -> None:
+    db = SessionLocal()
+    try:
+        notification_dispatcher.dispatch(db)
+    finally:
+        db.close()
+
+
+notification_dispatcher.worker = PeriodicWorker(
+    "notification-dispatch", settings.NOTIFICATION_DISPATCH_INTERVAL_SECONDS, dispatch_notifications
+)
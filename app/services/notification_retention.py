@@ -0,0 +1,182 @@
+"""
+Retention for the notifications table.
+
+Read notifications whose `last_occurred_at` is older than
+NOTIFICATION_READ_RETENTION_DAYS are deleted in chunks of
+NOTIFICATION_PURGE_CHUNK_SIZE, one short transaction per chunk, so the purge
+never holds locks for long. Unread notifications are never touched, so unread
+counters and badges are unaffected.
+
+With NOTIFICATION_PARTITIONING on Postgres, the table is range-partitioned by
+month of `created_at` (set when the table is first created). The worker keeps
+partitions for the coming months in place, with a DEFAULT partition as a
+safety net. Rows that landed in DEFAULT (e.g. while the worker was down) are moved
+into their month's partition when it is created. Once a month's partition holds only
+expired read rows, it is dropped whole instead of being purged row by row. Partition
+maintenance failures are logged and never stop the row-by-row purge.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.notification import Notification
+from app.utils.background import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "notifications_p" # notifications_p202401 holds January 2024
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    years, month = divmod(moment.month - 1 + months, 12)
+    return datetime(moment.year + years, month + 1, 1)
+
+
+class NotificationRetention:
+    def __init__(
+        self,
+        retention_days: Optional[int] = settings.NOTIFICATION_READ_RETENTION_DAYS,
+        chunk_size: int = settings.NOTIFICATION_PURGE_CHUNK_SIZE,
+        months_ahead: int = settings.NOTIFICATION_PARTITION_MONTHS_AHEAD,
+    ):
+        self.retention_days = retention_days
+        self.chunk_size = chunk_size
+        self.months_ahead = months_ahead
+        self.worker: Optional[PeriodicWorker] = None
+
+    def cutoff(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        if self.retention_days is None:
+            return None
+        return (now or datetime.utcnow()) - timedelta(days=self.retention_days)
+
+    def purge_read(self, db: Session, cutoff: datetime) -> int:
+        """Delete expired read notifications, one chunk per transaction. Returns the number deleted."""
+        total = 0
+        while True:
+            ids = db.scalars(
+                select(Notification.notification_id)
+                .where(Notification.is_read == True, Notification.last_occurred_at < cutoff)
+                .limit(self.chunk_size)
+            ).all()
+            if not ids:
+                return total
+            db.execute(
+                delete(Notification).where(Notification.notification_id.in_(ids)).execution_options(synchronize_session=False)
+            )
+            db.commit()
+            total += len(ids)
+            if len(ids) < self.chunk_size:
+                return total
+
+    @staticmethod
+    def is_partitioned(db: Session) -> bool:
+        return settings.NOTIFICATION_PARTITIONING and db.get_bind().dialect.name == "postgresql"
+
+    def ensure_partitions(self, db: Session, now: Optional[datetime] = None) -> None:
+        """
+        Create this month's partition, the next `months_ahead` and the DEFAULT partition if missing,
+        one transaction per partition. Rows already in DEFAULT for a new month are moved into it.
+        """
+        default = f"{PARTITION_PREFIX}default"
+        has_default = self._table_exists(db, default)
+        month = _add_months(now or datetime.utcnow(), 0)
+        for offset in range(self.months_ahead + 1):
+            start, end = _add_months(month, offset), _add_months(month, offset + 1)
+            name = f"{PARTITION_PREFIX}{start:%Y%m}"
+            bounds = f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            if self._table_exists(db, name):
+                continue
+            if has_default:
+                # Postgres refuses a partition whose range matches rows in DEFAULT: build it beside
+                # the table, move those rows in, then attach it
+                db.execute(text(f"CREATE TABLE {name} (LIKE notifications INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+                db.execute(text(
+                    f"WITH moved AS (DELETE FROM {default} WHERE created_at >= :start AND created_at < :end RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ), {"start": start, "end": end})
+                db.execute(text(f"ALTER TABLE notifications ATTACH PARTITION {name} {bounds}"))
+            else:
+                db.execute(text(f"CREATE TABLE {name} PARTITION OF notifications {bounds}"))
+            db.commit()
+        if not has_default:
+            db.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF notifications DEFAULT"))
+            db.commit()
+
+    @staticmethod
+    def _table_exists(db: Session, name: str) -> bool:
+        return db.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is not None
+
+    def drop_expired_partitions(self, db: Session, cutoff: datetime) -> List[str]:
+        """Drop monthly partitions that end before `cutoff` and hold only expired read rows."""
+        names = db.scalars(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'notifications'::regclass AND c.relname ~ :pattern"
+        ), {"pattern": f"^{PARTITION_PREFIX}[0-9]{{6}}$"}).all()
+        dropped = []
+        for name in sorted(names):
+            month_start = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m")
+            if _add_months(month_start, 1) > cutoff:
+                continue
+            # Coalesced rows can be created long before their last occurrence, so check every row
+            keep = db.scalar(text(
+                f"SELECT 1 FROM {name} WHERE NOT is_read OR last_occurred_at >= :cutoff LIMIT 1"
+            ), {"cutoff": cutoff})
+            if keep:
+                continue
+            db.execute(text(f"ALTER TABLE notifications DETACH PARTITION {name}"))
+            db.execute(text(f"DROP TABLE {name}"))
+            db.commit()
+            dropped.append(name)
+        return dropped
+
+    def run(self, db: Session) -> int:
+        partitioned = self.is_partitioned(db)
+        if partitioned:
+            try:
+                self.ensure_partitions(db)
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to create notification partitions")
+        cutoff = self.cutoff()
+        if cutoff is None:
+            return 0
+        if partitioned:
+            try:
+                dropped = self.drop_expired_partitions(db, cutoff)
+                if dropped:
+                    logger.info("Dropped expired notification partitions: %s", ", ".join(dropped))
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to drop expired notification partitions")
+        return self.purge_read(db, cutoff)
+
+
+notification_retention = NotificationRetention()
+
+
+def prepare_notification_storage() -> None:
+    """Startup hook: partitions must exist before the first insert into a partitioned table."""
+    db = SessionLocal()
+    try:
+        if NotificationRetention.is_partitioned(db):
+            notification_retention.ensure_partitions(db)
+    finally:
+        db.close()
+
+
+def run_notification_retention() -> None:
+    db = SessionLocal()
+    try:
+        notification_retention.run(db)
+    finally:
+        db.close()
+
+
+notification_retention.worker = PeriodicWorker(
+    "notification-retention", settings.NOTIFICATION_PURGE_INTERVAL_SECONDS, run_notification_retention
+)
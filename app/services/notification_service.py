@@ -1,66 +1,354 @@
+from sqlalchemy import bindparam, case, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models.notification import Notification
-from app.schemas.notification import NotificationCreate, NotificationUpdate
+from app.core.database import dialect_insert
+from app.models.notification import Notification, NotificationCounter, NotificationOutbox
+from app.schemas.notification import NotificationCreate, NotificationUpdate, NotificationResponse
+from app.core.pubsub import broker
+from collections import Counter
+from datetime import datetime
 from typing import List, Optional
 import uuid
 
+
+# Types whose repeats are folded into the recipient's unread notification for the same sender and entity
+COALESCING_TYPES = {"NEW_MESSAGE"}
+
+
+def _coalescing_key(row: dict) -> tuple:
+    return row["recipient_id"], row.get("sender_id"), row["type"], row.get("entity_id")
+
+
+# Single broker channel carrying every new or updated notification; each worker subscribes once
+# (see app/services/notification_stream.py) and routes events to its local streams by recipient.
+NOTIFICATIONS_CHANNEL = "notifications"
+
+
+def notification_event_id(notification: Notification) -> str:
+    """
+    Stream event ID: the notification's per-recipient `stream_seq`, used for Last-Event-ID resume.
+    Sequence numbers are handed out under the recipient's counter row lock, so unlike timestamps
+    they follow commit order and a late commit cannot sort before an ID the client already has.
+    """
+    return str(notification.stream_seq)
+
+
+def notification_event(notification: Notification) -> dict:
+    return {
+        "recipient_id": str(notification.recipient_id),
+        "event_id": notification_event_id(notification),
+        "data": NotificationResponse.model_validate(notification).model_dump(mode="json"),
+    }
+
+
+def reset_event(recipient_id: uuid.UUID, stream_seq: int) -> dict:
+    """Tells a resuming client its backlog is too long to replay: refetch the list, then carry on from `stream_seq`."""
+    return {"recipient_id": str(recipient_id), "event_id": str(stream_seq), "event": "reset", "data": {}}
+
+
+def _unread_count_statement(user_id: uuid.UUID):
+    return select(func.count()).select_from(Notification).where(
+        Notification.recipient_id == user_id, Notification.is_read == False
+    )
+
+
 class NotificationService:
+    """
+    Every change to Notification.is_read goes through this service, which adjusts the
+    recipient's NotificationCounter in the same transaction. Badge counts are then a
+    primary-key read instead of a COUNT(*) over notifications.
+    """
+
     def __init__(self, db: Session):
         self.db = db
 
-    def get_notifications_by_user(self, user_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[Notification]:
-        return self.db.query(Notification).filter(Notification.user_id == user_id).order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    def get_notification(self, notification_id: uuid.UUID) -> Optional[Notification]:
+        return self.db.query(Notification).filter(Notification.notification_id == notification_id).first()
 
-    def update_notification(self, notification_id: uuid.UUID, notification_update: NotificationUpdate) -> Optional[Notification]:
+    def get_notifications_by_recipient(self, recipient_id: uuid.UUID, skip: int = 0, limit: int = 100, read: Optional[bool] = None) -> List[Notification]:
+        query = self.db.query(Notification).filter(Notification.recipient_id == recipient_id)
+        if read is not None:
+            query = query.filter(Notification.is_read == read)
+        return query.order_by(Notification.last_occurred_at.desc()).offset(skip).limit(limit).all()
+
+    def get_unread_count(self, user_id: uuid.UUID) -> int:
+        count = self.db.scalar(select(NotificationCounter.unread_count).where(NotificationCounter.user_id == user_id))
+        if count is None:
+            # No counter yet (user predates counters): count once; the next write persists it
+            return self.db.scalar(_unread_count_statement(user_id))
+        return count
+
+    def _adjust_unread(self, user_id: uuid.UUID, delta: int) -> None:
+        """
+        Apply `delta` to the user's counter. Call after the notification rows have been
+        changed (and before commit); the first touch seeds the counter from a full count.
+        """
+        if delta == 0:
+            return
+        stmt = (
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id)
+            .values(unread_count=case(
+                (NotificationCounter.unread_count + delta < 0, 0), else_=NotificationCounter.unread_count + delta
+            ))
+        )
+        if self.db.execute(stmt).rowcount == 0 and not self._seed_counter(user_id):
+            # A concurrent first touch seeded it without seeing our uncommitted change
+            self.db.execute(stmt)
+
+    def _reset_unread(self, user_id: uuid.UUID) -> None:
+        stmt = update(NotificationCounter).where(NotificationCounter.user_id == user_id).values(unread_count=0)
+        if self.db.execute(stmt).rowcount == 0 and not self._seed_counter(user_id):
+            self.db.execute(stmt)
+
+    def _advance_stream_seq(self, user_id: uuid.UUID, count: int) -> int:
+        """
+        Reserve `count` stream positions for the user and return the last one. The UPDATE locks the
+        counter row until commit, so concurrent dispatchers for one recipient commit in position order.
+        """
+        stmt = (
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id)
+            .values(stream_seq=NotificationCounter.stream_seq + count)
+            .returning(NotificationCounter.stream_seq)
+        )
+        stream_seq = self.db.scalar(stmt)
+        if stream_seq is None:
+            self._seed_counter(user_id)
+            stream_seq = self.db.scalar(stmt)
+        return stream_seq
+
+    def _seed_counter(self, user_id: uuid.UUID) -> bool:
+        values = {"user_id": user_id, "unread_count": _unread_count_statement(user_id).scalar_subquery()}
+        stmt = dialect_insert(self.db, NotificationCounter).values(**values).on_conflict_do_nothing(index_elements=["user_id"])
+        return self.db.execute(stmt).rowcount > 0
+
+    def create_notification(self, recipient_id: uuid.UUID, type: str, title: str, message: str, sender_id: Optional[uuid.UUID] = None, entity_id: Optional[uuid.UUID] = None, entity_type: Optional[str] = None) -> Notification:
+        db_notification = Notification(
+            recipient_id=recipient_id,
+            sender_id=sender_id,
+            type=type,
+            title=title,
+            message=message,
+            entity_id=entity_id,
+            entity_type=entity_type
+        )
+        db_notification.stream_seq = self._advance_stream_seq(recipient_id, 1)
+        self.db.add(db_notification)
+        self.db.flush()
+        self._adjust_unread(recipient_id, 1)
+        self.db.commit()
+        self.db.refresh(db_notification)
+        broker.publish(NOTIFICATIONS_CHANNEL, notification_event(db_notification))
+        return db_notification
+
+    def enqueue_notification(self, recipient_id: uuid.UUID, type: str, title: str, message: str, sender_id: Optional[uuid.UUID] = None, entity_id: Optional[uuid.UUID] = None, entity_type: Optional[str] = None) -> None:
+        """
+        Record a notification intent in the outbox as part of the caller's transaction; the caller
+        commits. The notification dispatcher delivers it, honouring the recipient's preferences.
+        """
+        self.db.add(NotificationOutbox(
+            recipient_id=recipient_id,
+            sender_id=sender_id,
+            type=type,
+            title=title,
+            message=message,
+            entity_id=entity_id,
+            entity_type=entity_type
+        ))
+
+    def create_notifications(self, rows: List[dict]) -> List[uuid.UUID]:
+        """
+        Bulk-create notifications and bump the recipients' counters. The caller commits, then
+        passes the returned IDs (inserted and updated rows) to `publish_notifications`.
+
+        Rows of a COALESCING_TYPES type are folded, first within the batch and then into an existing
+        unread notification with the same (recipient, sender, type, entity): that row's `occurrences`,
+        `last_occurred_at` and text are updated instead of inserting a new one. Rows are expected in
+        chronological order.
+        """
+        if not rows:
+            return []
+        inserts, groups = [], {}
+        for row in rows:
+            row = {**row, "notification_id": uuid.uuid4(), "occurrences": 1, "last_occurred_at": row.get("created_at") or datetime.utcnow()}
+            if row["type"] not in COALESCING_TYPES:
+                inserts.append(row)
+                continue
+            key = _coalescing_key(row)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = row
+            else:
+                group.update(occurrences=group["occurrences"] + 1, last_occurred_at=row["last_occurred_at"],
+                             title=row["title"], message=row["message"])
+
+        updates = []
+        if groups:
+            existing = {
+                _coalescing_key({"recipient_id": n.recipient_id, "sender_id": n.sender_id, "type": n.type, "entity_id": n.entity_id}): n.notification_id
+                for n in self.db.execute(
+                    select(Notification.notification_id, Notification.recipient_id, Notification.sender_id,
+                           Notification.type, Notification.entity_id)
+                    .where(
+                        Notification.recipient_id.in_({key[0] for key in groups}),
+                        Notification.is_read == False,
+                        Notification.type.in_({key[2] for key in groups}),
+                    )
+                )
+            }
+            for key, group in groups.items():
+                if key in existing:
+                    updates.append({
+                        "b_notification_id": existing[key],
+                        "b_recipient_id": key[0],
+                        "b_occurrences": group["occurrences"],
+                        "b_last_occurred_at": group["last_occurred_at"],
+                        "b_title": group["title"],
+                        "b_message": group["message"],
+                    })
+                else:
+                    inserts.append(group)
+
+        # Stream positions per recipient, in chronological order, for inserted and coalesced rows alike
+        published = sorted(updates + inserts, key=lambda row: row.get("b_last_occurred_at") or row.get("last_occurred_at"))
+        by_recipient = {}
+        for row in published:
+            by_recipient.setdefault(row.get("b_recipient_id") or row.get("recipient_id"), []).append(row)
+        # Counter rows are locked in a fixed order so concurrent batches cannot deadlock on each other
+        for recipient_id in sorted(by_recipient, key=str):
+            recipient_rows = by_recipient[recipient_id]
+            last = self._advance_stream_seq(recipient_id, len(recipient_rows))
+            for position, row in enumerate(recipient_rows, start=last - len(recipient_rows) + 1):
+                row["b_stream_seq" if "b_notification_id" in row else "stream_seq"] = position
+
+        if updates:
+            table = Notification.__table__
+            self.db.execute(
+                update(table)
+                .where(table.c.notification_id == bindparam("b_notification_id"))
+                .values(
+                    occurrences=table.c.occurrences + bindparam("b_occurrences"),
+                    last_occurred_at=bindparam("b_last_occurred_at"),
+                    title=bindparam("b_title"),
+                    message=bindparam("b_message"),
+                    stream_seq=bindparam("b_stream_seq"),
+                ),
+                updates,
+            )
+        if inserts:
+            self.db.execute(insert(Notification.__table__), inserts)
+            # Only new rows change the badge count; folded repeats are still one unread notification
+            for recipient_id, count in sorted(Counter(row["recipient_id"] for row in inserts).items(), key=lambda item: str(item[0])):
+                self._adjust_unread(recipient_id, count)
+        return [params["b_notification_id"] for params in updates] + [row["notification_id"] for row in inserts]
+
+    def publish_notifications(self, notification_ids: List[uuid.UUID]) -> None:
+        """Push committed notifications to open streams, in stream order."""
+        if not notification_ids:
+            return
+        notifications = self.db.scalars(
+            select(Notification)
+            .where(Notification.notification_id.in_(notification_ids))
+            .order_by(Notification.stream_seq)
+        ).all()
+        for notification in notifications:
+            broker.publish(NOTIFICATIONS_CHANNEL, notification_event(notification))
+
+    def mark_notification_read_status(self, notification_id: uuid.UUID, is_read: bool) -> Optional[Notification]:
         db_notification = self.get_notification(notification_id)
         if not db_notification:
             return None
-        
-        for key, value in notification_update.dict(exclude_unset=True).items():
-            setattr(db_notification, key, value)
-        
-        self.db.commit()
-        self.db.refresh(db_notification)
+        if db_notification.is_read != is_read:
+            db_notification.is_read = is_read
+            self.db.flush()
+            self._adjust_unread(db_notification.recipient_id, -1 if is_read else 1)
+            self.db.commit()
+            self.db.refresh(db_notification)
         return db_notification
 
+    def mark_notifications_read(self, recipient_id: uuid.UUID, notification_ids: List[uuid.UUID]) -> int:
+        """Mark the given notifications of `recipient_id` read with one UPDATE. Returns how many changed."""
+        if not notification_ids:
+            return 0
+        result = self.db.execute(
+            update(Notification)
+            .where(
+                Notification.recipient_id == recipient_id,
+                Notification.notification_id.in_(notification_ids),
+                Notification.is_read == False,
+            )
+            .values(is_read=True)
+            .execution_options(synchronize_session=False)
+        )
+        self._adjust_unread(recipient_id, -result.rowcount)
+        self.db.commit()
+        return result.rowcount
+
+    def mark_all_read(self, recipient_id: uuid.UUID) -> int:
+        """Mark every unread notification of `recipient_id` read with one UPDATE. Returns how many changed."""
+        result = self.db.execute(
+            update(Notification)
+            .where(Notification.recipient_id == recipient_id, Notification.is_read == False)
+            .values(is_read=True)
+            .execution_options(synchronize_session=False)
+        )
+        self._reset_unread(recipient_id)
+        self.db.commit()
+        return result.rowcount
+
+    def update_notification(self, notification_id: uuid.UUID, notification_update: NotificationUpdate) -> Optional[Notification]:
+        update_data = notification_update.model_dump(exclude_unset=True)
+        if "is_read" not in update_data:
+            return self.get_notification(notification_id)
+        return self.mark_notification_read_status(notification_id, update_data["is_read"])
+
     def delete_notification(self, notification_id: uuid.UUID) -> bool:
         db_notification = self.get_notification(notification_id)
         if db_notification:
+            recipient_id, was_unread = db_notification.recipient_id, not db_notification.is_read
             self.db.delete(db_notification)
+            self.db.flush()
+            if was_unread:
+                self._adjust_unread(recipient_id, -1)
             self.db.commit()
             return True
         return False
-    
-    def get_notification(db: Session, notification_id: uuid.UUID) -> Optional[Notification]:
-        return db.query(Notification).filter(Notification.notification_id == notification_id).first()
 
-    def get_notifications_by_recipient(db: Session, recipient_id: uuid.UUID, skip: int = 0, limit: int = 100, read: Optional[bool] = None) -> List[Notification]:
-        query = db.query(Notification).filter(Notification.recipient_id == recipient_id)
+
+
+class AsyncNotificationService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_notification(self, notification_id: uuid.UUID) -> Optional[Notification]:
+        # Not db.get(): the primary key also includes created_at when the table is partitioned
+        return await self.db.scalar(select(Notification).where(Notification.notification_id == notification_id))
+
+    async def get_notifications_by_recipient(self, recipient_id: uuid.UUID, skip: int = 0, limit: int = 100, read: Optional[bool] = None) -> List[Notification]:
+        stmt = select(Notification).where(Notification.recipient_id == recipient_id)
         if read is not None:
-            query = query.filter(Notification.is_read == read)
-        return query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+            stmt = stmt.where(Notification.is_read == read)
+        return (await self.db.scalars(stmt.order_by(Notification.last_occurred_at.desc()).offset(skip).limit(limit))).all()
 
-    def create_notification(db: Session, recipient_id: uuid.UUID, type: str, title: str, message: str, sender_id: Optional[uuid.UUID] = None, entity_id: Optional[uuid.UUID] = None, entity_type: Optional[str] = None) -> Notification:
-        db_notification = Notification(
-            recipient_id=recipient_id,
-            sender_id=sender_id,
-            type=type,
-            title=title,
-            message=message,
-            entity_id=entity_id,
-            entity_type=entity_type
-        )
-        db.add(db_notification)
-        db.commit()
-        db.refresh(db_notification)
-        return db_notification
+    async def get_notifications_since(self, recipient_id: uuid.UUID, event_id: str, limit: int = 100) -> List[Notification]:
+        """
+        Notifications created or updated after stream event `event_id`, in stream order. Returns up to
+        `limit + 1` rows so callers can tell a complete backlog from a truncated one. Raises ValueError if malformed.
+        """
+        return (await self.db.scalars(
+            select(Notification)
+            .where(Notification.recipient_id == recipient_id, Notification.stream_seq > int(event_id))
+            .order_by(Notification.stream_seq)
+            .limit(limit + 1)
+        )).all()
 
-    def mark_notification_read_status(db: Session, notification_id: uuid.UUID, is_read: bool) -> Optional[Notification]:
-        db_notification = db.query(Notification).filter(Notification.notification_id == notification_id).first()
-        if db_notification:
-            db_notification.is_read = is_read
-            db.add(db_notification)
-            db.commit()
-            db.refresh(db_notification)
-            return db_notification
-        return None
\ No newline at end of file
+    async def get_stream_seq(self, user_id: uuid.UUID) -> int:
+        """The user's latest stream position (0 before their first notification)."""
+        return await self.db.scalar(select(NotificationCounter.stream_seq).where(NotificationCounter.user_id == user_id)) or 0
+
+    async def get_unread_count(self, user_id: uuid.UUID) -> int:
+        count = await self.db.scalar(select(NotificationCounter.unread_count).where(NotificationCounter.user_id == user_id))
+        if count is None:
+            return await self.db.scalar(_unread_count_statement(user_id))
+        return count
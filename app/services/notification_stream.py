@@ -0,0 +1,91 @@
+"""
+Fan-out of notification events to Server-Sent Events streams.
+
+Each worker holds ONE broker subscription to NOTIFICATIONS_CHANNEL and routes
+events to its local listeners by recipient, so an idle stream costs an asyncio
+queue and nothing else: no per-client broker subscription, no polling query.
+"""
+import asyncio
+import json
+import uuid
+from collections import defaultdict
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.pubsub import broker
+from app.services.notification_service import NOTIFICATIONS_CHANNEL
+
+
+class NotificationStream:
+    def __init__(self, queue_size: int = settings.PUBSUB_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._listeners: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+        self._subscription = None
+
+    async def start(self) -> None:
+        self._subscription = await broker.subscribe(NOTIFICATIONS_CHANNEL)
+        self._task = asyncio.create_task(self._route())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._subscription:
+            await self._subscription.close()
+            self._subscription = None
+
+    async def _route(self) -> None:
+        async for event in self._subscription:
+            for queue in self._listeners.get(event["recipient_id"], ()):
+                if queue.full():
+                    queue.get_nowait() # Slow client: drop the oldest; it can resume via Last-Event-ID
+                queue.put_nowait(event)
+
+    def listen(self, user_id: uuid.UUID) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._listeners[str(user_id)].add(queue)
+        return queue
+
+    def unlisten(self, user_id: uuid.UUID, queue: asyncio.Queue) -> None:
+        listeners = self._listeners.get(str(user_id))
+        if listeners is not None:
+            listeners.discard(queue)
+            if not listeners:
+                del self._listeners[str(user_id)]
+
+    def listener_count(self) -> int:
+        return sum(len(queues) for queues in self._listeners.values())
+
+
+notification_stream = NotificationStream()
+
+
+def format_event(event: dict) -> str:
+    return f"id: {event['event_id']}\nevent: {event.get('event', 'notification')}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+async def sse_events(
+    backlog: List[dict],
+    queue: asyncio.Queue,
+    heartbeat: float = settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    """
+    Replay `backlog`, then stream live events from `queue`, with a comment line every
+    `heartbeat` seconds of silence to keep proxies from closing the connection.
+    Live events at or before the last backlog position (replayed or covered by a reset) are skipped.
+    """
+    yield f"retry: {int(heartbeat * 1000)}\n\n"
+    delivered_through = 0
+    for event in backlog:
+        delivered_through = max(delivered_through, int(event["event_id"]))
+        yield format_event(event)
+    while True:
+        try:
+            event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+        except asyncio.TimeoutError:
+            yield ": heartbeat\n\n"
+            continue
+        if int(event["event_id"]) <= delivered_through:
+            continue
+        yield format_event(event)
@@ -0,0 +1,197 @@
+"""
+Payment gateway webhook ingestion.
+
+POST /transactions/webhook only checks the signature and inserts the event into
+`payment_events`. It fails closed: without PAYMENT_WEBHOOK_SECRET it answers 503,
+unless PAYMENT_WEBHOOK_ALLOW_UNSIGNED is switched on for local development. Gateway retries of an event already received (same external_id
+and status) are dropped by the unique constraint, so a burst costs one small
+INSERT per request. A background worker applies the queue in batches. Each batch
+loads its transactions and connections in two queries, locks the connections,
+applies every event and marks it processed, all in one transaction. A failed
+batch is rolled back and retried on the next run.
+
+Applying an event:
+- SUCCESS for a PENDING_PAYMENT connection activates it, as complete_payment does.
+- Any other event moves the matching transaction's status (see TRANSITIONS).
+  A transaction already in the event's status makes it a duplicate.
+Events that cannot apply (unknown connection, amount mismatch, connection no
+longer pending, out-of-order transition) are marked processed with an
+"ignored: ..." outcome for inspection.
+"""
+import hashlib
+import hmac
+import logging
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.models.connection import Connection
+from app.models.payment_event import PaymentEvent
+from app.models.transaction import Transaction
+from app.schemas.transaction import PaymentWebhookEvent, TransactionCreate
+from app.services.connection_service import FEE_CURRENCY, ConnectionService
+from app.services.transaction_service import TransactionService
+from app.utils.background import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+# Transaction status -> statuses a gateway event may move it to
+TRANSITIONS = {
+    "PENDING": {"SUCCESS", "FAILED"},
+    "FAILED": {"SUCCESS"}, # Retried charge under the same gateway ID
+    "SUCCESS": {"REFUNDED"},
+}
+
+
+def sign_payload(body: bytes, secret: str) -> str:
+    """Hex HMAC-SHA256 of the raw request body, as sent in SIGNATURE_HEADER."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def webhooks_enabled() -> bool:
+    """Webhooks are accepted only with a signing secret, or unsigned behind the explicit development flag."""
+    return bool(settings.PAYMENT_WEBHOOK_SECRET) or settings.PAYMENT_WEBHOOK_ALLOW_UNSIGNED
+
+
+def verify_signature(body: bytes, signature: Optional[str]) -> bool:
+    """True when `signature` matches PAYMENT_WEBHOOK_SECRET, or no secret is set and unsigned webhooks are allowed."""
+    if not settings.PAYMENT_WEBHOOK_SECRET:
+        return settings.PAYMENT_WEBHOOK_ALLOW_UNSIGNED
+    return signature is not None and hmac.compare_digest(sign_payload(body, settings.PAYMENT_WEBHOOK_SECRET), signature)
+
+
+class PaymentWebhooks:
+    def __init__(self, batch_size: int = settings.PAYMENT_WEBHOOK_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.worker: Optional[PeriodicWorker] = None
+
+    def _insert_ignoring_duplicates(self, db: Session):
+        return dialect_insert(db, PaymentEvent).on_conflict_do_nothing(index_elements=["external_id", "status"])
+
+    def enqueue(self, db: Session, event: PaymentWebhookEvent) -> bool:
+        """Queue a webhook event. Returns False if it was already received."""
+        event_id = db.execute(
+            self._insert_ignoring_duplicates(db).values(**event.model_dump()).returning(PaymentEvent.event_id)
+        ).scalar_one_or_none()
+        db.commit()
+        if event_id is not None and self.worker:
+            self.worker.wake()
+        return event_id is not None
+
+    def _apply(self, db: Session, event: PaymentEvent, connection: Optional[Connection], transaction: Optional[Transaction]) -> Tuple[str, Optional[Transaction]]:
+        """Stage one event. Returns its outcome and the transaction it now applies to, if any."""
+        if transaction is not None:
+            if transaction.status == event.status:
+                return "duplicate", None
+            if event.status not in TRANSITIONS.get(transaction.status, ()):
+                return f"ignored: {transaction.status} -> {event.status}", None
+        if event.status == "SUCCESS" and connection is not None and connection.status == "PENDING_PAYMENT":
+            if event.currency.upper() != FEE_CURRENCY:
+                return "ignored: currency mismatch", None
+            if event.amount != connection.fee_amount:
+                return "ignored: amount mismatch", None
+            transaction = ConnectionService(db).activate_paid_connection(connection, TransactionCreate(
+                connection_id=event.connection_id,
+                amount=float(event.amount),
+                currency=event.currency,
+                payment_method=event.payment_method or "gateway",
+                external_id=event.external_id,
+            ), db_transaction=transaction)
+            return "activated", transaction
+        if transaction is None:
+            if connection is None:
+                return "ignored: unknown connection", None
+            if event.status == "SUCCESS":
+                return f"ignored: connection is {connection.status}", None
+            return "ignored: no matching transaction", None
+        TransactionService(db).set_transaction_status(transaction, event.status, external_id=event.external_id)
+        return "updated", transaction
+
+    def apply_batch(self, db: Session) -> int:
+        """
+        Apply up to `batch_size` queued events in one transaction. Returns how many were processed.
+        Each event runs in its own savepoint: one that raises is rolled back alone and recorded with
+        an "error: ..." outcome, so it cannot wedge the queue behind it.
+        """
+        events = db.scalars(
+            select(PaymentEvent)
+            .where(PaymentEvent.processed_at.is_(None))
+            .order_by(PaymentEvent.event_id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True) # Lets several workers drain the queue concurrently on Postgres
+        ).all()
+        if not events:
+            return 0
+
+        connection_ids = {event.connection_id for event in events}
+        connections = {
+            connection.connection_id: connection
+            for connection in db.scalars(
+                select(Connection)
+                .options(joinedload(Connection.requester, innerjoin=True))
+                .where(Connection.connection_id.in_(connection_ids))
+                .with_for_update(of=Connection)
+            )
+        }
+        by_external_id, by_connection = {}, {}
+        for transaction in db.scalars(select(Transaction).where(or_(
+            Transaction.external_id.in_({event.external_id for event in events}),
+            Transaction.connection_id.in_(connection_ids),
+        ))):
+            if transaction.external_id:
+                by_external_id[transaction.external_id] = transaction
+            else:
+                by_connection[transaction.connection_id] = transaction # Recorded by complete_payment without a gateway ID
+
+        now = datetime.utcnow()
+        try:
+            for event in events:
+                transaction = by_external_id.get(event.external_id) or by_connection.get(event.connection_id)
+                try:
+                    with db.begin_nested():
+                        outcome, applied = self._apply(db, event, connections.get(event.connection_id), transaction)
+                except Exception as e:
+                    logger.exception("Failed to apply payment event %s (%s %s)", event.event_id, event.external_id, event.status)
+                    outcome, applied = f"error: {type(e).__name__}: {e}"[:100], None
+                event.outcome = outcome
+                if applied is not None:
+                    # Later events in the batch for this payment must see it
+                    by_external_id[event.external_id] = applied
+                    by_connection.pop(event.connection_id, None)
+                event.processed_at = now
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return len(events)
+
+    def apply(self, db: Session) -> int:
+        """Drain the queue. Returns the number of events processed."""
+        total = 0
+        while True:
+            processed = self.apply_batch(db)
+            total += processed
+            if processed < self.batch_size:
+                return total
+
+
+payment_webhooks = PaymentWebhooks()
+
+
+def apply_payment_events() -> None:
+    db = SessionLocal()
+    try:
+        payment_webhooks.apply(db)
+    finally:
+        db.close()
+
+
+payment_webhooks.worker = PeriodicWorker(
+    "payment-webhook-apply", settings.PAYMENT_WEBHOOK_APPLY_INTERVAL_SECONDS, apply_payment_events
+)
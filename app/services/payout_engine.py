@@ -0,0 +1,201 @@
+"""
+Bulk payout of creators' PENDING_PAYOUT earnings.
+
+A payout batch covers every PENDING_PAYOUT earning created up to its `cutoff`.
+The engine works through them in chunks of PAYOUT_CHUNK_SIZE creators, one database
+transaction per chunk, taking all of each creator's pending earnings in the batch. Within
+a chunk the earnings are grouped by creator and currency, so every creator gets exactly
+one payout Transaction per currency per batch, inserted in bulk. The earnings
+are flipped to PAID_OUT and linked to it with one batched UPDATE, the balance
+rollup is moved the same way, and each creator gets an EARNING_PAID notification
+through the outbox.
+
+At most one batch is RUNNING at a time: a partial unique index enforces it, so
+concurrent starts share one batch.
+
+Resuming: a chunk commits all of this or nothing, and an earning's status is the
+progress marker. A run first claims the batch with a lease (PAYOUT_LEASE_SECONDS,
+renewed at the start of every chunk), so one runner at a time pays a batch and
+only the lease holder can mark it COMPLETED; a second run started meanwhile
+returns without paying. If a run dies, the batch stays RUNNING and the next run
+(from the admin endpoint or the CLI) takes over once the lease lapses, with the
+same cutoff. As a last line of defence the earnings UPDATE only matches rows
+still PENDING_PAYOUT, and a chunk that finds any already paid is rolled back, so
+nobody is paid twice even if a lease is lost mid-chunk.
+
+    python -m app.services.payout_engine [--chunk-size N]
+"""
+import argparse
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.models.earning import Earning
+from app.models.payout import PayoutBatch
+from app.models.transaction import Transaction
+from app.services.earning_service import EarningService
+from app.services.notification_service import NotificationService
+
+PAYOUT_PAYMENT_METHOD = "PAYOUT"
+
+
+class PayoutEngine:
+    def __init__(self, chunk_size: int = settings.PAYOUT_CHUNK_SIZE, lease_seconds: float = settings.PAYOUT_LEASE_SECONDS):
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+
+    def get_batch(self, db: Session, batch_id: uuid.UUID) -> Optional[PayoutBatch]:
+        return db.get(PayoutBatch, batch_id)
+
+    def start_batch(self, db: Session) -> PayoutBatch:
+        """The RUNNING batch left by an interrupted run, or a new one covering earnings up to now."""
+        running = select(PayoutBatch).where(PayoutBatch.status == "RUNNING")
+        batch = db.scalars(running).first()
+        if batch is None:
+            # A concurrent start that won the race on the RUNNING index is returned instead
+            db.execute(
+                dialect_insert(db, PayoutBatch)
+                .values(cutoff=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=["status"], index_where=PayoutBatch.status == "RUNNING")
+            )
+            db.commit()
+            batch = db.scalars(running).first()
+        return batch
+
+    def _extend_lease(self, db: Session, batch: PayoutBatch, runner_id: str, claim: bool = False) -> bool:
+        """Take (`claim`) or renew the batch's lease for `runner_id`. Returns whether this runner holds it."""
+        now = datetime.utcnow()
+        holder = PayoutBatch.runner_id == runner_id
+        if claim:
+            holder = or_(holder, PayoutBatch.runner_id.is_(None), PayoutBatch.lease_expires_at < now)
+        result = db.execute(
+            update(PayoutBatch)
+            .where(PayoutBatch.batch_id == batch.batch_id, PayoutBatch.status == "RUNNING", holder)
+            .values(runner_id=runner_id, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+        )
+        return result.rowcount == 1
+
+    def claim(self, db: Session, batch: PayoutBatch, runner_id: str) -> bool:
+        """Take the batch unless another runner holds an unexpired lease on it."""
+        claimed = self._extend_lease(db, batch, runner_id, claim=True)
+        db.commit()
+        return claimed
+
+    def pay_chunk(self, db: Session, batch: PayoutBatch, runner_id: str) -> int:
+        """
+        Pay out the batch's earnings of up to `chunk_size` creators in one transaction, renewing
+        `runner_id`'s lease first. Returns how many earnings were paid; 0 when done or when the lease was lost.
+        """
+        if not self._extend_lease(db, batch, runner_id):
+            db.rollback()
+            return 0
+        in_batch = (Earning.status == "PENDING_PAYOUT", Earning.created_at <= batch.cutoff)
+        creators = select(Earning.user_id).where(*in_batch).group_by(Earning.user_id).order_by(Earning.user_id).limit(self.chunk_size)
+        # Every pending earning of those creators, so none of them is split across chunks
+        earnings = db.execute(
+            select(Earning.earning_id, Earning.user_id, Earning.currency, Earning.amount)
+            .where(*in_batch, Earning.user_id.in_(creators))
+            .order_by(Earning.user_id, Earning.currency, Earning.earning_id)
+            .with_for_update()
+        ).all()
+        if not earnings:
+            return 0
+
+        totals = defaultdict(Decimal)
+        for earning in earnings:
+            totals[(earning.user_id, earning.currency)] += earning.amount
+        now = datetime.utcnow()
+        payouts = [
+            {
+                "transaction_id": uuid.uuid4(),
+                "user_id": user_id, # The creator being paid
+                "amount": amount,
+                "currency": currency,
+                "status": "SUCCESS",
+                "payment_method": PAYOUT_PAYMENT_METHOD,
+                "transaction_date": now,
+                "payout_batch_id": batch.batch_id,
+            }
+            for (user_id, currency), amount in totals.items()
+        ]
+        try:
+            db.execute(insert(Transaction), payouts)
+            EarningService(db).mark_paid_out(
+                earnings, {(payout["user_id"], payout["currency"]): payout["transaction_id"] for payout in payouts}
+            )
+            notification_service = NotificationService(db)
+            for payout in payouts:
+                notification_service.enqueue_notification(
+                    recipient_id=payout["user_id"],
+                    type="EARNING_PAID",
+                    title="You've been paid!",
+                    message=f"{payout['amount']} {payout['currency']} of your earnings has been paid out.",
+                    entity_id=payout["transaction_id"],
+                    entity_type="transaction"
+                )
+            db.execute(
+                update(PayoutBatch)
+                .where(PayoutBatch.batch_id == batch.batch_id)
+                .values(
+                    earnings_paid=PayoutBatch.earnings_paid + len(earnings),
+                    payouts_created=PayoutBatch.payouts_created + len(payouts),
+                    amount_paid=PayoutBatch.amount_paid + sum(totals.values()),
+                )
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return len(earnings)
+
+    def run(self, db: Session, batch: Optional[PayoutBatch] = None) -> PayoutBatch:
+        """
+        Pay out `batch` (default: resume or start one) chunk by chunk, then mark it COMPLETED.
+        Returns without paying if another runner holds the batch.
+        """
+        batch = batch or self.start_batch(db)
+        runner_id = uuid.uuid4().hex
+        if self.claim(db, batch, runner_id):
+            while self.pay_chunk(db, batch, runner_id):
+                pass
+            db.execute(
+                update(PayoutBatch)
+                .where(PayoutBatch.batch_id == batch.batch_id, PayoutBatch.status == "RUNNING", PayoutBatch.runner_id == runner_id)
+                .values(status="COMPLETED", completed_at=datetime.utcnow(), runner_id=None, lease_expires_at=None)
+            )
+            db.commit()
+        db.refresh(batch)
+        return batch
+
+
+payout_engine = PayoutEngine()
+
+
+def run_payout_batch(batch_id: uuid.UUID) -> None:
+    """Background entry point for the admin endpoint."""
+    db = SessionLocal()
+    try:
+        batch = payout_engine.get_batch(db, batch_id)
+        if batch is not None and batch.status == "RUNNING":
+            payout_engine.run(db, batch)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pay out PENDING_PAYOUT earnings, resuming an interrupted batch if there is one.")
+    parser.add_argument("--chunk-size", type=int, default=settings.PAYOUT_CHUNK_SIZE)
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        batch = PayoutEngine(args.chunk_size).run(db)
+    finally:
+        db.close()
+    print(f"batch {batch.batch_id} {batch.status}: {batch.earnings_paid} earnings in {batch.payouts_created} payouts")
@@ -11,6 +11,9 @@ class ProfileService:
     def get_profile(self, profile_id: uuid.UUID) -> Optional[ProfileResponse]:
         return self.db.query(Profile).filter(Profile.profile_id == profile_id).first()
 
+    def get_profile_by_user_id(self, user_id: uuid.UUID) -> Optional[Profile]:
+        return self.db.query(Profile).filter(Profile.user_id == user_id).first()
+
     def create_profile(self, profile_data: ProfileCreate, user_id: uuid.UUID) -> ProfileResponse:
         new_profile = Profile(**profile_data.model_dump(), user_id=user_id)
         self.db.add(new_profile)
@@ -0,0 +1,83 @@
+from sqlalchemy import Float, cast, column, func, literal_column, or_, select, table
+from sqlalchemy.orm import Session, joinedload, selectinload
+from app.core.config import settings
+from app.core.search import fts_table
+from app.models.connection import Connection
+from app.models.message import Message
+from app.models.moment import Moment
+from app.utils.pagination import encode_rank_cursor, rank_filter
+from typing import List, Optional, Tuple
+import uuid
+
+
+def _fts5_query(query: str) -> str:
+    """Quote every term so user input is matched literally (implicit AND) instead of parsed as FTS5 syntax."""
+    terms = query.split()
+    if not terms:
+        raise ValueError("Search query must not be empty.")
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+class SearchService:
+    """
+    Ranked full-text search over the indexes installed by app.core.search. Results are ordered by
+    relevance (higher first) and keyset-paginated on (score, id); the score is BM25 on SQLite and
+    ts_rank on Postgres.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _matches(self, model, id_column, query: str):
+        """Statement of (entity_id, score) for rows of `model` matching `query`."""
+        name = model.__tablename__
+        if self.db.get_bind().dialect.name == "sqlite":
+            fts = table(fts_table(name), column("rowid"))
+            fts_ref = literal_column(fts_table(name)) # FTS5 takes the table name itself as MATCH/bm25 argument
+            return (
+                select(id_column.label("entity_id"), (-func.bm25(fts_ref)).label("score"))
+                .select_from(model)
+                .join(fts, fts.c.rowid == literal_column(f"{name}.rowid"))
+                .where(fts_ref.op("MATCH")(_fts5_query(query)))
+            )
+        if not query.strip():
+            raise ValueError("Search query must not be empty.")
+        vector = literal_column(f"{name}.search_vector")
+        tsquery = func.plainto_tsquery(settings.SEARCH_TEXT_CONFIG, query)
+        # ts_rank is a float4; cast so the score round-trips exactly through the cursor
+        return (
+            select(id_column.label("entity_id"), cast(func.ts_rank(vector, tsquery), Float).label("score"))
+            .select_from(model)
+            .where(vector.op("@@")(tsquery))
+        )
+
+    def _ranked(self, stmt, id_column, matches, limit: int, cursor: Optional[str]):
+        ranked = matches.subquery()
+        stmt = (
+            stmt.add_columns(ranked.c.score)
+            .join(ranked, id_column == ranked.c.entity_id)
+            .order_by(ranked.c.score.desc(), ranked.c.entity_id.desc())
+            .limit(limit + 1) # One extra row tells whether a next page exists
+        )
+        if cursor:
+            stmt = stmt.where(rank_filter(ranked.c.score, ranked.c.entity_id, cursor))
+        rows = self.db.execute(stmt).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_rank_cursor(rows[-1].score, getattr(rows[-1][0], id_column.key)) if has_more else None
+        return [row[0] for row in rows], next_cursor
+
+    def search_messages(self, user_id: uuid.UUID, query: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Message], Optional[str]]:
+        """Messages in any of `user_id`'s connections matching `query`."""
+        my_connections = select(Connection.connection_id).where(
+            or_(Connection.requester_id == user_id, Connection.recipient_id == user_id)
+        )
+        matches = self._matches(Message, Message.message_id, query).where(Message.connection_id.in_(my_connections))
+        stmt = select(Message).options(selectinload(Message.sender))
+        return self._ranked(stmt, Message.message_id, matches, limit, cursor)
+
+    def search_moments(self, query: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Moment], Optional[str]]:
+        """PUBLIC moments matching `query`."""
+        matches = self._matches(Moment, Moment.moment_id, query).where(Moment.visibility == "PUBLIC")
+        stmt = select(Moment).options(joinedload(Moment.author), selectinload(Moment.media))
+        return self._ranked(stmt, Moment.moment_id, matches, limit, cursor)
@@ -0,0 +1,146 @@
+from sqlalchemy import and_, bindparam, delete, insert, or_, select, union
+from sqlalchemy.orm import Session, joinedload, selectinload
+from app.core.config import settings
+from app.models.connection import Connection
+from app.models.flirt import Flirt
+from app.models.moment import Moment
+from app.models.timeline import HomeTimelineEntry, TimelinePullAuthor
+from app.models.user import User
+from app.utils.pagination import encode_cursor, keyset_filter
+from typing import List, Optional, Set, Tuple
+import uuid
+
+
+class TimelineService:
+    """
+    Per-user home timelines, precomputed at write time.
+
+    A reader follows every creator whose moments they have flirted with and every user
+    they share an ACCEPTED connection with. New PUBLIC moments are copied into each
+    follower's timeline; authors above HOME_TIMELINE_FANOUT_LIMIT followers are instead
+    recorded as pull authors and merged into their followers' timelines on read.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _followers_query(self, author_id: uuid.UUID):
+        flirters = select(Flirt.flirter_id.label("user_id")).join(Moment, Flirt.moment_id == Moment.moment_id).where(Moment.user_id == author_id)
+        requesters = select(Connection.requester_id.label("user_id")).where(Connection.recipient_id == author_id, Connection.status == "ACCEPTED")
+        recipients = select(Connection.recipient_id.label("user_id")).where(Connection.requester_id == author_id, Connection.status == "ACCEPTED")
+        return union(flirters, requesters, recipients)
+
+    def get_followers(self, author_id: uuid.UUID, limit: Optional[int] = None) -> List[uuid.UUID]:
+        query = self._followers_query(author_id)
+        if limit is not None:
+            query = query.limit(limit)
+        return [row[0] for row in self.db.execute(query)]
+
+    def get_followed_authors(self, user_id: uuid.UUID) -> Set[uuid.UUID]:
+        flirted = select(Moment.user_id).join(Flirt, Flirt.moment_id == Moment.moment_id).where(Flirt.flirter_id == user_id)
+        requested = select(Connection.recipient_id).where(Connection.requester_id == user_id, Connection.status == "ACCEPTED")
+        received = select(Connection.requester_id).where(Connection.recipient_id == user_id, Connection.status == "ACCEPTED")
+        return {row[0] for row in self.db.execute(union(flirted, requested, received))}
+
+    def fan_out_moment(self, moment: Moment) -> int:
+        """
+        Append a new moment to its author's and followers' timelines. Runs in the caller's
+        transaction (no commit). Returns the number of timelines written.
+        """
+        if moment.visibility != "PUBLIC":
+            return 0
+
+        limit = settings.HOME_TIMELINE_FANOUT_LIMIT
+        followers = self.get_followers(moment.user_id, limit=limit + 1)
+        if len(followers) > limit:
+            # Too many followers to write to: readers pull this author's moments instead
+            if not self.db.get(TimelinePullAuthor, moment.user_id):
+                self.db.add(TimelinePullAuthor(author_id=moment.user_id))
+            followers = []
+
+        owner_ids = set(followers)
+        owner_ids.add(moment.user_id)
+        self.db.execute(insert(HomeTimelineEntry), [
+            {"owner_id": owner_id, "moment_id": moment.moment_id, "author_id": moment.user_id, "created_at": moment.created_at}
+            for owner_id in owner_ids
+        ])
+        self._trim(owner_ids)
+        return len(owner_ids)
+
+    def _trim(self, owner_ids: Set[uuid.UUID]) -> None:
+        """
+        Keep only the newest HOME_TIMELINE_MAX_ENTRIES rows for each owner. Each owner's first
+        overflowing row is found with a seek on the owner index, and only owners that have one are trimmed.
+        """
+        def overflow_boundary(column):
+            return (
+                select(column)
+                .where(HomeTimelineEntry.owner_id == User.user_id)
+                .order_by(HomeTimelineEntry.created_at.desc(), HomeTimelineEntry.moment_id.desc())
+                .offset(settings.HOME_TIMELINE_MAX_ENTRIES)
+                .limit(1)
+                .scalar_subquery()
+            )
+
+        boundaries = self.db.execute(
+            select(
+                User.user_id,
+                overflow_boundary(HomeTimelineEntry.created_at).label("created_at"),
+                overflow_boundary(HomeTimelineEntry.moment_id).label("moment_id")
+            ).where(User.user_id.in_(owner_ids))
+        ).all()
+        overflowing = [row for row in boundaries if row.moment_id is not None]
+        if not overflowing:
+            return
+
+        # Delete the boundary row and everything older, one statement per owner over the cap
+        entries = HomeTimelineEntry.__table__
+        self.db.execute(
+            delete(entries).where(
+                entries.c.owner_id == bindparam("owner"),
+                or_(
+                    entries.c.created_at < bindparam("boundary_created_at"),
+                    and_(entries.c.created_at == bindparam("boundary_created_at"), entries.c.moment_id <= bindparam("boundary_moment_id")),
+                )
+            ),
+            [{"owner": row.user_id, "boundary_created_at": row.created_at, "boundary_moment_id": row.moment_id} for row in overflowing]
+        )
+
+    def remove_moment(self, moment_id: uuid.UUID) -> None:
+        """Remove a moment from every timeline. Runs in the caller's transaction (no commit)."""
+        self.db.query(HomeTimelineEntry).filter(HomeTimelineEntry.moment_id == moment_id).delete(synchronize_session=False)
+
+    def get_home_timeline(self, user_id: uuid.UUID, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Moment], Optional[str]]:
+        """Returns one page of the user's home timeline, newest first, and the cursor for the next page."""
+        entries = self.db.query(HomeTimelineEntry.moment_id, HomeTimelineEntry.created_at).filter(HomeTimelineEntry.owner_id == user_id)
+        if cursor:
+            entries = entries.filter(keyset_filter(HomeTimelineEntry.created_at, HomeTimelineEntry.moment_id, cursor))
+        page = entries.order_by(HomeTimelineEntry.created_at.desc(), HomeTimelineEntry.moment_id.desc()).limit(limit + 1).all()
+
+        # Merge in moments from followed authors that are not fanned out
+        pull_authors = {row[0] for row in self.db.query(TimelinePullAuthor.author_id).all()}
+        if pull_authors:
+            pull_authors &= self.get_followed_authors(user_id)
+        if pull_authors:
+            pulled = self.db.query(Moment.moment_id, Moment.created_at).filter(
+                Moment.user_id.in_(pull_authors),
+                Moment.visibility == "PUBLIC"
+            )
+            if cursor:
+                pulled = pulled.filter(keyset_filter(Moment.created_at, Moment.moment_id, cursor))
+            pulled = pulled.order_by(Moment.created_at.desc(), Moment.moment_id.desc()).limit(limit + 1).all()
+            merged = {row.moment_id: row for row in page + pulled}
+            page = sorted(merged.values(), key=lambda row: (row.created_at, row.moment_id.int), reverse=True)[:limit + 1]
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(page[-1].created_at, page[-1].moment_id)
+
+        moment_ids = [row.moment_id for row in page]
+        moments = self.db.query(Moment).options(
+            joinedload(Moment.author),
+            selectinload(Moment.media)
+        ).filter(Moment.moment_id.in_(moment_ids), Moment.visibility == "PUBLIC").all()
+        by_id = {moment.moment_id: moment for moment in moments}
+        return [by_id[moment_id] for moment_id in moment_ids if moment_id in by_id], next_cursor
@@ -15,7 +15,8 @@ class TransactionService:
     def get_transactions_by_user(self, user_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[Transaction]:
         return self.db.query(Transaction).filter(Transaction.user_id == user_id).order_by(Transaction.transaction_date.desc()).offset(skip).limit(limit).all()
 
-    def create_transaction(self, user_id: uuid.UUID, transaction_in: TransactionCreate, status: str = "PENDING", connection_id: Optional[uuid.UUID] = None) -> Transaction:
+    def add_transaction(self, user_id: uuid.UUID, transaction_in: TransactionCreate, status: str = "PENDING", connection_id: Optional[uuid.UUID] = None) -> Transaction:
+        """Stage a transaction in the caller's unit of work; the caller commits."""
         db_transaction = Transaction(
             user_id=user_id,
             connection_id=connection_id,
@@ -26,18 +27,27 @@ class TransactionService:
             external_id=transaction_in.external_id
         )
         self.db.add(db_transaction)
+        return db_transaction
+
+    def create_transaction(self, user_id: uuid.UUID, transaction_in: TransactionCreate, status: str = "PENDING", connection_id: Optional[uuid.UUID] = None) -> Transaction:
+        db_transaction = self.add_transaction(user_id, transaction_in, status=status, connection_id=connection_id)
         self.db.commit()
         self.db.refresh(db_transaction)
         return db_transaction
 
+    def set_transaction_status(self, db_transaction: Transaction, new_status: str, external_id: Optional[str] = None) -> Transaction:
+        """Stage a status change in the caller's unit of work; the caller commits."""
+        db_transaction.status = new_status
+        if external_id:
+            db_transaction.external_id = external_id
+        self.db.add(db_transaction)
+        return db_transaction
+
     def update_transaction_status(self, transaction_id: uuid.UUID, new_status: str, external_id: Optional[str] = None) -> Optional[Transaction]:
         db_transaction = self.db.query(Transaction).filter(Transaction.transaction_id == transaction_id).first()
         if db_transaction:
-            db_transaction.status = new_status
-            if external_id:
-                db_transaction.external_id = external_id
-            self.db.add(db_transaction)
+            self.set_transaction_status(db_transaction, new_status, external_id=external_id)
             self.db.commit()
             self.db.refresh(db_transaction)
             return db_transaction
-        return None
\ No newline at end of file
+        return None
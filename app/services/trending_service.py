@@ -0,0 +1,199 @@
+"""
+Time-decayed trending ranking for moments.
+
+Every flirt or connection request adds a weight to the moment's score, and scores
+halve every TRENDING_HALF_LIFE_HOURS. Only PUBLIC moments are recorded (callers check), so
+every heap slot is servable. Scores are kept in forward-decay form
+(weight * 2^((t - landmark) / half_life)), so relative order never changes as time
+passes and the top-K heap only needs touching when an event arrives.
+
+The engine is per process. Every TRENDING_SNAPSHOT_INTERVAL_SECONDS each process adds
+the weight it recorded since its last snapshot to `trending_scores` (decaying the stored
+score first), so the table sums every worker's activity; it is reloaded from there on startup.
+"""
+import heapq
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.models.trending import TrendingScore
+from app.utils.background import PeriodicWorker
+
+# Rebase forward-decayed scores before 2^x can overflow a float
+_MAX_EXPONENT = 512
+
+
+class TrendingEngine:
+    def __init__(
+        self,
+        half_life_hours: float = settings.TRENDING_HALF_LIFE_HOURS,
+        top_k: int = settings.TRENDING_TOP_K,
+        max_tracked: int = settings.TRENDING_MAX_TRACKED
+    ):
+        self.half_life = half_life_hours * 3600
+        self.top_k = top_k
+        self.max_tracked = max_tracked
+        self._landmark = datetime.utcnow()
+        self._scores: Dict[uuid.UUID, float] = {}
+        self._heap: List[Tuple[float, uuid.UUID]] = [] # Min-heap of the current top-K
+        self._top: Dict[uuid.UUID, float] = {}
+        self._deltas: Dict[uuid.UUID, float] = {} # Weight recorded since the last snapshot, forward-decayed like _scores
+        self._removed: Set[uuid.UUID] = set() # Removed since the last snapshot
+        self._lock = threading.Lock()
+        self.worker: Optional[PeriodicWorker] = None
+
+    def _exponent(self, at: datetime) -> float:
+        return (at - self._landmark).total_seconds() / self.half_life
+
+    def _rebase(self, at: datetime) -> None:
+        factor = 2 ** -self._exponent(at)
+        self._scores = {moment_id: score * factor for moment_id, score in self._scores.items()}
+        self._deltas = {moment_id: delta * factor for moment_id, delta in self._deltas.items()}
+        self._landmark = at
+        self._rebuild_top()
+
+    def _rebuild_top(self) -> None:
+        self._heap = [(score, moment_id) for moment_id, score in heapq.nlargest(self.top_k, self._scores.items(), key=lambda item: item[1])]
+        heapq.heapify(self._heap)
+        self._top = {moment_id: score for score, moment_id in self._heap}
+
+    def _offer(self, moment_id: uuid.UUID, score: float, decreased: bool) -> None:
+        if moment_id in self._top:
+            if decreased:
+                # A moment outside the heap may now outrank it
+                self._rebuild_top()
+                return
+            self._top[moment_id] = score
+            self._heap = [(s, m) for m, s in self._top.items()]
+            heapq.heapify(self._heap)
+        elif len(self._heap) < self.top_k:
+            heapq.heappush(self._heap, (score, moment_id))
+            self._top[moment_id] = score
+        elif score > self._heap[0][0]:
+            _, evicted = heapq.heapreplace(self._heap, (score, moment_id))
+            del self._top[evicted]
+            self._top[moment_id] = score
+
+    def _prune(self) -> None:
+        # Local only: pending deltas of dropped moments are still persisted by the next snapshot
+        keep = heapq.nlargest(int(self.max_tracked * 0.9), self._scores.items(), key=lambda item: item[1])
+        self._scores = dict(keep)
+        self._rebuild_top()
+
+    def record(self, moment_id: uuid.UUID, weight: float, at: Optional[datetime] = None) -> None:
+        at = at or datetime.utcnow()
+        with self._lock:
+            if self._exponent(at) > _MAX_EXPONENT:
+                self._rebase(at)
+            increment = weight * 2 ** self._exponent(at)
+            self._deltas[moment_id] = self._deltas.get(moment_id, 0.0) + increment
+            score = self._scores.get(moment_id, 0.0) + increment
+            if score <= 0:
+                self._scores.pop(moment_id, None)
+                if moment_id in self._top:
+                    self._rebuild_top()
+            else:
+                self._scores[moment_id] = score
+                self._offer(moment_id, score, decreased=weight < 0)
+            if len(self._scores) > self.max_tracked:
+                self._prune()
+
+    def remove(self, moment_id: uuid.UUID) -> None:
+        with self._lock:
+            self._scores.pop(moment_id, None)
+            self._deltas.pop(moment_id, None)
+            self._removed.add(moment_id)
+            if moment_id in self._top:
+                self._rebuild_top()
+
+    def top(self, limit: Optional[int] = None, at: Optional[datetime] = None) -> List[Tuple[uuid.UUID, float]]:
+        """The highest-scoring moments with their scores decayed to `at` (default now), best first."""
+        with self._lock:
+            # Under the lock: a concurrent rebase moves the landmark and rescales the heap together
+            factor = 2 ** -self._exponent(at or datetime.utcnow())
+            ranked = sorted(self._heap, reverse=True)[:limit or self.top_k]
+        return [(moment_id, score * factor) for score, moment_id in ranked]
+
+    def snapshot(self, db: Session) -> int:
+        """
+        Add the weight recorded since the last snapshot to `trending_scores`, decaying each stored
+        score to now first, and delete removed moments. Other processes' increments are preserved.
+        Returns the number of scores incremented.
+        """
+        now = datetime.utcnow()
+        with self._lock:
+            factor = 2 ** -self._exponent(now)
+            deltas = {moment_id: delta * factor for moment_id, delta in self._deltas.items()}
+            removed = self._removed
+            self._deltas, self._removed = {}, set()
+        if not deltas and not removed:
+            return 0
+        try:
+            if removed:
+                db.query(TrendingScore).filter(TrendingScore.moment_id.in_(removed)).delete(synchronize_session=False)
+            if deltas:
+                moment_ids = sorted(deltas) # Fixed lock order across concurrent snapshots
+                db.execute(
+                    dialect_insert(db, TrendingScore).on_conflict_do_nothing(index_elements=["moment_id"]),
+                    [{"moment_id": moment_id, "score": 0.0, "updated_at": now} for moment_id in moment_ids]
+                )
+                stored = db.query(TrendingScore).filter(TrendingScore.moment_id.in_(moment_ids)).order_by(TrendingScore.moment_id).with_for_update().all()
+                for row in stored:
+                    row.score = self._decay(row.score, row.updated_at, now) + deltas[row.moment_id]
+                    row.updated_at = now
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                # Re-queue in the current landmark's units; a rebase may have run meanwhile
+                factor = 2 ** self._exponent(now)
+                for moment_id, delta in deltas.items():
+                    if moment_id not in self._removed:
+                        self._deltas[moment_id] = self._deltas.get(moment_id, 0.0) + delta * factor
+                self._removed |= removed
+            raise
+        return len(deltas)
+
+    def _decay(self, score: float, since: datetime, now: datetime) -> float:
+        return score * 2 ** (-(now - since).total_seconds() / self.half_life)
+
+    def load(self, db: Session) -> int:
+        """Replace in-memory state with the last snapshot."""
+        now = datetime.utcnow()
+        snapshot = db.query(TrendingScore).all()
+        with self._lock:
+            self._landmark = now
+            self._scores = {
+                row.moment_id: self._decay(row.score, row.updated_at, now)
+                for row in snapshot if row.score > 0 # Net decrements from several processes can leave a score at or below zero
+            }
+            self._deltas, self._removed = {}, set()
+            self._rebuild_top()
+        return len(snapshot)
+
+
+trending_engine = TrendingEngine()
+
+
+def snapshot_trending() -> None:
+    db = SessionLocal()
+    try:
+        trending_engine.snapshot(db)
+    finally:
+        db.close()
+
+
+def load_trending() -> None:
+    db = SessionLocal()
+    try:
+        trending_engine.load(db)
+    finally:
+        db.close()
+
+
+trending_engine.worker = PeriodicWorker("trending-snapshot", settings.TRENDING_SNAPSHOT_INTERVAL_SECONDS, snapshot_trending)
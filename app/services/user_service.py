@@ -1,8 +1,11 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, verify_and_update_password, password_hasher
+from app.core.principal import principal_cache
 import uuid
 
 
@@ -37,8 +40,13 @@ class UserService:
         user = self.get_user_by_username(username)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = verify_and_update_password(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            # Transparently upgrade hashes made with an older cost factor
+            user.hashed_password = new_hash
+            self.db.commit()
         return user
     
     def update_user(self, user_id: uuid.UUID, user_data: UserUpdate) -> Optional[User]:
@@ -55,4 +63,65 @@ class UserService:
         
         self.db.commit()
         self.db.refresh(user)
+        # Cached principals may carry the old username/flags, or belong to a now deactivated user
+        principal_cache.invalidate_user(user_id)
+        return user
+
+
+class AsyncUserService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user(self, user_id: uuid.UUID) -> Optional[User]:
+        return await self.db.get(User, user_id)
+
+    async def get_user_by_email(self, email: str) -> Optional[User]:
+        return (await self.db.scalars(select(User).where(User.email == email))).first()
+
+    async def get_user_by_username(self, username: str) -> Optional[User]:
+        return (await self.db.scalars(select(User).where(User.username == username))).first()
+
+    async def create_user(self, user_data: UserCreate) -> User:
+        """Like UserService.create_user, with bcrypt on the password hasher pool. May raise PasswordHasherOverloaded."""
+        db_user = User(
+            email=user_data.email,
+            username=user_data.username,
+            hashed_password=await password_hasher.hash(user_data.password),
+            is_active=user_data.is_active,
+            is_superuser=user_data.is_superuser
+        )
+        self.db.add(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        return db_user
+
+    async def update_user(self, user_id: uuid.UUID, user_data: UserUpdate) -> Optional[User]:
+        """Like UserService.update_user, with bcrypt on the password hasher pool. May raise PasswordHasherOverloaded."""
+        user = await self.get_user(user_id)
+        if not user:
+            return None
+
+        update_data = user_data.model_dump(exclude_unset=True)
+        if "password" in update_data:
+            update_data["hashed_password"] = await password_hasher.hash(update_data.pop("password"))
+
+        for field, value in update_data.items():
+            setattr(user, field, value)
+
+        await self.db.commit()
+        await self.db.refresh(user)
+        principal_cache.invalidate_user(user_id)
+        return user
+
+    async def authenticate_user(self, username: str, password: str) -> Optional[User]:
+        """Like UserService.authenticate_user, with bcrypt on the password hasher pool. May raise PasswordHasherOverloaded."""
+        user = await self.get_user_by_username(username)
+        if not user:
+            return None
+        verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not verified:
+            return None
+        if new_hash:
+            user.hashed_password = new_hash
+            await self.db.commit()
         return user
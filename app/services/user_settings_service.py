@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from app.models.user_settings import UserSettings
 from app.schemas.user_settings import UserSettingsBase, UserSettingsUpdate
+from app.services.notification_dispatcher import notification_preferences
 from typing import Optional
 import uuid
 
@@ -19,6 +20,7 @@ class UserSettingsService:
         self.db.add(db_settings)
         self.db.commit()
         self.db.refresh(db_settings)
+        notification_preferences.invalidate(user_id)
         return db_settings
 
     def update_user_settings(self, user_id: uuid.UUID, settings_update: UserSettingsUpdate) -> Optional[UserSettings]:
@@ -31,4 +33,5 @@ class UserSettingsService:
         
         self.db.commit()
         self.db.refresh(db_settings)
+        notification_preferences.invalidate(user_id)
         return db_settings
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Write-behind view counting for moments.
+
+Reads only bump an in-process counter; a background worker periodically applies
+the buffered increments as one batched `UPDATE moments SET views = views + n`.
+
+Durability: increments live in memory until the next flush, so a crash loses at
+most `VIEW_FLUSH_INTERVAL_SECONDS` worth of views per worker process (or fewer,
+since the buffer is flushed early once `VIEW_BUFFER_MAX_MOMENTS` moments are
+pending). A clean shutdown flushes the buffer. Failed flushes are re-buffered.
+"""
+import threading
+import uuid
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.moment import Moment
+from app.utils.background import PeriodicWorker
+
+
+class ViewCounter:
+    def __init__(self, max_pending: int = settings.VIEW_BUFFER_MAX_MOMENTS):
+        self.max_pending = max_pending
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self.worker: Optional[PeriodicWorker] = None
+
+    def record(self, moment_id: uuid.UUID, count: int = 1) -> None:
+        with self._lock:
+            self._pending[moment_id] += count
+            overflow = len(self._pending) >= self.max_pending
+        if overflow and self.worker:
+            self.worker.wake()
+
+    def pending(self, moment_id: uuid.UUID) -> int:
+        """Views recorded in this process that have not been flushed yet."""
+        with self._lock:
+            return self._pending.get(moment_id, 0)
+
+    def flush(self, db: Session) -> int:
+        """Apply all buffered increments in one batched UPDATE. Returns the number of moments touched."""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+        if not batch:
+            return 0
+
+        stmt = (
+            update(Moment.__table__)
+            .where(Moment.__table__.c.moment_id == bindparam("b_moment_id"))
+            .values(views=Moment.__table__.c.views + bindparam("b_views"))
+        )
+        try:
+            db.execute(stmt, [{"b_moment_id": moment_id, "b_views": n} for moment_id, n in batch.items()])
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the increments back so the next flush retries them
+            with self._lock:
+                self._pending.update(batch)
+            raise
+        return len(batch)
+
+
+view_counter = ViewCounter()
+
+
+def flush_views() -> None:
+    db = SessionLocal()
+    try:
+        view_counter.flush(db)
+    finally:
+        db.close()
+
+
+view_counter.worker = PeriodicWorker("view-counter-flush", settings.VIEW_FLUSH_INTERVAL_SECONDS, flush_views)
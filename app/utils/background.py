@@ -0,0 +1,57 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """
+    Runs `task` on a daemon thread every `interval` seconds.
+    `wake()` triggers an early run; `stop()` runs the task one last time so
+    buffered state is not dropped on a clean shutdown (unless `run_on_stop` is off,
+    for tasks with nothing to flush).
+    """
+
+    def __init__(self, name: str, interval: float, task: Callable[[], None], run_on_stop: bool = True):
+        self.name = name
+        self.interval = interval
+        self.task = task
+        self.run_on_stop = run_on_stop
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        if not self._thread:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopping.is_set() and not self.run_on_stop:
+                return
+            self._run_once()
+            if self._stopping.is_set():
+                return
+
+    def _run_once(self) -> None:
+        try:
+            self.task()
+        except Exception:
+            logger.exception("Background task %s failed", self.name)
@@ -0,0 +1,75 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import and_, or_
+
+# Keyset ("seek") pagination helpers.
+# A cursor is an opaque, URL-safe token wrapping the (timestamp, id) pair of the
+# last row a client has seen. Pages are fetched with a range predicate on an
+# index instead of OFFSET, so deep pages cost the same as the first one.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Position of the newest row a client has received; passed back as `since` to fetch only what is new
+SYNC_CURSOR_HEADER = "X-Sync-Cursor"
+
+
+def encode_cursor(created_at: datetime, entity_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{entity_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Decode a cursor produced by `encode_cursor`. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, entity_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(entity_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+
+
+def _seek(order_column, id_column, value, entity_id, descending: bool):
+    # Expanded instead of using a row-value comparison so it works on every backend
+    if descending:
+        return or_(
+            order_column < value,
+            and_(order_column == value, id_column < entity_id),
+        )
+    return or_(
+        order_column > value,
+        and_(order_column == value, id_column > entity_id),
+    )
+
+
+def keyset_filter(time_column, id_column, cursor: str, descending: bool = True):
+    """
+    Build the seek predicate for rows strictly after `cursor` in
+    (time_column, id_column) order.
+    """
+    created_at, entity_id = decode_cursor(cursor)
+    return _seek(time_column, id_column, created_at, entity_id, descending)
+
+
+# Ranked results (e.g. search) page on (score, id) instead of (timestamp, id).
+
+def encode_rank_cursor(score: float, entity_id: uuid.UUID) -> str:
+    raw = f"{score!r}|{entity_id}".encode() # repr() round-trips floats exactly
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, uuid.UUID]:
+    """Decode a cursor produced by `encode_rank_cursor`. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, entity_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return float(score), uuid.UUID(entity_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+
+
+def rank_filter(score_column, id_column, cursor: str):
+    """Seek predicate for rows after `cursor` in (score DESC, id DESC) order."""
+    score, entity_id = decode_rank_cursor(cursor)
+    return _seek(score_column, id_column, score, entity_id, descending=True)
@@ -1,17 +1,61 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.router import api_router
-from app.core.database import engine, Base
+from app.core.database import engine, async_engine, pool_status, Base
+from app.core import search # noqa: F401 - registers the full-text index DDL with create_all
+from app.core.replicas import replica_router
+from app.core.principal import principal_cache
+from app.core.pubsub import broker
+from app.services.view_counter import view_counter
+from app.services.notification_dispatcher import notification_dispatcher, notification_preferences
+from app.services.notification_stream import notification_stream
+from app.services.notification_retention import notification_retention, prepare_notification_storage
+from app.services.trending_service import trending_engine, load_trending
+from app.services.monetisation_config_service import monetization_config_cache
+from app.services.payment_webhooks import payment_webhooks
+from app.services.earnings_reconciliation import earnings_reconciliation
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers: started once per process, stopped (and flushed) on shutdown
+    view_counter.worker.start()
+    prepare_notification_storage()
+    notification_dispatcher.worker.start()
+    notification_retention.worker.start()
+    payment_webhooks.worker.start()
+    earnings_reconciliation.worker.start()
+    load_trending()
+    trending_engine.worker.start()
+    monetization_config_cache.worker.start()
+    if replica_router.replicas:
+        replica_router.heartbeat()
+        replica_router.worker.start()
+    await broker.start()
+    await notification_stream.start()
+    yield
+    await notification_stream.stop()
+    await broker.stop()
+    replica_router.worker.stop()
+    monetization_config_cache.worker.stop()
+    trending_engine.worker.stop()
+    earnings_reconciliation.worker.stop()
+    payment_webhooks.worker.stop()
+    notification_retention.worker.stop()
+    notification_dispatcher.worker.stop()
+    view_counter.worker.stop()
+    await async_engine.dispose()
+
 app = FastAPI(
     title="Kontent API",
     version="1.0.0",
     description="""Kontent API is the backend service for a dynamic and engaging dating and social networking platform that combines the discoverability of social media (like Twitter and Instagram) with a unique, paid connection model. Our platform is designed to facilitate genuine connections and "link-ups" by introducing a strategic monetization layer for direct, private interactions, while also empowering content creators.""",
     openapi_url=f"{settings.API_V1_STR}/openapi.json" if settings.DEBUG else None,
+    lifespan=lifespan,
 )
 
 # Set up CORS
@@ -34,6 +78,14 @@ def root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/caches")
+def cache_stats():
+    return {"principals": principal_cache.stats(), "notification_preferences": notification_preferences.stats(), "monetization_configs": monetization_config_cache.stats()}
+
+@app.get("/health/db")
+def database_pool_stats():
+    return {"sync": pool_status(engine), "async": pool_status(async_engine.sync_engine), "replicas": replica_router.status()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=settings.DEBUG)
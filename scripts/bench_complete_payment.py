@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Payment activation latency benchmark.
+
+Runs the app in-process against a throwaway SQLite database, opens one
+PENDING_PAYMENT connection per moment, then fires concurrent
+POST /connections/{id}/complete_payment requests and reports latency
+percentiles. Usage:
+
+    python scripts/bench_complete_payment.py --requests 500 --concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx  # noqa: E402
+from sqlalchemy import update  # noqa: E402
+from main import app  # noqa: E402
+from app.core.database import SessionLocal  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _promote_to_admin(username):
+    db = SessionLocal()
+    try:
+        db.execute(update(User).where(User.username == username).values(is_superuser=True))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _login(client, username):
+    await client.post("/api/v1/users/", json={"email": f"{username}@example.com", "username": username, "password": "benchpass123"})
+    response = await client.post("/api/v1/auth/token", data={"username": username, "password": "benchpass123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def main(total: int, concurrency: int, duplicates: bool):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        payer, poster = await _login(client, "payer"), await _login(client, "poster")
+        _promote_to_admin("poster") # Creates the fee config below
+        poster_id = (await client.get("/api/v1/users/me", headers=poster)).json()["user_id"]
+        await client.post("/api/v1/admin/monetization_configs", headers=poster, json={
+            "config_name": "DM_FEE_STANDARD", "connection_fee_base": "5.00",
+            "platform_cut_percentage": "0.20", "poster_share_percentage": "0.80",
+        })
+
+        connection_ids = []
+        for i in range(total):
+            moment = (await client.post("/api/v1/moments/", headers=poster, json={"text_content": f"moment {i}"})).json()
+            connection = (await client.post("/api/v1/connections/", headers=payer, json={"recipient_id": poster_id, "moment_id": moment["moment_id"]})).json()
+            connection_ids.append(connection["connection_id"])
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, statuses = [], []
+
+        async def complete(connection_id, attempt):
+            body = {"connection_id": connection_id, "amount": 5.0, "payment_method": "Stripe_Card", "external_id": f"{connection_id}-{attempt}"}
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(f"/api/v1/connections/{connection_id}/complete_payment", headers=payer, json=body)
+                latencies.append(time.perf_counter() - started)
+                statuses.append(response.status_code)
+
+        attempts = (0, 1) if duplicates else (0,)
+        started = time.perf_counter()
+        await asyncio.gather(*(complete(connection_id, attempt) for connection_id in connection_ids for attempt in attempts))
+        elapsed = time.perf_counter() - started
+
+    counts = {code: statuses.count(code) for code in sorted(set(statuses))}
+    print(f"complete_payment: {len(statuses)} requests {counts} concurrency: {concurrency} in {elapsed:.2f}s")
+    print(f"latency: p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {percentile(latencies, 95) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duplicates", action="store_true", help="submit every payment twice, concurrently")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.duplicates))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark.
+
+Runs the app in-process against a throwaway SQLite database, fires concurrent
+POST /auth/token requests and, meanwhile, pings /health to show how long the
+event loop is blocked. Usage:
+
+    python scripts/bench_login.py --requests 64 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx  # noqa: E402
+from main import app  # noqa: E402
+
+
+async def main(total: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/api/v1/users/", json={"email": "bench@example.com", "username": "bench", "password": "benchpass123"})
+        credentials = {"username": "bench", "password": "benchpass123"}
+        await client.post("/api/v1/auth/token", data=credentials) # Warm-up (and any hash upgrade)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        statuses = []
+        done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                statuses.append((await client.post("/api/v1/auth/token", data=credentials)).status_code)
+
+        health_latencies = []
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                health_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        prober = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+
+    ok = statuses.count(200)
+    print(f"logins: {total} (200: {ok}, 503: {statuses.count(503)}) concurrency: {concurrency}")
+    print(f"throughput: {ok / elapsed:.1f} logins/s over {elapsed:.2f}s")
+    if health_latencies:
+        print(f"/health during logins: p50 {statistics.median(health_latencies) * 1000:.1f} ms, max {max(health_latencies) * 1000:.1f} ms ({len(health_latencies)} probes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
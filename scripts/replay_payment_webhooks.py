@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Stand-in payment gateway for webhook load testing.
+
+Runs the app in-process against a throwaway SQLite database, opens one
+PENDING_PAYMENT connection per moment, then replays a burst of signed
+SUCCESS webhooks to POST /transactions/webhook, each delivered --retries
+times in shuffled order like a gateway retrying on timeouts. Reports ingest
+latency, then drains the queue and checks every connection was activated
+exactly once. Usage:
+
+    python scripts/replay_payment_webhooks.py --payments 500 --retries 3 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "whsec_replay")
+
+import httpx  # noqa: E402
+from sqlalchemy import update  # noqa: E402
+from main import app  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import SessionLocal  # noqa: E402
+from app.models.connection import Connection  # noqa: E402
+from app.models.payment_event import PaymentEvent  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.payment_webhooks import SIGNATURE_HEADER, payment_webhooks, sign_payload  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _promote_to_admin(username):
+    db = SessionLocal()
+    try:
+        db.execute(update(User).where(User.username == username).values(is_superuser=True))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _login(client, username):
+    await client.post("/api/v1/users/", json={"email": f"{username}@example.com", "username": username, "password": "benchpass123"})
+    response = await client.post("/api/v1/auth/token", data={"username": username, "password": "benchpass123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def main(payments: int, retries: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        payer, poster = await _login(client, "payer"), await _login(client, "poster")
+        _promote_to_admin("poster") # Creates the fee config below
+        poster_id = (await client.get("/api/v1/users/me", headers=poster)).json()["user_id"]
+        await client.post("/api/v1/admin/monetization_configs", headers=poster, json={
+            "config_name": "DM_FEE_STANDARD", "connection_fee_base": "5.00",
+            "platform_cut_percentage": "0.20", "poster_share_percentage": "0.80",
+        })
+        connection_ids = []
+        for i in range(payments):
+            moment = (await client.post("/api/v1/moments/", headers=poster, json={"text_content": f"moment {i}"})).json()
+            connection = (await client.post("/api/v1/connections/", headers=payer, json={"recipient_id": poster_id, "moment_id": moment["moment_id"]})).json()
+            connection_ids.append(connection["connection_id"])
+
+        deliveries = [
+            json.dumps({"external_id": f"ch_{i}", "status": "SUCCESS", "connection_id": connection_id,
+                        "amount": "5.00", "payment_method": "Stripe_Card"}).encode()
+            for i, connection_id in enumerate(connection_ids)
+        ] * retries
+        random.shuffle(deliveries)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, acks = [], Counter()
+
+        async def deliver(body):
+            headers = {"Content-Type": "application/json", SIGNATURE_HEADER: sign_payload(body, settings.PAYMENT_WEBHOOK_SECRET)}
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/api/v1/transactions/webhook", content=body, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                acks[response.json().get("queued") if response.status_code == 202 else response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(deliver(body) for body in deliveries))
+        elapsed = time.perf_counter() - started
+
+    print(f"ingested: {len(deliveries)} deliveries in {elapsed:.2f}s ({len(deliveries) / elapsed:.0f}/s) "
+          f"queued: {acks[True]} duplicates: {acks[False]} errors: {sum(n for k, n in acks.items() if not isinstance(k, bool))}")
+    print(f"ingest latency: p50 {statistics.median(latencies) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms")
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        applied = payment_webhooks.apply(db)
+        print(f"applied: {applied} events in {time.perf_counter() - started:.2f}s (batch size {payment_webhooks.batch_size})")
+        print("outcomes:", dict(Counter(outcome for (outcome,) in db.query(PaymentEvent.outcome))))
+        activated = db.query(Connection).filter(Connection.status == "PAID_PENDING_ACCEPT").count()
+        print(f"connections activated: {activated}/{payments}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payments", type=int, default=500)
+    parser.add_argument("--retries", type=int, default=3, help="deliveries per event")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.payments, args.retries, args.concurrency))
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Maintenance: VACUUM the configured SQLite database (DATABASE_URL) and rebuild
+its full-text search indexes, whose rowids VACUUM may renumber. Run it with the
+app stopped. Does nothing on Postgres. Usage:
+
+    python scripts/vacuum_db.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import engine  # noqa: E402
+from app.core.search import vacuum_database  # noqa: E402
+
+
+if __name__ == "__main__":
+    if engine.dialect.name != "sqlite":
+        print(f"Nothing to do on {engine.dialect.name}.")
+        sys.exit(0)
+    vacuum_database(engine)
+    print(f"Vacuumed {engine.url.database} and rebuilt search indexes.")
@@ -1,14 +1,23 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.core.database import get_db, Base
+from sqlalchemy.pool import NullPool
+from app.core.database import get_db, get_async_db, async_database_url, configure_engine, Base
 from app.core.config import settings
+from app.models.connection import Connection
+from app.schemas.user import UserCreate
+from app.services.user_service import UserService
 from main import app
 
 # Create test database
-engine = create_engine(settings.TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = configure_engine(create_engine(settings.TEST_DATABASE_URL, connect_args={"check_same_thread": False}))
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# NullPool: each TestClient runs its own event loop, so async connections must not be reused across tests
+async_engine = create_async_engine(async_database_url(settings.TEST_DATABASE_URL), poolclass=NullPool)
+configure_engine(async_engine.sync_engine)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 @pytest.fixture(scope="function")
 def db():
@@ -28,7 +37,36 @@ def client(db):
         finally:
             db.close()
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="function")
+def create_user(db):
+    """Factory for committed users: `create_user("alice")` gets alice@example.com with password testpass123."""
+    def _create_user(username="testuser", **fields):
+        return UserService(db).create_user(UserCreate(
+            email=f"{username}@example.com",
+            username=username,
+            password="testpass123",
+            **fields
+        ))
+    return _create_user
+
+@pytest.fixture(scope="function")
+def create_connection(db):
+    """Factory for committed connections between two users; fees default to zero."""
+    def _create_connection(requester, recipient, status="ACCEPTED", fee_amount=0, platform_cut=0, poster_share=0):
+        connection = Connection(requester_id=requester.user_id, recipient_id=recipient.user_id, status=status,
+                                fee_amount=fee_amount, platform_cut=platform_cut, poster_share=poster_share)
+        db.add(connection)
+        db.commit()
+        return connection
+    return _create_connection
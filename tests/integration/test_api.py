@@ -20,3 +20,8 @@ def test_create_user(client):
     assert data["email"] == "test@example.com"
     assert data["username"] == "testuser"
     assert "id" in data
+
+def test_database_pool_stats(client):
+    response = client.get("/health/db")
+    assert response.status_code == 200
+    assert set(response.json()) == {"sync", "async", "replicas"}
@@ -0,0 +1,178 @@
+import json
+import uuid
+
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.principal import principal_cache
+from app.models.user import User
+from app.services.payment_webhooks import SIGNATURE_HEADER, sign_payload
+
+
+def _auth_headers(client, username):
+    client.post("/api/v1/users/", json={"email": f"{username}@example.com", "username": username, "password": "testpass123"})
+    token = client.post("/api/v1/auth/token", data={"username": username, "password": "testpass123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_moment_reads_run_on_async_session(client):
+    headers = _auth_headers(client, "creator")
+    moment = client.post("/api/v1/moments/", json={"text_content": "hello"}, headers=headers).json()
+
+    feed = client.get("/api/v1/moments/")
+    assert feed.status_code == 200
+    assert [m["moment_id"] for m in feed.json()] == [moment["moment_id"]]
+    assert feed.json()[0]["author"]["username"] == "creator"
+
+    detail = client.get(f"/api/v1/moments/{moment['moment_id']}")
+    assert detail.status_code == 200
+    assert detail.json()["views"] == 1
+
+
+def test_notifications_use_async_current_user(client):
+    headers = _auth_headers(client, "reader")
+    response = client.get("/api/v1/notifications/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_authenticated_requests_reuse_cached_principal(client):
+    headers = _auth_headers(client, "regular")
+    client.get("/api/v1/users/me", headers=headers)
+    hits = principal_cache.stats()["hits"]
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    assert principal_cache.stats()["hits"] == hits + 1
+
+
+def test_new_messages_are_pushed_over_websocket(client, db, create_connection):
+    from app.models.user import User
+
+    sender_headers = _auth_headers(client, "sender")
+    _auth_headers(client, "listener")
+    token = client.post("/api/v1/auth/token", data={"username": "listener", "password": "testpass123"}).json()["access_token"]
+    sender = db.query(User).filter(User.username == "sender").one()
+    listener = db.query(User).filter(User.username == "listener").one()
+    connection = create_connection(sender, listener)
+
+    with client.websocket_connect(f"/api/v1/messages/ws?token={token}") as socket:
+        response = client.post("/api/v1/messages/", json={"connection_id": str(connection.connection_id), "text_content": "hi"}, headers=sender_headers)
+        assert response.status_code == 201
+        event = socket.receive_json()
+
+    assert event["type"] == "message"
+    assert event["data"]["message_id"] == response.json()["message_id"]
+    assert event["data"]["sender"]["username"] == "sender"
+
+
+def test_websocket_rejects_invalid_token(client):
+    from starlette.websockets import WebSocketDisconnect
+
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/api/v1/messages/ws?token=bogus") as socket:
+            socket.receive_json()
+
+
+def test_unread_count_endpoint_follows_mark_all_read(client, db):
+    from app.models.user import User
+    from app.services.notification_service import NotificationService
+
+    headers = _auth_headers(client, "badge")
+    user = db.query(User).filter(User.username == "badge").one()
+    for _ in range(2):
+        NotificationService(db).create_notification(recipient_id=user.user_id, type="NEW_FLIRT", title="Flirt", message="hi")
+
+    assert client.get("/api/v1/notifications/me/unread_count", headers=headers).json() == {"unread_count": 2}
+    assert client.post("/api/v1/notifications/mark_all_read", headers=headers).status_code == 204
+    assert client.get("/api/v1/notifications/me/unread_count", headers=headers).json() == {"unread_count": 0}
+
+
+def test_payment_webhook_requires_signature_when_secret_set(client, monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENT_WEBHOOK_SECRET", "whsec_test")
+    body = json.dumps({"external_id": "ch_1", "status": "SUCCESS", "connection_id": str(uuid.uuid4()), "amount": "5.00"}).encode()
+    headers = {"Content-Type": "application/json"}
+
+    assert client.post("/api/v1/transactions/webhook", content=body, headers=headers).status_code == 401
+    headers[SIGNATURE_HEADER] = sign_payload(body, "whsec_test")
+    first = client.post("/api/v1/transactions/webhook", content=body, headers=headers)
+    assert first.status_code == 202 and first.json() == {"queued": True}
+    assert client.post("/api/v1/transactions/webhook", content=body, headers=headers).json() == {"queued": False}
+
+
+def test_payment_webhook_fails_closed_without_secret(client, monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENT_WEBHOOK_SECRET", None)
+    body = json.dumps({"external_id": "ch_1", "status": "SUCCESS", "connection_id": str(uuid.uuid4()), "amount": "5.00"}).encode()
+    headers = {"Content-Type": "application/json", SIGNATURE_HEADER: sign_payload(body, "anything")}
+
+    assert client.post("/api/v1/transactions/webhook", content=body, headers=headers).status_code == 503
+
+    monkeypatch.setattr(settings, "PAYMENT_WEBHOOK_ALLOW_UNSIGNED", True)
+    assert client.post("/api/v1/transactions/webhook", content=body, headers={"Content-Type": "application/json"}).status_code == 202
+
+
+def test_earnings_summary_is_not_shadowed_by_earning_id_route(client):
+    headers = _auth_headers(client, "earner")
+    response = client.get("/api/v1/earnings/summary", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_admin_endpoints_require_superuser(client):
+    headers = _auth_headers(client, "regular")
+    assert client.post("/api/v1/admin/payouts", headers=headers).status_code == 403
+    # Sign-up cannot grant it either
+    signup = client.post("/api/v1/users/", json={"email": "sneaky@example.com", "username": "sneaky", "password": "testpass123", "is_superuser": True})
+    assert signup.json()["is_superuser"] is False
+
+
+def test_admin_payout_batch_is_started_and_resumed(client, db):
+    headers = _auth_headers(client, "admin")
+    db.execute(update(User).where(User.username == "admin").values(is_superuser=True))
+    db.commit()
+    started = client.post("/api/v1/admin/payouts", headers=headers)
+    assert started.status_code == 202
+    batch_id = started.json()["batch_id"]
+    # The run happens on its own session after the response; until it completes, starting again resumes it
+    assert client.post("/api/v1/admin/payouts", headers=headers).json()["batch_id"] == batch_id
+    assert client.get(f"/api/v1/admin/payouts/{batch_id}", headers=headers).json()["status"] == "RUNNING"
+    assert client.get(f"/api/v1/admin/payouts/{uuid.uuid4()}", headers=headers).status_code == 404
+
+
+def test_password_change_hashes_on_the_hasher_pool(client, monkeypatch):
+    from app.core import security
+    from app.core.security import PasswordHasherOverloaded
+
+    headers = _auth_headers(client, "changer")
+    user_id = client.get("/api/v1/users/me", headers=headers).json()["user_id"]
+    hashed = []
+    real_hash = security.password_hasher.hash
+
+    async def tracking_hash(password):
+        hashed.append(password)
+        return await real_hash(password)
+
+    monkeypatch.setattr(security.password_hasher, "hash", tracking_hash)
+    assert client.put(f"/api/v1/users/{user_id}", json={"password": "newpass456"}, headers=headers).status_code == 200
+    assert hashed == ["newpass456"]
+    assert client.post("/api/v1/auth/token", data={"username": "changer", "password": "newpass456"}).status_code == 200
+
+    async def overloaded(password):
+        raise PasswordHasherOverloaded()
+
+    monkeypatch.setattr(security.password_hasher, "hash", overloaded)
+    busy = client.post("/api/v1/users/", json={"email": "late@example.com", "username": "late", "password": "testpass123"})
+    assert busy.status_code == 503
+
+
+def test_mark_connection_read_distinguishes_unknown_and_foreign_connections(client, db, create_connection):
+    _auth_headers(client, "alice")
+    _auth_headers(client, "bob")
+    outsider_headers = _auth_headers(client, "eve")
+    alice = db.query(User).filter(User.username == "alice").one()
+    bob = db.query(User).filter(User.username == "bob").one()
+    connection_id = create_connection(alice, bob).connection_id
+
+    unknown = client.put(f"/api/v1/messages/connections/{uuid.uuid4()}/read", json={}, headers=outsider_headers)
+    assert unknown.status_code == 404
+    foreign = client.put(f"/api/v1/messages/connections/{connection_id}/read", json={}, headers=outsider_headers)
+    assert foreign.status_code == 403
@@ -0,0 +1,36 @@
+import time
+
+from app.core.principal import Principal, PrincipalCache, principal_cache
+from app.schemas.user import UserUpdate
+from app.services.user_service import UserService
+from app.utils.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_principal_never_outlives_token_expiry():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    principal = Principal(None, "ghost", "ghost@example.com", True, False)
+    cache.put("expired-token", principal, expires_at=time.time() - 1)
+
+    assert cache.get("expired-token") is None
+
+
+def test_update_user_invalidates_cached_principals(db, create_user):
+    user_service = UserService(db)
+    user = create_user()
+    principal_cache.put("token", Principal.from_user(user))
+
+    user_service.update_user(user.user_id, UserUpdate(is_active=False))
+
+    assert principal_cache.get("token") is None
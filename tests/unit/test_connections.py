@@ -0,0 +1,76 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models.earning import Earning
+from app.models.notification import NotificationOutbox
+from app.models.transaction import Transaction
+from app.schemas.connection import ConnectionStatusUpdate
+from app.schemas.transaction import TransactionCreate
+from app.schemas.message import MessageCreate
+from app.services.connection_service import ConnectionService
+from app.services.message_service import MessageService
+
+
+def _send(db, connection, sender, text):
+    return MessageService(db).create_message(MessageCreate(connection_id=connection.connection_id, text_content=text), sender.user_id)
+
+
+def test_inbox_orders_by_last_message_with_preview_and_unread(db, create_user, create_connection):
+    me, bob, carol, dave = (create_user(name) for name in ("me", "bob", "carol", "dave"))
+    with_bob = create_connection(me, bob)
+    with_carol = create_connection(carol, me)
+    create_connection(me, dave, status="PENDING_PAYMENT")
+
+    _send(db, with_bob, bob, "hi from bob")
+    _send(db, with_carol, carol, "hi from carol")
+    _send(db, with_carol, carol, "x" * 300)
+    _send(db, with_bob, me, "reply to bob")
+
+    connection_service = ConnectionService(db)
+    page, cursor = connection_service.get_inbox(me.user_id, limit=1)
+    (bob_conversation,) = page
+    assert bob_conversation.other_user.username == "bob"
+    assert bob_conversation.last_message.text_preview == "reply to bob"
+    assert bob_conversation.unread_count == 1
+
+    page, cursor = connection_service.get_inbox(me.user_id, limit=1, cursor=cursor)
+    (carol_conversation,) = page
+    assert carol_conversation.other_user.username == "carol"
+    assert len(carol_conversation.last_message.text_preview) == 100
+    assert carol_conversation.unread_count == 2
+    assert cursor is None
+
+    MessageService(db).mark_read_up_to(with_carol.connection_id, me.user_id)
+    unread = {c.other_user.username: c.unread_count for c in connection_service.get_inbox(me.user_id)[0]}
+    assert unread == {"bob": 1, "carol": 0}
+
+
+def test_payment_activation_is_one_commit_and_rejects_resubmits(db, create_user, create_connection):
+    payer, poster, other = (create_user(name) for name in ("payer", "poster", "other"))
+    connection = create_connection(payer, poster, status="PENDING_PAYMENT")
+    payment = TransactionCreate(connection_id=connection.connection_id, amount=5.0, payment_method="Stripe_Card", external_id="ch_1")
+    connection_service = ConnectionService(db)
+
+    with pytest.raises(HTTPException) as wrong_payer:
+        connection_service.process_payment_and_activate_connection(connection.connection_id, payment, payer_id=other.user_id)
+    assert wrong_payer.value.status_code == 403
+
+    commits = []
+    record_commit = commits.append
+    event.listen(db, "after_commit", record_commit)
+    activated = connection_service.process_payment_and_activate_connection(connection.connection_id, payment, payer_id=payer.user_id)
+    event.remove(db, "after_commit", record_commit)
+
+    assert len(commits) == 1
+    assert activated.status == "PAID_PENDING_ACCEPT"
+    assert db.query(Transaction).filter(Transaction.connection_id == connection.connection_id, Transaction.status == "SUCCESS").count() == 1
+    assert db.query(NotificationOutbox).filter(NotificationOutbox.recipient_id == poster.user_id, NotificationOutbox.type == "CONNECTION_REQUEST").count() == 1
+
+    with pytest.raises(HTTPException) as resubmit:
+        connection_service.process_payment_and_activate_connection(connection.connection_id, payment, payer_id=payer.user_id)
+    assert resubmit.value.status_code == 400
+
+    accepted = connection_service.handle_recipient_response(connection.connection_id, poster.user_id, ConnectionStatusUpdate(status="ACCEPTED"))
+    assert accepted.status == "ACCEPTED"
+    assert db.query(Earning).filter(Earning.connection_id == connection.connection_id, Earning.status == "PENDING_PAYOUT").count() == 1
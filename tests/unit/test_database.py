@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+from app.core import database
+from app.core.config import settings
+from app.core.database import configure_engine
+
+# PRAGMA synchronous reports the level as a number
+SYNCHRONOUS_LEVELS = {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3}
+
+
+def test_unsupported_backend_is_rejected_at_engine_setup():
+    with pytest.raises(ValueError, match="mysql"):
+        configure_engine(SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+
+
+@pytest.mark.skipif(database.engine.dialect.name != "sqlite", reason="SQLite pragmas only")
+def test_configured_engine_applies_sqlite_pragmas():
+    with database.engine.connect() as connection:
+        def pragma(name):
+            return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+        assert pragma("journal_mode").upper() == settings.SQLITE_JOURNAL_MODE.upper()
+        assert pragma("synchronous") == SYNCHRONOUS_LEVELS[settings.SQLITE_SYNCHRONOUS.upper()]
+        assert pragma("busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from sqlalchemy import update
+
+from app.models.earning import EarningBalance
+from app.services.earning_service import EarningService
+from app.services.earnings_reconciliation import EarningsReconciliation
+
+
+def _balances(db, user):
+    return {b.currency: (b.pending_payout, b.paid_out) for b in EarningService(db).get_balances(user.user_id)}
+
+
+def test_balance_follows_earning_lifecycle(db, create_user, create_connection):
+    fan, creator = create_user("fan"), create_user("creator")
+    earning_service = EarningService(db)
+    first = earning_service.create_earning(creator.user_id, create_connection(fan, creator).connection_id, Decimal("4.00"))
+    second = earning_service.create_earning(creator.user_id, create_connection(fan, creator).connection_id, Decimal("6.50"))
+    earning_service.create_earning(creator.user_id, create_connection(fan, creator).connection_id, Decimal("3.00"), currency="EUR")
+    assert _balances(db, creator) == {"EUR": (Decimal("3.00"), 0), "USD": (Decimal("10.50"), 0)}
+
+    earning_service.update_earning_status(first.earning_id, "PAID_OUT")
+    earning_service.update_earning_status(first.earning_id, "PAID_OUT") # No-op: already paid out
+    earning_service.update_earning_status(second.earning_id, "CANCELED")
+    assert _balances(db, creator)["USD"] == (Decimal("0.00"), Decimal("4.00"))
+    assert _balances(db, fan) == {}
+
+
+def test_reconciliation_detects_and_repairs_drift(db, create_user, create_connection):
+    fan, creator = create_user("fan"), create_user("creator")
+    EarningService(db).create_earning(creator.user_id, create_connection(fan, creator).connection_id, Decimal("4.00"))
+    reconciliation = EarningsReconciliation(chunk_size=1)
+    assert reconciliation.reconcile(db) == []
+
+    # A write that bypassed the service
+    db.execute(update(EarningBalance).values(pending_payout=Decimal("99.00")))
+    db.commit()
+
+    (drift,) = reconciliation.reconcile(db, repair=False)
+    assert (drift.user_id, drift.currency, drift.actual) == (creator.user_id, "USD", (Decimal("99.00"), Decimal("0.00")))
+    assert _balances(db, creator)["USD"][0] == Decimal("99.00")
+
+    assert len(reconciliation.reconcile(db)) == 1
+    db.expire_all()
+    assert _balances(db, creator)["USD"] == (Decimal("4.00"), Decimal("0.00"))
+    assert reconciliation.reconcile(db) == []
+
+
+def test_balance_response_keeps_exact_decimal_totals(db, create_user, create_connection):
+    from app.schemas.earning import EarningBalanceResponse
+
+    fan, creator = create_user("fan"), create_user("creator")
+    earning_service = EarningService(db)
+    for amount in ("0.10", "0.20"):
+        earning_service.create_earning(creator.user_id, create_connection(fan, creator).connection_id, Decimal(amount))
+    earning = earning_service.create_earning(creator.user_id, create_connection(fan, creator).connection_id, Decimal("0.10"))
+    earning_service.update_earning_status(earning.earning_id, "PAID_OUT")
+
+    (balance,) = earning_service.get_balances(creator.user_id)
+    response = EarningBalanceResponse.model_validate(balance).model_dump(mode="json")
+    assert response == {"currency": "USD", "pending_payout": "0.30", "paid_out": "0.10", "lifetime": "0.40"}
@@ -0,0 +1,42 @@
+from app.models.moment import Moment
+from app.services.flirt_service import FlirtService
+
+
+def _create_moment(db, user):
+    moment = Moment(user_id=user.user_id, text_content="flirt with me")
+    db.add(moment)
+    db.commit()
+    return moment
+
+
+def test_duplicate_flirt_is_counted_once(db, create_user):
+    author = create_user("author")
+    flirter = create_user("flirter")
+    moment = _create_moment(db, author)
+    flirt_service = FlirtService(db)
+
+    first = flirt_service.create_flirt(flirter.user_id, moment.moment_id)
+    second = flirt_service.create_flirt(flirter.user_id, moment.moment_id)
+
+    assert first.flirt_id == second.flirt_id
+    db.refresh(moment)
+    assert moment.flirt_count == 1
+
+
+def test_bulk_flirts_skip_existing_and_delete_decrements(db, create_user):
+    author = create_user("author")
+    flirter = create_user("flirter")
+    moments = [_create_moment(db, author) for _ in range(3)]
+    flirt_service = FlirtService(db)
+    existing = flirt_service.create_flirt(flirter.user_id, moments[0].moment_id)
+
+    created = flirt_service.create_flirts(flirter.user_id, [m.moment_id for m in moments])
+    assert {f.moment_id for f in created} == {moments[1].moment_id, moments[2].moment_id}
+    for moment in moments:
+        db.refresh(moment)
+        assert moment.flirt_count == 1
+
+    assert flirt_service.delete_flirt(existing.flirt_id) is True
+    assert flirt_service.delete_flirt(existing.flirt_id) is False
+    db.refresh(moments[0])
+    assert moments[0].flirt_count == 0
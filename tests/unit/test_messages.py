@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.message import Message
+from app.services.message_service import MessageService
+
+
+@pytest.fixture
+def create_conversation(db, create_user, create_connection):
+    def _create_conversation(count):
+        alice, bob = create_user("alice"), create_user("bob")
+        connection = create_connection(alice, bob)
+        base = datetime(2024, 1, 1)
+        db.add_all([
+            Message(connection_id=connection.connection_id, sender_id=alice.user_id, text_content=f"message {i}",
+                    created_at=base + timedelta(minutes=i))
+            for i in range(count)
+        ])
+        db.commit()
+        return connection
+    return _create_conversation
+
+
+def _texts(messages):
+    return [m.text_content for m in messages]
+
+
+def test_history_scrolls_back_from_newest(db, create_conversation):
+    connection = create_conversation(5)
+    message_service = MessageService(db)
+
+    page, cursor, sync_cursor = message_service.get_messages_by_connection(connection.connection_id, limit=2)
+    assert _texts(page) == ["message 3", "message 4"]
+
+    page, cursor, _ = message_service.get_messages_by_connection(connection.connection_id, limit=2, cursor=cursor)
+    assert _texts(page) == ["message 1", "message 2"]
+
+    page, cursor, _ = message_service.get_messages_by_connection(connection.connection_id, limit=2, cursor=cursor)
+    assert _texts(page) == ["message 0"]
+    assert cursor is None
+
+    # Exactly one full page: no cursor to an empty page
+    page, cursor, _ = message_service.get_messages_by_connection(connection.connection_id, limit=5)
+    assert len(page) == 5 and cursor is None
+
+
+def test_since_returns_only_new_messages(db, create_conversation):
+    connection = create_conversation(3)
+    message_service = MessageService(db)
+    _, _, sync_cursor = message_service.get_messages_by_connection(connection.connection_id, limit=50)
+
+    page, _, unchanged = message_service.get_messages_by_connection(connection.connection_id, since=sync_cursor)
+    assert page == []
+    assert unchanged == sync_cursor
+
+    db.add(Message(connection_id=connection.connection_id, sender_id=connection.requester_id,
+                   text_content="message 3", created_at=datetime(2024, 1, 2)))
+    db.commit()
+    page, _, new_sync_cursor = message_service.get_messages_by_connection(connection.connection_id, since=sync_cursor)
+    assert _texts(page) == ["message 3"]
+    assert new_sync_cursor != sync_cursor
+
+
+def test_since_pages_forwards_through_a_large_delta(db, create_conversation):
+    connection = create_conversation(1)
+    message_service = MessageService(db)
+    _, _, sync_cursor = message_service.get_messages_by_connection(connection.connection_id, limit=50)
+    db.add_all([
+        Message(connection_id=connection.connection_id, sender_id=connection.requester_id,
+                text_content=f"new {i}", created_at=datetime(2024, 1, 2) + timedelta(minutes=i))
+        for i in range(4)
+    ])
+    db.commit()
+
+    page, cursor, _ = message_service.get_messages_by_connection(connection.connection_id, limit=2, since=sync_cursor)
+    assert _texts(page) == ["new 0", "new 1"]
+    page, cursor, new_sync_cursor = message_service.get_messages_by_connection(connection.connection_id, limit=2, cursor=cursor, since=sync_cursor)
+    assert _texts(page) == ["new 2", "new 3"]
+    # Exactly a full page left: no cursor to an empty page
+    assert cursor is None
+    page, _, _ = message_service.get_messages_by_connection(connection.connection_id, since=new_sync_cursor)
+    assert page == []
+
+
+def test_watermark_derives_read_state_and_unread_count(db, create_conversation):
+    connection = create_conversation(4)
+    message_service = MessageService(db)
+    reader = connection.recipient_id
+    assert message_service.get_unread_count(connection.connection_id, reader) == 4
+
+    history, _, _ = message_service.get_messages_by_connection(connection.connection_id)
+    message_service.mark_read_up_to(connection.connection_id, reader, history[1].message_id)
+    assert message_service.get_unread_count(connection.connection_id, reader) == 2
+    # The sender never has unread messages of their own
+    assert message_service.get_unread_count(connection.connection_id, connection.requester_id) == 0
+
+    history, _, _ = message_service.get_messages_by_connection(connection.connection_id)
+    assert [m.is_read for m in history] == [True, True, False, False]
+    # Derived state is not written back to the rows
+    assert not db.dirty
+
+
+def test_watermark_never_moves_backwards(db, create_conversation):
+    connection = create_conversation(3)
+    message_service = MessageService(db)
+    reader = connection.recipient_id
+
+    newest = message_service.mark_read_up_to(connection.connection_id, reader).last_read_message_id
+    assert message_service.get_unread_count(connection.connection_id, reader) == 0
+
+    history, _, _ = message_service.get_messages_by_connection(connection.connection_id)
+    stale = message_service.mark_read_up_to(connection.connection_id, reader, history[0].message_id)
+    assert stale.last_read_message_id == newest == history[-1].message_id
+    assert message_service.mark_message_as_read(history[0].message_id, reader) is None
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from app.models.moment import Moment
+from app.services.moment_service import MomentService
+from app.services.view_counter import ViewCounter
+
+
+def _create_moments(db, user, count, visibility="PUBLIC"):
+    base = datetime(2024, 1, 1)
+    moments = [
+        Moment(user_id=user.user_id, text_content=f"moment {i}", visibility=visibility, created_at=base + timedelta(minutes=i))
+        for i in range(count)
+    ]
+    db.add_all(moments)
+    db.commit()
+    return moments
+
+
+def test_public_feed_pages_with_cursor(db, create_user):
+    user = create_user()
+    _create_moments(db, user, 5)
+    moment_service = MomentService(db)
+
+    first_page, cursor = moment_service.get_public_moments(limit=2)
+    assert [m.text_content for m in first_page] == ["moment 4", "moment 3"]
+    assert cursor is not None
+
+    second_page, cursor = moment_service.get_public_moments(limit=2, cursor=cursor)
+    assert [m.text_content for m in second_page] == ["moment 2", "moment 1"]
+
+    last_page, cursor = moment_service.get_public_moments(limit=2, cursor=cursor)
+    assert [m.text_content for m in last_page] == ["moment 0"]
+    assert cursor is None
+
+
+def test_public_feed_excludes_private_moments(db, create_user):
+    user = create_user()
+    _create_moments(db, user, 2)
+    _create_moments(db, user, 2, visibility="PRIVATE")
+
+    moments, _ = MomentService(db).get_public_moments(limit=10)
+    assert len(moments) == 2
+    assert all(m.visibility == "PUBLIC" for m in moments)
+
+
+def test_view_counter_flushes_buffered_views(db, create_user):
+    user = create_user()
+    moment = _create_moments(db, user, 1)[0]
+    counter = ViewCounter()
+
+    for _ in range(3):
+        counter.record(moment.moment_id)
+    assert counter.pending(moment.moment_id) == 3
+    assert counter.flush(db) == 1
+
+    db.refresh(moment)
+    assert moment.views == 3
+    assert counter.pending(moment.moment_id) == 0
@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+import pytest
+
+from app.models.config_version import ConfigVersion
+from app.models.monetisation_config import MonetizationConfig
+from app.schemas.monetisation import MonetizationConfigBase
+from app.services.connection_service import ConnectionService
+from app.services.monetisation_config_service import MonetisationConfigService, monetization_config_cache
+
+
+def _config(name="DM_FEE_STANDARD", base="10.00"):
+    return MonetizationConfigBase(config_name=name, connection_fee_base=Decimal(base),
+                                  platform_cut_percentage=Decimal("0.20"), poster_share_percentage=Decimal("0.80"))
+
+
+def test_fees_come_from_cache_and_writes_bump_version(db):
+    monetization_config_cache.invalidate()
+    config_service = MonetisationConfigService(db)
+    db_config = config_service.create_monetization_config(_config())
+    assert db.get(ConfigVersion, "monetization").version == 1
+
+    base_fee, platform_cut, poster_share = ConnectionService(db).calculate_connection_fees()
+    assert (base_fee, platform_cut, poster_share) == (Decimal("10.00"), Decimal("2.00"), Decimal("8.00"))
+    assert [config.config_name for config in monetization_config_cache.active_configs(db)] == ["DM_FEE_STANDARD"]
+    # Warm cache and unchanged version: nothing to reload
+    assert monetization_config_cache.refresh(db) is False
+
+    config_service.update_monetization_config(db_config, _config(base="20.00"))
+    assert db.get(ConfigVersion, "monetization").version == 2
+    assert ConnectionService(db).calculate_connection_fees()[0] == Decimal("20.00")
+
+    config_service.deactivate_monetization_config(db_config.config_id)
+    assert monetization_config_cache.active_configs(db) == []
+    with pytest.raises(ValueError):
+        ConnectionService(db).calculate_connection_fees()
+
+
+def test_refresh_picks_up_version_bumped_by_another_worker(db):
+    monetization_config_cache.invalidate()
+    MonetisationConfigService(db).create_monetization_config(_config())
+    assert monetization_config_cache.fee_schedule(db, "PROMO_RATE") is None
+
+    # Simulate another worker's write: new row and version bump, without invalidating this process's cache
+    db.add(MonetizationConfig(**_config("PROMO_RATE", "5.00").model_dump()))
+    db.get(ConfigVersion, "monetization").version += 1
+    db.commit()
+    assert monetization_config_cache.fee_schedule(db, "PROMO_RATE") is None
+
+    assert monetization_config_cache.refresh(db) is True
+    assert monetization_config_cache.fee_schedule(db, "PROMO_RATE").connection_fee_base == Decimal("5.00")
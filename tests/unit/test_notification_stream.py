@@ -0,0 +1,74 @@
+import asyncio
+import uuid
+
+from app.core.pubsub import InProcessBroker
+from app.services import notification_stream as stream_module
+from app.services.notification_service import NOTIFICATIONS_CHANNEL
+from app.services.notification_stream import NotificationStream, sse_events
+
+
+def _event(recipient_id, event_id):
+    return {"recipient_id": str(recipient_id), "event_id": event_id, "data": {"title": event_id}}
+
+
+def test_one_subscription_routes_events_by_recipient(monkeypatch):
+    broker = InProcessBroker()
+    monkeypatch.setattr(stream_module, "broker", broker)
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+
+    async def scenario():
+        stream = NotificationStream()
+        await stream.start()
+        alice_queues = [stream.listen(alice), stream.listen(alice)]
+        bob_queue = stream.listen(bob)
+        assert broker.subscriber_count(NOTIFICATIONS_CHANNEL) == 1
+
+        broker.publish(NOTIFICATIONS_CHANNEL, _event(alice, "1"))
+        for queue in alice_queues:
+            assert (await asyncio.wait_for(queue.get(), 1))["event_id"] == "1"
+        assert bob_queue.empty()
+
+        for queue in alice_queues:
+            stream.unlisten(alice, queue)
+        stream.unlisten(bob, bob_queue)
+        assert stream.listener_count() == 0
+        await stream.stop()
+
+    asyncio.run(scenario())
+
+
+def test_sse_events_replays_backlog_then_streams_live_events():
+    user = uuid.uuid4()
+
+    async def scenario():
+        queue = asyncio.Queue()
+        queue.put_nowait(_event(user, "1")) # Already in the backlog: skipped
+        queue.put_nowait(_event(user, "2"))
+        events = sse_events([_event(user, "1")], queue, heartbeat=0.01)
+        chunks = [await events.__anext__() for _ in range(4)]
+        await events.aclose()
+        return chunks
+
+    retry, replayed, live, heartbeat = asyncio.run(scenario())
+    assert retry == "retry: 10\n\n"
+    assert replayed.startswith("id: 1\nevent: notification\n")
+    assert live.startswith("id: 2\n")
+    assert heartbeat == ": heartbeat\n\n"
+
+
+def test_sse_events_skips_live_events_covered_by_a_reset():
+    user = uuid.uuid4()
+
+    async def scenario():
+        queue = asyncio.Queue()
+        queue.put_nowait(_event(user, "7")) # Committed before the reset position: the client refetches it
+        queue.put_nowait(_event(user, "8"))
+        reset = {"recipient_id": str(user), "event_id": "7", "event": "reset", "data": {}}
+        events = sse_events([reset], queue, heartbeat=0.01)
+        chunks = [await events.__anext__() for _ in range(3)]
+        await events.aclose()
+        return chunks
+
+    _, reset, live = asyncio.run(scenario())
+    assert reset == "id: 7\nevent: reset\ndata: {}\n\n"
+    assert live.startswith("id: 8\n")
@@ -0,0 +1,205 @@
+from app.models.notification import Notification, NotificationCounter
+from app.services.notification_service import NotificationService
+
+
+def _notify(service, user, count):
+    return [
+        service.create_notification(recipient_id=user.user_id, type="NEW_FLIRT", title="Flirt", message=f"flirt {i}")
+        for i in range(count)
+    ]
+
+
+def test_counter_tracks_every_read_state_change(db, create_user):
+    user = create_user()
+    service = NotificationService(db)
+    notifications = _notify(service, user, 4)
+    assert service.get_unread_count(user.user_id) == 4
+
+    service.mark_notification_read_status(notifications[0].notification_id, True)
+    service.mark_notification_read_status(notifications[0].notification_id, True) # no-op
+    assert service.get_unread_count(user.user_id) == 3
+
+    assert service.mark_notifications_read(user.user_id, [n.notification_id for n in notifications[:2]]) == 1
+    assert service.get_unread_count(user.user_id) == 2
+
+    service.delete_notification(notifications[2].notification_id)
+    assert service.get_unread_count(user.user_id) == 1
+
+    assert service.mark_all_read(user.user_id) == 1
+    assert service.get_unread_count(user.user_id) == 0
+
+
+def test_batch_ignores_other_users_notifications(db, create_user):
+    owner, other = create_user("owner"), create_user("other")
+    service = NotificationService(db)
+    foreign = _notify(service, other, 1)[0]
+
+    assert service.mark_notifications_read(owner.user_id, [foreign.notification_id]) == 0
+    assert service.get_unread_count(other.user_id) == 1
+
+
+def test_counter_is_seeded_from_existing_rows(db, create_user):
+    user = create_user()
+    db.add_all([Notification(recipient_id=user.user_id, type="NEW_FLIRT", title="Flirt", message="old") for _ in range(3)])
+    db.commit()
+    service = NotificationService(db)
+    assert service.get_unread_count(user.user_id) == 3
+
+    _notify(service, user, 1)
+    assert db.get(NotificationCounter, user.user_id).unread_count == 4
+
+
+def test_counter_update_is_reapplied_when_a_concurrent_seed_wins(db, monkeypatch, create_user):
+    user = create_user()
+    service = NotificationService(db)
+    seed = service._seed_counter
+
+    def seeded_elsewhere_first(user_id):
+        # Another transaction seeded from the committed rows, before our new notification existed
+        db.add(NotificationCounter(user_id=user_id, unread_count=0))
+        db.flush()
+        return seed(user_id)
+
+    monkeypatch.setattr(service, "_seed_counter", seeded_elsewhere_first)
+    db.add(Notification(recipient_id=user.user_id, type="NEW_FLIRT", title="Flirt", message="new"))
+    db.flush()
+    service._adjust_unread(user.user_id, 1)
+    assert db.get(NotificationCounter, user.user_id).unread_count == 1
+
+
+def test_dispatcher_delivers_outbox_and_honours_preferences(db, create_user):
+    from app.models.notification import NotificationOutbox
+    from app.models.user_settings import UserSettings
+    from app.services.notification_dispatcher import NotificationDispatcher, notification_preferences
+
+    notification_preferences.clear()
+    chatty, muted = create_user("chatty"), create_user("muted")
+    db.add(UserSettings(user_id=muted.user_id, notify_new_message=False))
+    db.commit()
+    service = NotificationService(db)
+    for user in (chatty, muted):
+        service.enqueue_notification(recipient_id=user.user_id, type="NEW_MESSAGE", title="New Message", message="hi")
+        service.enqueue_notification(recipient_id=user.user_id, type="CONNECTION_DECLINED", title="Declined", message="no")
+    db.commit()
+    assert db.query(Notification).count() == 0
+
+    assert NotificationDispatcher(batch_size=3).dispatch(db) == 4
+    assert db.query(NotificationOutbox).count() == 0
+    assert {n.type for n in service.get_notifications_by_recipient(chatty.user_id)} == {"NEW_MESSAGE", "CONNECTION_DECLINED"}
+    assert [n.type for n in service.get_notifications_by_recipient(muted.user_id)] == ["CONNECTION_DECLINED"]
+    assert service.get_unread_count(chatty.user_id) == 2
+    assert service.get_unread_count(muted.user_id) == 1
+
+
+def test_message_notifications_coalesce_until_read(db, create_user):
+    from datetime import datetime, timedelta
+
+    recipient, sender = create_user("recipient"), create_user("sender")
+    service = NotificationService(db)
+    conversation = sender.user_id # Any entity id will do
+    base = datetime(2024, 1, 1)
+
+    def burst(count, start):
+        service.create_notifications([
+            {"recipient_id": recipient.user_id, "sender_id": sender.user_id, "type": "NEW_MESSAGE", "title": "New Message",
+             "message": f"message {start + i}", "entity_id": conversation, "entity_type": "connection",
+             "created_at": base + timedelta(minutes=start + i)}
+            for i in range(count)
+        ])
+        db.commit()
+
+    burst(3, 0)
+    burst(2, 3)
+    (notification,) = service.get_notifications_by_recipient(recipient.user_id)
+    assert notification.occurrences == 5
+    assert notification.message == "message 4"
+    assert notification.last_occurred_at == base + timedelta(minutes=4)
+    assert service.get_unread_count(recipient.user_id) == 1
+
+    service.mark_all_read(recipient.user_id)
+    burst(1, 5)
+    latest, read = service.get_notifications_by_recipient(recipient.user_id)
+    assert (latest.occurrences, latest.is_read) == (1, False)
+    assert read.is_read
+    assert service.get_unread_count(recipient.user_id) == 1
+
+
+def test_stream_positions_follow_dispatch_order_not_occurrence_time(db, create_user):
+    import asyncio
+    from datetime import datetime
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.pool import NullPool
+    from app.core.config import settings
+    from app.core.database import async_database_url
+    from app.services.notification_service import AsyncNotificationService, notification_event_id
+
+    user = create_user()
+    service = NotificationService(db)
+
+    def deliver(message, created_at):
+        service.create_notifications([{"recipient_id": user.user_id, "type": "NEW_FLIRT", "title": "Flirt",
+                                       "message": message, "created_at": created_at}])
+        db.commit()
+
+    deliver("enqueued late, committed first", datetime(2024, 1, 1, 12))
+    (seen,) = service.get_notifications_by_recipient(user.user_id)
+    # Enqueued before the event the client has already seen, but committed after it
+    deliver("enqueued early, committed later", datetime(2024, 1, 1, 11))
+    _notify(service, user, 2)
+
+    async def replay(limit):
+        engine = create_async_engine(async_database_url(settings.TEST_DATABASE_URL), poolclass=NullPool)
+        try:
+            async with AsyncSession(engine) as async_db:
+                async_service = AsyncNotificationService(async_db)
+                return await async_service.get_notifications_since(user.user_id, notification_event_id(seen), limit), \
+                    await async_service.get_stream_seq(user.user_id)
+        finally:
+            await engine.dispose()
+
+    missed, stream_seq = asyncio.run(replay(3))
+    assert [n.message for n in missed] == ["enqueued early, committed later", "flirt 0", "flirt 1"]
+    assert stream_seq == 4
+    # One past the limit: the caller knows the backlog is truncated
+    missed, _ = asyncio.run(replay(2))
+    assert len(missed) == 3
+
+
+def test_retention_purges_only_expired_read_notifications(db, create_user):
+    from datetime import datetime, timedelta
+    from app.services.notification_retention import NotificationRetention
+
+    user = create_user()
+    service = NotificationService(db)
+    now = datetime(2024, 6, 1)
+    old, recent = now - timedelta(days=100), now - timedelta(days=1)
+    for is_read, at in [(True, old), (True, old), (False, old), (True, recent)]:
+        db.add(Notification(recipient_id=user.user_id, type="NEW_FLIRT", title="Flirt", message="hi",
+                            is_read=is_read, created_at=at, last_occurred_at=at))
+    db.commit()
+    unread_before = service.get_unread_count(user.user_id)
+
+    retention = NotificationRetention(retention_days=90, chunk_size=1)
+    assert retention.purge_read(db, retention.cutoff(now)) == 2
+    remaining = service.get_notifications_by_recipient(user.user_id)
+    assert sorted((n.is_read, n.last_occurred_at) for n in remaining) == [(False, old), (True, recent)]
+    assert service.get_unread_count(user.user_id) == unread_before == 1
+
+
+def test_retention_purges_even_when_partition_maintenance_fails(db, create_user, monkeypatch):
+    from datetime import datetime, timedelta
+    from app.services.notification_retention import NotificationRetention
+
+    user = create_user()
+    old = datetime.utcnow() - timedelta(days=100)
+    db.add(Notification(recipient_id=user.user_id, type="NEW_FLIRT", title="Flirt", message="hi",
+                        is_read=True, created_at=old, last_occurred_at=old))
+    db.commit()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("partition maintenance failed")
+    monkeypatch.setattr(NotificationRetention, "is_partitioned", staticmethod(lambda db: True))
+    monkeypatch.setattr(NotificationRetention, "ensure_partitions", fail)
+    monkeypatch.setattr(NotificationRetention, "drop_expired_partitions", fail)
+
+    assert NotificationRetention(retention_days=90).run(db) == 1
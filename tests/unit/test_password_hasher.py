@@ -0,0 +1,32 @@
+import asyncio
+
+from passlib.context import CryptContext
+
+from app.core import security
+from app.core.security import PasswordHasher, PasswordHasherOverloaded
+from app.services.user_service import UserService
+
+
+def test_hasher_rejects_jobs_beyond_queue_limit():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+
+    async def burst():
+        return await asyncio.gather(*(hasher.hash("secret") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(result, PasswordHasherOverloaded) for result in results) == 1
+    assert hasher.in_flight == 0
+
+
+def test_login_upgrades_outdated_hash(db, monkeypatch, create_user):
+    user_service = UserService(db)
+    user = create_user()
+    old_hash = user.hashed_password
+
+    stronger = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=security.pwd_context.handler("bcrypt").default_rounds + 1)
+    monkeypatch.setattr(security, "pwd_context", stronger)
+
+    assert user_service.authenticate_user("testuser", "testpass123") is not None
+    db.refresh(user)
+    assert user.hashed_password != old_hash
+    assert not stronger.needs_update(user.hashed_password)
@@ -0,0 +1,92 @@
+from decimal import Decimal
+
+from app.models.connection import Connection
+from app.models.notification import NotificationOutbox
+from app.models.payment_event import PaymentEvent
+from app.models.transaction import Transaction
+from app.schemas.transaction import PaymentWebhookEvent, TransactionCreate
+from app.services.connection_service import ConnectionService
+from app.services.payment_webhooks import PaymentWebhooks
+
+
+# Connection fee the webhook amounts are checked against
+FEES = {"fee_amount": Decimal("5.00"), "platform_cut": Decimal("1.00"), "poster_share": Decimal("4.00")}
+
+
+def _event(connection, external_id, status="SUCCESS", amount="5.00", currency="USD"):
+    return PaymentWebhookEvent(external_id=external_id, status=status, connection_id=connection.connection_id,
+                               amount=Decimal(amount), currency=currency, payment_method="Stripe_Card")
+
+
+def _outcomes(db):
+    return [(event.external_id, event.status, event.outcome) for event in db.query(PaymentEvent).order_by(PaymentEvent.event_id)]
+
+
+def test_events_are_deduped_and_applied_in_one_batch(db, create_user, create_connection):
+    payer, poster = create_user("payer"), create_user("poster")
+    paid, underpaid = create_connection(payer, poster, status="PENDING_PAYMENT", **FEES), create_connection(payer, poster, status="PENDING_PAYMENT", **FEES)
+    webhooks = PaymentWebhooks(batch_size=10)
+
+    assert webhooks.enqueue(db, _event(paid, "ch_1")) is True
+    assert webhooks.enqueue(db, _event(paid, "ch_1")) is False # Gateway retry
+    assert webhooks.enqueue(db, _event(underpaid, "ch_2", amount="1.00")) is True
+    assert webhooks.enqueue(db, _event(underpaid, "ch_3", currency="JPY")) is True # Right figure, wrong currency
+    assert webhooks.enqueue(db, _event(paid, "ch_1", status="REFUNDED")) is True
+
+    assert webhooks.apply(db) == 4
+    assert _outcomes(db) == [
+        ("ch_1", "SUCCESS", "activated"),
+        ("ch_2", "SUCCESS", "ignored: amount mismatch"),
+        ("ch_3", "SUCCESS", "ignored: currency mismatch"),
+        ("ch_1", "REFUNDED", "updated"),
+    ]
+    db.expire_all()
+    assert db.get(Connection, paid.connection_id).status == "PAID_PENDING_ACCEPT"
+    assert db.get(Connection, underpaid.connection_id).status == "PENDING_PAYMENT"
+    assert db.query(Transaction).filter(Transaction.external_id == "ch_1").one().status == "REFUNDED"
+    assert db.query(NotificationOutbox).filter(NotificationOutbox.type == "CONNECTION_REQUEST").count() == 1
+    assert webhooks.apply(db) == 0
+
+
+def test_webhook_adopts_payment_recorded_by_client(db, create_user, create_connection):
+    payer, poster = create_user("payer"), create_user("poster")
+    connection = create_connection(payer, poster, status="PENDING_PAYMENT", **FEES)
+    ConnectionService(db).process_payment_and_activate_connection(
+        connection.connection_id, TransactionCreate(connection_id=connection.connection_id, amount=5.0, payment_method="Stripe_Card")
+    )
+    webhooks = PaymentWebhooks()
+
+    webhooks.enqueue(db, _event(connection, "ch_9", status="REFUNDED"))
+    webhooks.enqueue(db, _event(connection, "ch_9"))
+    webhooks.apply(db)
+
+    assert _outcomes(db) == [("ch_9", "REFUNDED", "updated"), ("ch_9", "SUCCESS", "ignored: REFUNDED -> SUCCESS")]
+    assert db.query(Transaction).filter(Transaction.connection_id == connection.connection_id).one().external_id == "ch_9"
+
+
+def test_failing_event_is_recorded_without_blocking_the_batch(db, create_user, create_connection, monkeypatch):
+    payer, poster = create_user("payer"), create_user("poster")
+    first, broken, last = (create_connection(payer, poster, status="PENDING_PAYMENT", **FEES) for _ in range(3))
+    activate = ConnectionService.activate_paid_connection
+
+    def activate_or_fail(self, connection, *args, **kwargs):
+        transaction = activate(self, connection, *args, **kwargs)
+        if connection.connection_id == broken.connection_id:
+            raise RuntimeError("ledger unavailable") # After staging the activation: the savepoint must undo it
+        return transaction
+
+    monkeypatch.setattr(ConnectionService, "activate_paid_connection", activate_or_fail)
+    webhooks = PaymentWebhooks(batch_size=10)
+    for connection, external_id in ((first, "ch_1"), (broken, "ch_2"), (last, "ch_3")):
+        webhooks.enqueue(db, _event(connection, external_id))
+
+    assert webhooks.apply(db) == 3
+    assert _outcomes(db) == [
+        ("ch_1", "SUCCESS", "activated"),
+        ("ch_2", "SUCCESS", "error: RuntimeError: ledger unavailable"),
+        ("ch_3", "SUCCESS", "activated"),
+    ]
+    db.expire_all()
+    assert [db.get(Connection, c.connection_id).status for c in (first, broken, last)] == ["PAID_PENDING_ACCEPT", "PENDING_PAYMENT", "PAID_PENDING_ACCEPT"]
+    assert db.query(Transaction).filter(Transaction.external_id == "ch_2").count() == 0
+    assert webhooks.apply(db) == 0
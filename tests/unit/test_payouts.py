@@ -0,0 +1,110 @@
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select, update
+
+from app.models.earning import Earning
+from app.models.notification import NotificationOutbox
+from app.models.payout import PayoutBatch
+from app.models.transaction import Transaction
+from app.services.earning_service import EarningService
+from app.services.earnings_reconciliation import EarningsReconciliation
+from app.services.payout_engine import PayoutEngine
+
+
+@pytest.fixture
+def earn(db, create_connection):
+    def _earn(fan, creator, amount, currency="USD"):
+        connection = create_connection(fan, creator)
+        return EarningService(db).create_earning(creator.user_id, connection.connection_id, Decimal(amount), currency=currency)
+    return _earn
+
+
+def test_payout_groups_earnings_per_creator_and_currency(db, create_user, earn):
+    fan, alice, bob = (create_user(name) for name in ("fan", "alice", "bob"))
+    for amount in ("4.00", "4.00", "2.50"):
+        earn(fan, alice, amount)
+    earn(fan, alice, "3.00", currency="EUR")
+    earn(fan, bob, "4.00")
+
+    batch = PayoutEngine(chunk_size=100).run(db)
+
+    assert (batch.status, batch.earnings_paid, batch.payouts_created) == ("COMPLETED", 5, 3)
+    payouts = {(t.user_id, t.currency): t for t in db.query(Transaction).filter(Transaction.payout_batch_id == batch.batch_id)}
+    assert payouts[(alice.user_id, "USD")].amount == Decimal("10.50")
+    assert payouts[(alice.user_id, "EUR")].amount == Decimal("3.00")
+    assert payouts[(bob.user_id, "USD")].amount == Decimal("4.00")
+    assert {(e.status, e.payout_transaction_id) for e in db.query(Earning).filter(Earning.user_id == alice.user_id, Earning.currency == "USD")} \
+        == {("PAID_OUT", payouts[(alice.user_id, "USD")].transaction_id)}
+    assert {(b.currency, b.pending_payout, b.paid_out) for b in EarningService(db).get_balances(alice.user_id)} \
+        == {("EUR", Decimal("0.00"), Decimal("3.00")), ("USD", Decimal("0.00"), Decimal("10.50"))}
+    assert db.query(NotificationOutbox).filter(NotificationOutbox.type == "EARNING_PAID").count() == 3
+    assert EarningsReconciliation().reconcile(db, repair=False) == []
+
+
+def test_interrupted_batch_resumes_without_paying_twice(db, monkeypatch, create_user, earn):
+    fan = create_user("fan")
+    creators = [create_user(name) for name in ("alice", "bob", "carol")]
+    for creator in creators:
+        for _ in range(2):
+            earn(fan, creator, "4.00")
+    engine = PayoutEngine(chunk_size=2) # Creators per chunk
+
+    batch = engine.start_batch(db)
+    assert engine.start_batch(db).batch_id == batch.batch_id
+    assert engine.claim(db, batch, "crashed-runner")
+    assert engine.pay_chunk(db, batch, "crashed-runner") == 4
+    # Crash while paying the second chunk: nothing of it is kept
+    def crash(*args):
+        raise RuntimeError("crash")
+    monkeypatch.setattr(EarningService, "mark_paid_out", crash)
+    with pytest.raises(RuntimeError):
+        engine.pay_chunk(db, batch, "crashed-runner")
+    monkeypatch.undo()
+
+    # The crashed runner still holds the lease: another run leaves the batch alone
+    assert engine.run(db).status == "RUNNING"
+    db.execute(update(PayoutBatch).values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+
+    earn(fan, creators[0], "4.00") # After the cutoff: waits for the next batch
+    resumed = engine.run(db)
+
+    assert resumed.batch_id == batch.batch_id
+    assert (resumed.status, resumed.earnings_paid, resumed.payouts_created) == ("COMPLETED", 6, 3)
+    assert db.query(Earning).filter(Earning.status == "PENDING_PAYOUT").count() == 1
+    payouts = db.query(Transaction).filter(Transaction.payout_batch_id == batch.batch_id).all()
+    assert sorted((t.user_id, t.amount) for t in payouts) == sorted((c.user_id, Decimal("8.00")) for c in creators)
+    assert db.query(PayoutBatch).count() == 1
+    # A runner whose lease was taken over stops without paying
+    assert engine.pay_chunk(db, resumed, "crashed-runner") == 0
+
+
+def test_only_one_batch_runs_at_a_time(db):
+    from sqlalchemy.exc import IntegrityError
+
+    engine = PayoutEngine()
+    batch = engine.start_batch(db)
+    db.add(PayoutBatch(cutoff=datetime.utcnow()))
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+
+    assert engine.start_batch(db).batch_id == batch.batch_id
+    engine.run(db, batch)
+    assert engine.start_batch(db).batch_id != batch.batch_id
+
+
+def test_mark_paid_out_refuses_earnings_already_paid(db, create_user, earn):
+    fan, creator = create_user("fan"), create_user("creator")
+    earning = earn(fan, creator, "4.00")
+    row = db.execute(select(Earning.earning_id, Earning.user_id, Earning.currency, Earning.amount)).one()
+    earning_service = EarningService(db)
+    earning_service.update_earning_status(earning.earning_id, "PAID_OUT")
+
+    with pytest.raises(ValueError):
+        earning_service.mark_paid_out([row], {(creator.user_id, "USD"): uuid.uuid4()})
+    db.rollback()
+    assert EarningService(db).get_balances(creator.user_id)[0].paid_out == Decimal("4.00")
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from app.core.pubsub import InProcessBroker, UnixSocketBroker, serve_hub
+
+
+def test_in_process_broker_delivers_from_other_threads():
+    async def scenario():
+        broker = InProcessBroker()
+        subscription = await broker.subscribe("user:1")
+        other = await broker.subscribe("user:2")
+        thread = threading.Thread(target=broker.publish, args=("user:1", {"n": 1}))
+        thread.start()
+        thread.join()
+        assert await asyncio.wait_for(subscription.get(), 1) == {"n": 1}
+        assert other.queue.empty()
+        await subscription.close()
+        await other.close()
+        assert broker.subscriber_count("user:1") == 0
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_drops_oldest_events():
+    async def scenario():
+        broker = InProcessBroker(queue_size=2)
+        subscription = await broker.subscribe("user:1")
+        for n in range(3):
+            broker.publish("user:1", {"n": n})
+        await asyncio.sleep(0)
+        assert [await subscription.get(), await subscription.get()] == [{"n": 1}, {"n": 2}]
+
+    asyncio.run(scenario())
+
+
+def test_unix_socket_brokers_relay_through_hub(tmp_path):
+    path = str(tmp_path / "pubsub.sock")
+
+    async def scenario():
+        hub = asyncio.create_task(serve_hub(path))
+        await asyncio.sleep(0.05)
+        publisher, listener = UnixSocketBroker(path), UnixSocketBroker(path)
+        await publisher.start()
+        await listener.start()
+        subscription = await listener.subscribe("user:1")
+        await asyncio.sleep(0.05)
+
+        publisher.publish("user:1", {"n": 1})
+        assert await asyncio.wait_for(subscription.get(), 1) == {"n": 1}
+
+        await publisher.stop()
+        await listener.stop()
+        hub.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_unix_socket_broker_reconnects_and_resubscribes(tmp_path):
+    path = str(tmp_path / "pubsub.sock")
+
+    async def scenario():
+        listener = UnixSocketBroker(path, reconnect_delay=0.01, max_reconnect_delay=0.05)
+        await listener.start() # Hub not running yet: retried in the background
+        assert not listener.connected
+        listener.publish("user:1", {"n": 0}) # Dropped, not raised
+        subscription = await listener.subscribe("user:1")
+
+        hub = asyncio.create_task(serve_hub(path))
+        await asyncio.sleep(0.2)
+        assert listener.connected
+        publisher = UnixSocketBroker(path)
+        await publisher.start()
+        publisher.publish("user:1", {"n": 1})
+        assert await asyncio.wait_for(subscription.get(), 1) == {"n": 1}
+
+        # Dropped connection: the listener reconnects and subscribes to user:1 again
+        listener._writer.close()
+        await asyncio.sleep(0.2)
+        assert listener.connected
+        publisher.publish("user:1", {"n": 2})
+        assert await asyncio.wait_for(subscription.get(), 1) == {"n": 2}
+
+        await publisher.stop()
+        await listener.stop()
+        hub.cancel()
+
+    asyncio.run(scenario())
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.database import Base
+from app.core.replicas import HEARTBEAT_ID, ReplicaRouter
+from app.models.replication_heartbeat import ReplicationHeartbeat
+
+
+@pytest.fixture
+def router(tmp_path):
+    # Two SQLite files stand in for two replicas
+    router = ReplicaRouter([f"sqlite:///{tmp_path}/replica1.db", f"sqlite:///{tmp_path}/replica2.db"])
+    for replica in router.replicas:
+        Base.metadata.create_all(bind=replica.engine)
+    yield router
+    for replica in router.replicas:
+        replica.engine.dispose()
+
+
+def _set_heartbeat(replica, age_seconds):
+    with replica.SessionLocal() as db:
+        db.merge(ReplicationHeartbeat(heartbeat_id=HEARTBEAT_ID, beat_at=datetime.utcnow() - timedelta(seconds=age_seconds)))
+        db.commit()
+
+
+def test_replicas_without_heartbeat_fall_back_to_primary(router):
+    router.check_lag()
+    assert router.choose() is None
+
+
+def test_round_robin_skips_lagging_replica(router):
+    fresh, stale = router.replicas
+    _set_heartbeat(fresh, 0)
+    _set_heartbeat(stale, 60)
+    router.check_lag()
+
+    assert {router.choose() for _ in range(4)} == {fresh}
+
+
+def test_round_robin_alternates_between_fresh_replicas(router):
+    for replica in router.replicas:
+        _set_heartbeat(replica, 0)
+    router.check_lag()
+
+    assert [router.choose() for _ in range(2)] in (router.replicas, router.replicas[::-1])
+
+
+def test_least_connections_prefers_idle_replica(tmp_path):
+    router = ReplicaRouter([f"sqlite:///{tmp_path}/a.db", f"sqlite:///{tmp_path}/b.db"], strategy="least_connections")
+    busy, idle = router.replicas
+    busy.lag = idle.lag = 0.0
+    router.acquire(busy)
+
+    assert router.choose() is idle
@@ -0,0 +1,69 @@
+from app.models.message import Message
+from app.models.moment import Moment
+from app.schemas.moment import MomentUpdate
+from app.services.moment_service import MomentService
+from app.services.search_service import SearchService
+
+
+def _texts(rows):
+    return [row.text_content for row in rows]
+
+
+def test_moment_search_ranks_public_matches_and_follows_writes(db, create_user):
+    author = create_user("author")
+    moments = [
+        Moment(user_id=author.user_id, text_content="sunset at the beach", visibility="PUBLIC"),
+        Moment(user_id=author.user_id, text_content="beach beach beach day", visibility="PUBLIC"),
+        Moment(user_id=author.user_id, text_content="private beach", visibility="PRIVATE"),
+        Moment(user_id=author.user_id, text_content="mountain hike", visibility="PUBLIC"),
+    ]
+    db.add_all(moments)
+    db.commit()
+    search = SearchService(db)
+
+    page, cursor = search.search_moments("beach", limit=1)
+    assert _texts(page) == ["beach beach beach day"]
+    page, cursor = search.search_moments("beach", limit=1, cursor=cursor)
+    assert _texts(page) == ["sunset at the beach"]
+    assert cursor is None
+
+    moment_service = MomentService(db)
+    moment_service.update_moment(moments[3].moment_id, MomentUpdate(text_content="mountain beach hike"))
+    moment_service.delete_moment(moments[1].moment_id)
+    assert sorted(_texts(search.search_moments("beach")[0])) == ["mountain beach hike", "sunset at the beach"]
+    assert search.search_moments("mountain hike")[0][0].moment_id == moments[3].moment_id
+
+
+def test_message_search_is_scoped_to_own_connections(db, create_user, create_connection):
+    me, friend, stranger = (create_user(name) for name in ("me", "friend", "stranger"))
+    mine, theirs = create_connection(me, friend), create_connection(friend, stranger)
+    db.add_all([
+        Message(connection_id=mine.connection_id, sender_id=friend.user_id, text_content="dinner on friday?"),
+        Message(connection_id=theirs.connection_id, sender_id=friend.user_id, text_content="dinner on saturday?"),
+    ])
+    db.commit()
+
+    results, _ = SearchService(db).search_messages(me.user_id, "dinner")
+    assert _texts(results) == ["dinner on friday?"]
+    assert results[0].sender.username == "friend"
+    # User input is matched literally, never parsed as FTS syntax
+    assert SearchService(db).search_messages(me.user_id, 'dinner" OR "x')[0] == []
+
+
+def test_vacuum_database_rebuilds_search_indexes(db, create_user):
+    from sqlalchemy import text
+    from app.core.search import vacuum_database
+
+    author = create_user("author")
+    moment = Moment(user_id=author.user_id, text_content="beach day", visibility="PUBLIC")
+    db.add(moment)
+    db.commit()
+    expected = moment.moment_id
+    # Stand-in for an index whose rowids no longer match the base table
+    db.execute(text("INSERT INTO moments_fts(moments_fts) VALUES ('delete-all')"))
+    db.commit()
+    assert SearchService(db).search_moments("beach")[0] == []
+
+    vacuum_database(db.get_bind())
+    (found,), _ = SearchService(db).search_moments("beach")
+    assert found.moment_id == expected
@@ -0,0 +1,72 @@
+from app.core.config import settings
+from app.models.flirt import Flirt
+from app.models.timeline import HomeTimelineEntry, TimelinePullAuthor
+from app.schemas.moment import MomentCreate, MomentUpdate
+from app.services.moment_service import MomentService
+from app.services.timeline_service import TimelineService
+
+
+def _follow(db, follower, author):
+    # Flirting with one of the author's moments makes the flirter a follower
+    moment = MomentService(db).create_moment(MomentCreate(text_content="hello"), author.user_id)
+    db.add(Flirt(flirter_id=follower.user_id, moment_id=moment.moment_id))
+    db.commit()
+    return moment
+
+
+def test_new_moment_is_fanned_out_and_removed_on_delete(db, create_user):
+    author = create_user("author")
+    reader = create_user("reader")
+    _follow(db, reader, author)
+    moment_service = MomentService(db)
+
+    moment = moment_service.create_moment(MomentCreate(text_content="new post"), author.user_id)
+    timeline, _ = TimelineService(db).get_home_timeline(reader.user_id)
+    assert [m.moment_id for m in timeline] == [moment.moment_id]
+
+    moment_service.delete_moment(moment.moment_id)
+    assert db.query(HomeTimelineEntry).filter(HomeTimelineEntry.moment_id == moment.moment_id).count() == 0
+
+
+def test_visibility_change_fans_out_and_removes_the_moment(db, create_user):
+    author = create_user("author")
+    reader = create_user("reader")
+    _follow(db, reader, author)
+    moment_service = MomentService(db)
+    moment = moment_service.create_moment(MomentCreate(text_content="draft", visibility="PRIVATE"), author.user_id)
+
+    def reader_timeline():
+        timeline, _ = TimelineService(db).get_home_timeline(reader.user_id)
+        return [m.moment_id for m in timeline]
+
+    assert moment.moment_id not in reader_timeline()
+
+    moment_service.update_moment(moment.moment_id, MomentUpdate(visibility="PUBLIC"))
+    assert moment.moment_id in reader_timeline()
+
+    moment_service.update_moment(moment.moment_id, MomentUpdate(visibility="SUBSCRIBERS_ONLY"))
+    assert db.query(HomeTimelineEntry).filter(HomeTimelineEntry.moment_id == moment.moment_id).count() == 0
+
+
+def test_timeline_is_trimmed_to_max_entries(db, monkeypatch, create_user):
+    monkeypatch.setattr(settings, "HOME_TIMELINE_MAX_ENTRIES", 2)
+    author = create_user("author")
+    moment_service = MomentService(db)
+    moments = [moment_service.create_moment(MomentCreate(text_content=f"post {i}"), author.user_id) for i in range(4)]
+
+    kept = db.query(HomeTimelineEntry.moment_id).filter(HomeTimelineEntry.owner_id == author.user_id).all()
+    assert {row.moment_id for row in kept} == {moments[2].moment_id, moments[3].moment_id}
+
+
+def test_large_following_is_merged_on_read(db, monkeypatch, create_user):
+    monkeypatch.setattr(settings, "HOME_TIMELINE_FANOUT_LIMIT", 0)
+    author = create_user("author")
+    reader = create_user("reader")
+    _follow(db, reader, author)
+
+    moment = MomentService(db).create_moment(MomentCreate(text_content="viral"), author.user_id)
+    assert db.get(TimelinePullAuthor, author.user_id) is not None
+    assert db.query(HomeTimelineEntry).filter(HomeTimelineEntry.owner_id == reader.user_id).count() == 0
+
+    timeline, _ = TimelineService(db).get_home_timeline(reader.user_id)
+    assert moment.moment_id in [m.moment_id for m in timeline]
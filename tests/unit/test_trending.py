@@ -0,0 +1,99 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.models.moment import Moment
+from app.services.trending_service import TrendingEngine
+
+
+def test_top_is_ordered_by_score():
+    engine = TrendingEngine(half_life_hours=6, top_k=2)
+    a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    engine.record(a, 1.0)
+    engine.record(b, 3.0)
+    engine.record(c, 2.0)
+
+    assert [moment_id for moment_id, _ in engine.top()] == [b, c]
+
+
+def test_recent_activity_outranks_older_activity():
+    engine = TrendingEngine(half_life_hours=1, top_k=10)
+    old, new = uuid.uuid4(), uuid.uuid4()
+    now = datetime.utcnow()
+    engine.record(old, 3.0, at=now - timedelta(hours=2)) # Decays to 0.75
+    engine.record(new, 1.0, at=now)
+
+    ranked = engine.top(at=now)
+    assert ranked[0][0] == new
+    assert abs(ranked[1][1] - 0.75) < 1e-6
+
+
+def test_decrement_lets_other_moments_back_into_top():
+    engine = TrendingEngine(half_life_hours=6, top_k=1)
+    a, b = uuid.uuid4(), uuid.uuid4()
+    engine.record(a, 2.0)
+    engine.record(b, 1.0)
+    engine.record(a, -2.0)
+
+    assert [moment_id for moment_id, _ in engine.top()] == [b]
+
+
+def test_snapshot_round_trip(db, create_user):
+    user = create_user("creator")
+    moment = Moment(user_id=user.user_id, text_content="hot")
+    db.add(moment)
+    db.commit()
+
+    engine = TrendingEngine()
+    engine.record(moment.moment_id, 5.0)
+    assert engine.snapshot(db) == 1
+
+    restored = TrendingEngine()
+    restored.load(db)
+    assert restored.top()[0][0] == moment.moment_id
+
+
+def test_snapshots_from_several_processes_add_up(db, create_user):
+    from app.models.trending import TrendingScore
+
+    user = create_user("creator")
+    moment = Moment(user_id=user.user_id, text_content="hot")
+    db.add(moment)
+    db.commit()
+
+    first, second = TrendingEngine(), TrendingEngine()
+    first.record(moment.moment_id, 2.0)
+    second.record(moment.moment_id, 3.0)
+    assert first.snapshot(db) == 1
+    assert second.snapshot(db) == 1
+    first.record(moment.moment_id, 1.0)
+    assert first.snapshot(db) == 1
+    assert first.snapshot(db) == 0 # Nothing new since the last snapshot
+
+    db.expire_all()
+    assert abs(db.get(TrendingScore, moment.moment_id).score - 6.0) < 1e-3
+
+    first.remove(moment.moment_id)
+    first.snapshot(db)
+    assert db.query(TrendingScore).count() == 0
+
+
+def test_only_public_moments_enter_the_heap(db, create_user, monkeypatch):
+    from app.schemas.moment import MomentUpdate
+    from app.services import flirt_service, moment_service
+    from app.services.flirt_service import FlirtService
+    from app.services.moment_service import MomentService
+
+    engine = TrendingEngine(top_k=1)
+    monkeypatch.setattr(flirt_service, "trending_engine", engine)
+    monkeypatch.setattr(moment_service, "trending_engine", engine)
+    author, fan = create_user("author"), create_user("fan")
+    public = Moment(user_id=author.user_id, text_content="public", visibility="PUBLIC")
+    private = Moment(user_id=author.user_id, text_content="private", visibility="PRIVATE")
+    db.add_all([public, private])
+    db.commit()
+
+    FlirtService(db).create_flirts(fan.user_id, [public.moment_id, private.moment_id])
+    assert [moment_id for moment_id, _ in engine.top()] == [public.moment_id]
+
+    MomentService(db).update_moment(public.moment_id, MomentUpdate(visibility="SUBSCRIBERS_ONLY"))
+    assert engine.top() == []